@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行工具 - 批量队列、基准测试、裁剪分割等无界面功能
+
+用法: python -m app.cli <命令> [参数]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from app.core.mp4_layout import MP4_LAYOUTS
+
+
+def load_app_config(path: str) -> dict:
+    """读取应用配置文件，不存在或损坏时返回空配置"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"配置文件加载失败: {e}", file=sys.stderr)
+        return {}
+
+
+def cmd_queue(args) -> int:
+    """按配置文件的scheduler设置批量压缩（优先级、抢占、按设备限流、预取、截止时间）"""
+    from app.core.job_scheduler import JobScheduler, STATUS_COMPLETED
+
+    config = load_app_config(args.config)
+    compression = config.get("compression", {})
+    scheduler_config = dict(config.get("scheduler", {}),
+                            background=config.get("background", {"enabled": False}),
+                            resource_limits=config.get("resource_limits", {}))
+    if args.jobs:
+        scheduler_config["max_concurrent_jobs"] = args.jobs
+
+    # 与界面启动压缩时注入的设置一致
+    settings = {
+        "preset": args.preset or compression.get("default_preset", "standard"),
+        "keep_audio": compression.get("keep_audio_default", True),
+        "watchdog": config.get("watchdog", {}),
+    }
+    for key in ("packaging", "mp4_layout", "auto_crop", "auto_preset", "scene_keyframes",
+                "content_mode", "screen_mode"):
+        if key in compression:
+            settings[key] = compression[key]
+
+    output_dir = Path(args.output_dir or compression.get("output_directory") or "output")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    scheduler = JobScheduler(scheduler_config)
+    last_status = {}
+
+    def on_job_changed(job):
+        # 只在状态变化时输出，进度更新太频繁
+        if last_status.get(job.job_id) != job.status:
+            last_status[job.job_id] = job.status
+            print(f"任务 {job.job_id} {job.status}: {Path(job.input_file).name} {job.error or job.message}")
+
+    scheduler.add_listener(on_job_changed)
+    if args.deadline:
+        scheduler.set_deadline(time.time() + args.deadline * 60)
+    jobs = [scheduler.submit(input_file, str(output_dir / f"{Path(input_file).stem}_compressed.mp4"),
+                             settings, args.priority)
+            for input_file in args.inputs]
+    try:
+        scheduler.wait_all()
+    except KeyboardInterrupt:
+        print("正在取消剩余任务...", file=sys.stderr)
+        scheduler.shutdown()
+        scheduler.wait_all(timeout=30)
+    finally:
+        scheduler.shutdown()
+
+    summary = [{"input_file": job.input_file, "output_file": job.output_file, "status": job.status,
+                "error": job.error, "encode_preset": job.settings.get("encode_preset")} for job in jobs]
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0 if all(job.status == STATUS_COMPLETED for job in jobs) else 1
+
+
+def cmd_pin_benchmark(args) -> int:
+    """对比CPU绑定与不绑定的并发吞吐"""
+    from app.core.benchmarks import benchmark_pinning
+
+    settings = {"preset": args.preset, "encode_preset": args.encode_preset}
+    result = benchmark_pinning(args.inputs or None, args.jobs, settings)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if "error" in result else 0
+
+
+def cmd_layout_benchmark(args) -> int:
+    """对比各MP4布局的收尾延迟"""
+    from app.core.benchmarks import benchmark_mp4_layouts
+
+    settings = {"preset": args.preset, "encode_preset": args.encode_preset}
+    result = benchmark_mp4_layouts(args.inputs or None, settings, args.layouts or None)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if "error" in result else 0
+
+
+def cmd_trim(args) -> int:
+    """裁剪（尽量不重新编码）"""
+    from app.core.smart_cut import smart_cutter
+
+    ok = smart_cutter.trim(args.input, args.output, args.start, args.end, args.mode,
+                           error_callback=lambda message: print(message, file=sys.stderr))
+    return 0 if ok else 1
+
+
+def cmd_split(args) -> int:
+    """分割为多个文件（尽量不重新编码）"""
+    from app.core.smart_cut import smart_cutter
+
+    outputs = smart_cutter.split(args.input, args.output_dir, args.points, args.every, args.mode,
+                                 error_callback=lambda message: print(message, file=sys.stderr))
+    print(json.dumps(outputs, ensure_ascii=False, indent=2))
+    return 0 if outputs else 1
+
+
+def cmd_merge(args) -> int:
+    """合并分段录制的文件（可直接压缩）"""
+    error_callback = lambda message: print(message, file=sys.stderr)
+    if args.preset:
+        from app.core.video_compressor import video_compressor
+        settings = {"preset": args.preset, "merge_inputs": args.inputs}
+        ok = video_compressor.compress_video(args.inputs[0], args.output, settings,
+                                             error_callback=error_callback)
+    else:
+        from app.core.merge import video_merger
+        ok = video_merger.merge(args.inputs, args.output, error_callback=error_callback)
+    return 0 if ok else 1
+
+
+def cmd_analyze(args) -> int:
+    """分析内容复杂度并给出建议的压缩参数"""
+    from app.core.content_analysis import content_analyzer
+
+    results = {}
+    for input_file in args.inputs:
+        analysis = content_analyzer.complexity(input_file, use_cache=not args.no_cache)
+        results[input_file] = analysis or {"error": "分析失败"}
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 0 if all("error" not in result for result in results.values()) else 1
+
+
+def cmd_scenes(args) -> int:
+    """检测场景边界并列出分段"""
+    from app.core.media_probe import media_probe
+    from app.core.scene_detect import plan_chunks, scene_detector
+
+    boundaries = scene_detector.detect(args.input, args.threshold, args.min_chunk, use_cache=not args.no_cache)
+    duration = media_probe.probe(args.input).get("duration", 0)
+    result = {"boundaries": boundaries, "chunks": plan_chunks(boundaries, duration) if duration else []}
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_calibrate(args) -> int:
+    """测量本机编码速度，更新主机校准数据"""
+    from app.core.calibration import calibrate
+
+    result = calibrate(args.codecs or None, args.heights or None, args.threads or None, args.force,
+                       progress_callback=print)
+    if "error" in result:
+        print(result["error"], file=sys.stderr)
+        return 1
+    print(json.dumps({"measured": result["measured"], "model": result["model"]}, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_corpus(args) -> int:
+    """生成（或列出缓存的）合成测试素材"""
+    from app.core.corpus import generate_corpus
+
+    try:
+        results = generate_corpus(args.names or None, args.tags or None, args.force, progress_callback=print)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 0 if all(item["path"] for item in results) else 1
+
+
+def cmd_bench(args) -> int:
+    """运行端到端基准套件"""
+    from app.core.benchmark_suite import SUITE_GROUPS, run_suite
+
+    unknown = set(args.skip or []) - set(SUITE_GROUPS)
+    if unknown:
+        print(f"未知的测试组: {', '.join(sorted(unknown))}（可选: {', '.join(SUITE_GROUPS)}）", file=sys.stderr)
+        return 2
+    result = run_suite(args.quick, args.presets or None, args.skip or None, args.output, progress_callback=print)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if "error" in result else 0
+
+
+def cmd_bench_compare(args) -> int:
+    """对比两次基准结果，有退化时返回1"""
+    from app.core.benchmark_suite import compare_results, find_result
+
+    loaded = []
+    for reference in (args.baseline, args.current):
+        path = find_result(reference)
+        if not path:
+            print(f"找不到基准结果: {reference}", file=sys.stderr)
+            return 2
+        with open(path, "r", encoding="utf-8") as f:
+            loaded.append(json.load(f))
+
+    report = compare_results(loaded[0], loaded[1], args.threshold)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if report["host_mismatch"]:
+        print("注意: 两次结果来自不同主机，对比仅供参考", file=sys.stderr)
+    return 1 if report["regressions"] else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行解析器"""
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="视频压缩器命令行工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    queue_parser = subparsers.add_parser("queue", help="按配置文件的调度设置批量压缩多个文件")
+    queue_parser.add_argument("inputs", nargs="+", help="输入文件")
+    queue_parser.add_argument("-o", "--output-dir", default=None, help="输出目录（默认使用配置文件中的输出目录）")
+    queue_parser.add_argument("--preset", default=None, help="压缩预设（默认使用配置文件中的默认预设）")
+    queue_parser.add_argument("--priority", type=int, choices=[0, 1, 2, 3], default=1,
+                              help="任务优先级（0低 1普通 2高 3紧急）")
+    queue_parser.add_argument("--jobs", type=int, default=None, help="并发任务数（覆盖配置文件）")
+    queue_parser.add_argument("--deadline", type=float, default=None,
+                              help="完成时限（分钟），按时限为x264/x265任务选择速度预设")
+    queue_parser.add_argument("--config", default="config.json", help="配置文件路径")
+    queue_parser.set_defaults(func=cmd_queue)
+
+    pin_parser = subparsers.add_parser("pin-benchmark", help="对比CPU绑定与不绑定的并发压缩吞吐")
+    pin_parser.add_argument("inputs", nargs="*", help="输入文件（为空时使用合成测试素材）")
+    pin_parser.add_argument("--jobs", type=int, default=None, help="并发任务数")
+    pin_parser.add_argument("--preset", default="standard", help="压缩预设")
+    pin_parser.add_argument("--encode-preset", default="veryfast", help="编码速度预设")
+    pin_parser.set_defaults(func=cmd_pin_benchmark)
+
+    layout_parser = subparsers.add_parser("layout-benchmark", help="对比faststart/分段/预留moov等MP4布局的收尾延迟")
+    layout_parser.add_argument("inputs", nargs="*", help="输入文件（为空时使用合成测试素材）")
+    layout_parser.add_argument("--layouts", nargs="+", choices=MP4_LAYOUTS, help="参与对比的布局")
+    layout_parser.add_argument("--preset", default="web_optimized", help="压缩预设")
+    layout_parser.add_argument("--encode-preset", default="veryfast", help="编码速度预设")
+    layout_parser.set_defaults(func=cmd_layout_benchmark)
+
+    trim_parser = subparsers.add_parser("trim", help="裁剪片段：完整GOP直接复制，只重编码切点处")
+    trim_parser.add_argument("input", help="输入文件")
+    trim_parser.add_argument("output", help="输出文件")
+    trim_parser.add_argument("--start", type=float, default=0.0, help="起点（秒）")
+    trim_parser.add_argument("--end", type=float, default=None, help="终点（秒），默认到文件末尾")
+    trim_parser.add_argument("--mode", choices=["smart", "keyframe"], default="smart",
+                             help="smart切点精确；keyframe起点对齐到关键帧，全部复制")
+    trim_parser.set_defaults(func=cmd_trim)
+
+    split_parser = subparsers.add_parser("split", help="分割为多个文件")
+    split_parser.add_argument("input", help="输入文件")
+    split_parser.add_argument("output_dir", help="输出目录")
+    split_group = split_parser.add_mutually_exclusive_group(required=True)
+    split_group.add_argument("--points", type=float, nargs="+", help="分割点（秒）")
+    split_group.add_argument("--every", type=float, help="每段时长（秒）")
+    split_parser.add_argument("--mode", choices=["smart", "keyframe"], default="smart", help="剪切方式")
+    split_parser.set_defaults(func=cmd_split)
+
+    merge_parser = subparsers.add_parser("merge", help="合并分段录制的文件，参数一致时直接复制流")
+    merge_parser.add_argument("inputs", nargs="+", help="按顺序排列的分段文件")
+    merge_parser.add_argument("-o", "--output", required=True, help="输出文件")
+    merge_parser.add_argument("--preset", default=None, help="指定时合并后直接按该预设压缩")
+    merge_parser.set_defaults(func=cmd_merge)
+
+    analyze_parser = subparsers.add_parser("analyze", help="分析内容复杂度，建议预设、CRF和速度预设")
+    analyze_parser.add_argument("inputs", nargs="+", help="输入文件")
+    analyze_parser.add_argument("--no-cache", action="store_true", help="忽略缓存重新分析")
+    analyze_parser.set_defaults(func=cmd_analyze)
+
+    scenes_parser = subparsers.add_parser("scenes", help="检测场景切换，输出对齐关键帧的分段边界")
+    scenes_parser.add_argument("input", help="输入文件")
+    scenes_parser.add_argument("--threshold", type=float, default=10.0, help="scdet场景分数阈值（0~100）")
+    scenes_parser.add_argument("--min-chunk", type=float, default=10.0, help="最小分段时长（秒）")
+    scenes_parser.add_argument("--no-cache", action="store_true", help="忽略缓存重新检测")
+    scenes_parser.set_defaults(func=cmd_scenes)
+
+    calibrate_parser = subparsers.add_parser("calibrate", help="测量本机各编码器和速度预设的编码帧率")
+    calibrate_parser.add_argument("--codecs", nargs="+", choices=["libx264", "libx265", "libvpx-vp9"],
+                                  help="参与校准的编码器")
+    calibrate_parser.add_argument("--heights", type=int, nargs="+", help="校准分辨率（高度）")
+    calibrate_parser.add_argument("--threads", type=int, nargs="+", help="校准线程数")
+    calibrate_parser.add_argument("--force", action="store_true",
+                                  help="全部重新测量（默认只测缺失和FFmpeg升级后过期的组合）")
+    calibrate_parser.set_defaults(func=cmd_calibrate)
+
+    corpus_parser = subparsers.add_parser("corpus", help="生成可复现的合成测试素材（按规格哈希缓存）")
+    corpus_parser.add_argument("--names", nargs="+", help="素材名称")
+    corpus_parser.add_argument("--tags", nargs="+", help="按标签选择（默认default）")
+    corpus_parser.add_argument("--force", action="store_true", help="忽略缓存重新生成")
+    corpus_parser.set_defaults(func=cmd_corpus)
+
+    bench_parser = subparsers.add_parser("bench", help="运行端到端基准套件，结果按git版本和主机保存")
+    bench_parser.add_argument("--quick", action="store_true", help="减少重复次数，只测standard预设")
+    bench_parser.add_argument("--presets", nargs="+", help="参与单任务测试的预设")
+    # 测试组在执行时校验，避免每个命令启动时都导入基准套件及其依赖
+    bench_parser.add_argument("--skip", nargs="+",
+                              help="跳过的测试组（probe / command / progress / presets / queue / startup）")
+    bench_parser.add_argument("-o", "--output", default=None, help="结果文件（默认保存到数据目录）")
+    bench_parser.set_defaults(func=cmd_bench)
+
+    compare_parser = subparsers.add_parser("bench-compare", help="对比两次基准结果，标出超过阈值的退化")
+    compare_parser.add_argument("baseline", help="基线结果文件或git版本")
+    compare_parser.add_argument("current", help="当前结果文件或git版本")
+    compare_parser.add_argument("--threshold", type=float, default=0.05, help="退化阈值（比例，默认0.05）")
+    compare_parser.set_defaults(func=cmd_bench_compare)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
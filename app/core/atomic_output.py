@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原子化输出 - 先写入同目录临时文件，校验完整后再用os.replace重命名为最终文件
+"""
+
+import os
+import secrets
+import shutil
+import struct
+import time
+from pathlib import Path
+from typing import Optional, List
+
+
+# 临时文件标记，形如 .<输出文件名>.<pid>-<随机串>.vcpart
+# （扩展名不在CONTAINER_FORMATS中时保留原扩展名，让FFmpeg自行推断封装格式）
+TEMP_MARKER = ".vcpart"
+
+# 输出扩展名对应的FFmpeg封装格式（临时文件没有原扩展名，需要显式指定 -f）
+CONTAINER_FORMATS = {
+    ".mp4": "mp4",
+    ".m4v": "mp4",
+    ".mov": "mov",
+    ".mkv": "matroska",
+    ".webm": "webm",
+    ".avi": "avi",
+    ".flv": "flv",
+    ".ts": "mpegts",
+}
+
+# ISO BMFF 顶层box类型（用于mp4/mov完整性校验）
+_ISO_TOP_LEVEL_BOXES = {
+    b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"uuid",
+    b"moof", b"mfra", b"sidx", b"styp", b"meta", b"pdin", b"emsg", b"prft",
+}
+
+
+def make_temp_output_path(output_file: str) -> str:
+    """生成与最终输出同目录的临时文件路径"""
+    output_path = Path(output_file)
+    token = f"{os.getpid()}-{secrets.token_hex(4)}"
+    suffix = "" if get_container_format(output_file) else output_path.suffix
+    return str(output_path.with_name(f".{output_path.name}.{token}{TEMP_MARKER}{suffix}"))
+
+
+def get_container_format(output_file: str) -> Optional[str]:
+    """根据最终输出扩展名获取FFmpeg封装格式"""
+    return CONTAINER_FORMATS.get(Path(output_file).suffix.lower())
+
+
+def verify_output_file(path: str, output_format: Optional[str] = None) -> bool:
+    """检查输出文件是否完整（不调用FFmpeg，只做轻量的容器结构校验）"""
+    try:
+        file_size = os.path.getsize(path)
+        if file_size <= 0:
+            return False
+
+        if output_format in ("mp4", "mov"):
+            return _verify_iso_bmff(path, file_size)
+
+        if output_format in ("matroska", "webm"):
+            with open(path, "rb") as f:
+                return f.read(4) == b"\x1a\x45\xdf\xa3"  # EBML头
+
+        return True
+
+    except OSError as e:
+        print(f"校验输出文件失败: {e}")
+        return False
+
+
+def _verify_iso_bmff(path: str, file_size: int) -> bool:
+    """遍历顶层box，要求box链恰好覆盖整个文件且包含moov"""
+    offset = 0
+    seen = set()
+    with open(path, "rb") as f:
+        while offset < file_size:
+            f.seek(offset)
+            header = f.read(8)
+            if len(header) < 8:
+                return False
+
+            size, box_type = struct.unpack(">I4s", header)
+            if box_type not in _ISO_TOP_LEVEL_BOXES:
+                return False
+
+            if size == 1:
+                # 64位扩展长度
+                large = f.read(8)
+                if len(large) < 8:
+                    return False
+                size = struct.unpack(">Q", large)[0]
+            elif size == 0:
+                # box延伸到文件末尾
+                size = file_size - offset
+
+            if size < 8 or offset + size > file_size:
+                return False  # 被截断
+
+            seen.add(box_type)
+            offset += size
+
+    return b"moov" in seen
+
+
+def commit_output(temp_file: str, output_file: str, output_format: Optional[str] = None) -> bool:
+    """校验临时文件并原子重命名为最终输出，失败时删除临时文件"""
+    if not verify_output_file(temp_file, output_format):
+        print(f"输出文件校验失败，丢弃: {temp_file}")
+        discard_output(temp_file)
+        return False
+
+    try:
+        os.replace(temp_file, output_file)
+        return True
+    except OSError as e:
+        print(f"重命名输出文件失败: {e}")
+        discard_output(temp_file)
+        return False
+
+
+def commit_output_dir(temp_dir: str, output_dir: str) -> bool:
+    """
+    把写好的临时目录（分片输出）重命名为最终目录
+
+    目录无法原子覆盖，已有同名目录时先移到临时名再删除，读者最多看到短暂的目录缺失。
+    """
+    previous = None
+    try:
+        if os.path.exists(output_dir):
+            previous = make_temp_output_path(output_dir)
+            os.replace(output_dir, previous)
+        os.replace(temp_dir, output_dir)
+        return True
+    except OSError as e:
+        print(f"重命名输出目录失败: {e}")
+        discard_output(temp_dir)
+        return False
+    finally:
+        discard_output(previous)
+
+
+def discard_output(temp_file: Optional[str]):
+    """删除未完成的临时输出（文件或分片目录）"""
+    if not temp_file:
+        return
+    try:
+        if os.path.isdir(temp_file):
+            shutil.rmtree(temp_file)
+        else:
+            os.remove(temp_file)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"删除临时输出失败: {e}")
+
+
+def _owner_pid(name: str) -> Optional[int]:
+    """从临时文件名中解析写入进程的PID"""
+    try:
+        token = name.rsplit(TEMP_MARKER, 1)[0].rsplit(".", 1)[1]
+        return int(token.split("-", 1)[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    """检查进程是否仍在运行"""
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # Windows上os.kill(pid, 0)会发送CTRL_C_EVENT，无法用来探测进程
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def sweep_orphaned_outputs(directory: str, min_age_seconds: float = 600) -> List[str]:
+    """清理目录中遗留的临时输出（写入进程已不存在的）"""
+    removed = []
+    dir_path = Path(directory)
+    if not dir_path.is_dir():
+        return removed
+
+    for entry in dir_path.iterdir():
+        name = entry.name
+        if not (name.startswith(".") and TEMP_MARKER in name):
+            continue
+
+        pid = _owner_pid(name)
+        if pid is not None and _pid_alive(pid):
+            continue
+
+        try:
+            # 无法确认写入进程时，最近仍在写入的文件先保留
+            if os.name == "nt" and time.time() - entry.stat().st_mtime < min_age_seconds:
+                continue
+        except OSError:
+            continue
+
+        try:
+            if entry.is_dir():
+                shutil.rmtree(entry)
+            else:
+                entry.unlink()
+            removed.append(str(entry))
+        except OSError as e:
+            print(f"清理临时输出失败: {entry} ({e})")
+
+    if removed:
+        print(f"已清理 {len(removed)} 个遗留的临时输出文件")
+    return removed
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端基准套件 - 测量探测延迟、命令构建耗时、进度解析吞吐、各预设的单任务帧率和耗时、
+并发队列吞吐和扩展效率、启动到首个窗口的时间
+
+结果以JSON保存，按git版本和主机标识命名；compare对比两次结果并标出超过阈值的退化。
+"""
+
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Callable
+from app.core.corpus import corpus_inputs
+from app.core.ffmpeg_manager import ffmpeg_manager
+from app.core.media_probe import media_probe
+from app.core.speed_model import available_cores, load_host_profile
+from app.utils.app_paths import get_data_dir
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+SUITE_VERSION = 1
+
+# 指标方向
+LOWER_IS_BETTER = "lower"
+HIGHER_IS_BETTER = "higher"
+
+DEFAULT_REGRESSION_THRESHOLD = 0.05
+
+BENCHMARK_PRESETS = ["high_quality", "standard", "high_compression", "web_optimized"]
+
+# 可单独跳过的测试组
+SUITE_GROUPS = ["probe", "command", "progress", "presets", "queue", "startup"]
+
+# 启动测试：主程序看到此环境变量时在首个窗口显示后打印标记并退出
+STARTUP_PROBE_ENV = "VIDEO_COMPRESSOR_STARTUP_PROBE"
+STARTUP_MARKER = "FIRST_WINDOW_SHOWN"
+
+
+def git_revision() -> str:
+    """当前git版本（有未提交修改时加-dirty），不在git仓库中时返回unknown"""
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                  capture_output=True, text=True, timeout=10)
+        if revision.returncode != 0:
+            return "unknown"
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return "unknown"
+    return revision.stdout.strip() + ("-dirty" if status.stdout.strip() else "")
+
+
+def host_info() -> Dict[str, Any]:
+    """主机标识：硬件、核心数、FFmpeg版本，以及主机校准数据的更新时间"""
+    profile = load_host_profile() or {}
+    info = {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cores": available_cores(),
+        "ffmpeg_version": ffmpeg_manager.get_ffmpeg_info().get("version", ""),
+    }
+    key = json.dumps(info, sort_keys=True)
+    info["host_id"] = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    info["calibrated_at"] = profile.get("updated_at")
+    return info
+
+
+def results_dir() -> Path:
+    """基准结果目录"""
+    directory = get_data_dir() / "benchmarks"
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def _metric(value: float, unit: str, better: str) -> Dict[str, Any]:
+    """单个指标"""
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+
+def bench_probe(input_file: str, repeats: int) -> Dict[str, Any]:
+    """探测延迟：不使用缓存（启动ffprobe）和命中缓存两种情况"""
+    cold = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        media_probe.probe(input_file, use_cache=False)
+        cold.append(time.perf_counter() - start)
+    media_probe.probe(input_file)
+    warm_start = time.perf_counter()
+    for _ in range(repeats * 100):
+        media_probe.probe(input_file)
+    warm = (time.perf_counter() - warm_start) / (repeats * 100)
+    return {
+        "probe_cold_ms": _metric(sorted(cold)[len(cold) // 2] * 1000, "ms", LOWER_IS_BETTER),
+        "probe_warm_us": _metric(warm * 1e6, "us", LOWER_IS_BETTER),
+    }
+
+
+def bench_command_build(input_file: str, iterations: int) -> Dict[str, Any]:
+    """构建单输出和多码率FFmpeg命令的耗时"""
+    from app.core.renditions import resolve_ladder, select_renditions
+    from app.core.video_compressor import VideoCompressor
+
+    compressor = VideoCompressor()
+    media_info = media_probe.probe(input_file)
+    settings = {"preset": "standard", "resolution": {"width": 1280, "height": 720}}
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        compressor._build_ffmpeg_command(input_file, "out.mp4", settings, "mp4", media_info)
+    single = (time.perf_counter() - start) / iterations
+
+    renditions = select_renditions(resolve_ladder("abr"), media_info.get("height") or 1080)
+    outputs = [f"out_{rendition['name']}.mp4" for rendition in renditions]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        compressor._build_ladder_command(input_file, outputs, settings, renditions, "mp4", media_info)
+    ladder = (time.perf_counter() - start) / iterations
+
+    return {
+        "command_build_us": _metric(single * 1e6, "us", LOWER_IS_BETTER),
+        "ladder_command_build_us": _metric(ladder * 1e6, "us", LOWER_IS_BETTER),
+    }
+
+
+def _progress_block(frame: int, fps: float) -> List[str]:
+    """一个 -progress pipe:2 输出块"""
+    out_time_us = int(frame / fps * 1e6)
+    return [
+        f"frame={frame}", f"fps={fps:.2f}", "stream_0_0_q=28.0", "bitrate=1500.2kbits/s",
+        f"total_size={frame * 6000}", f"out_time_us={out_time_us}", f"out_time_ms={out_time_us}",
+        f"out_time=00:00:{frame / fps:09.6f}", "dup_frames=0", "drop_frames=0", "speed=2.5x",
+        "progress=continue",
+    ]
+
+
+def bench_progress_parser(blocks: int) -> Dict[str, Any]:
+    """进度解析吞吐（行/秒），包括ETA估算"""
+    from app.core.eta import EtaEstimator
+    from app.core.video_compressor import VideoCompressor
+
+    compressor = VideoCompressor()
+    duration = blocks / 30.0
+    compressor.eta = EtaEstimator(blocks, duration, 60.0)
+    lines = [line for frame in range(1, blocks + 1) for line in _progress_block(frame, 30.0)]
+    callback = lambda progress, message: None
+
+    start = time.perf_counter()
+    for line in lines:
+        compressor._parse_progress_line(line, duration, callback)
+    elapsed = time.perf_counter() - start
+    return {"progress_parse_lines_per_s": _metric(len(lines) / elapsed, "lines/s", HIGHER_IS_BETTER)}
+
+
+def bench_presets(input_file: str, presets: List[str], work_dir: Path) -> Dict[str, Any]:
+    """每个预设单独压缩一次，记录墙钟时间和编码帧率"""
+    from app.core.video_compressor import VideoCompressor
+
+    frames = media_probe.probe(input_file).get("nb_frames", 0)
+    metrics = {}
+    for preset in presets:
+        output_file = str(work_dir / f"preset_{preset}.mp4")
+        errors = []
+        start = time.perf_counter()
+        ok = VideoCompressor().compress_video(input_file, output_file, {"preset": preset},
+                                              error_callback=errors.append)
+        wall = time.perf_counter() - start
+        Path(output_file).unlink(missing_ok=True)
+        if not ok:
+            print(f"预设 {preset} 基准失败: {errors[-1] if errors else ''}")
+            continue
+        metrics[f"job_{preset}_wall_s"] = _metric(wall, "s", LOWER_IS_BETTER)
+        if frames:
+            metrics[f"job_{preset}_fps"] = _metric(frames / wall, "fps", HIGHER_IS_BETTER)
+    return metrics
+
+
+def bench_queue(input_file: str, jobs: int, work_dir: Path) -> Dict[str, Any]:
+    """同一批任务串行和并发执行的吞吐，扩展效率 = 加速比 / 并发数"""
+    from app.core.benchmarks import _run_batch
+
+    batch = [input_file] * jobs
+    base_config = {"preempt_mode": "none", "disk_aware": False, "prefetch": {"mode": "off"}}
+    settings = {"preset": "standard", "encode_preset": "veryfast"}
+    results = {}
+    for mode, concurrency in (("serial", 1), ("parallel", jobs)):
+        output_dir = work_dir / f"queue_{mode}"
+        output_dir.mkdir()
+        results[mode] = _run_batch(batch, output_dir, settings, dict(base_config, max_concurrent_jobs=concurrency))
+
+    metrics = {
+        "queue_serial_fps": _metric(results["serial"]["fps"], "fps", HIGHER_IS_BETTER),
+        "queue_parallel_fps": _metric(results["parallel"]["fps"], "fps", HIGHER_IS_BETTER),
+    }
+    if results["serial"]["fps"]:
+        speedup = results["parallel"]["fps"] / results["serial"]["fps"]
+        metrics["queue_scaling_efficiency"] = _metric(speedup / jobs, "ratio", HIGHER_IS_BETTER)
+    return metrics
+
+
+def bench_startup(repeats: int) -> Dict[str, Any]:
+    """从启动主程序到首个窗口显示的时间（无显示环境时使用offscreen平台）"""
+    env = dict(os.environ, **{STARTUP_PROBE_ENV: "1"})
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        try:
+            result = subprocess.run([sys.executable, str(PROJECT_ROOT / "main.py")], cwd=PROJECT_ROOT, env=env,
+                                    capture_output=True, text=True, timeout=120)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"启动基准失败: {e}")
+            return {}
+        if STARTUP_MARKER not in result.stdout:
+            print(f"启动基准失败: {result.stderr.strip()[-200:]}")
+            return {}
+        samples.append(time.perf_counter() - start)
+    return {"startup_first_window_ms": _metric(sorted(samples)[len(samples) // 2] * 1000, "ms", LOWER_IS_BETTER)}
+
+
+def run_suite(quick: bool = False, presets: Optional[List[str]] = None, skip: Optional[List[str]] = None,
+              output_file: Optional[str] = None,
+              progress_callback: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    运行基准套件并保存结果
+
+    Args:
+        quick: 减少重复次数、只测standard预设
+        presets: 参与单任务测试的预设
+        skip: 跳过的测试组（见SUITE_GROUPS）
+        output_file: 结果文件，默认保存到 <数据目录>/benchmarks/<版本>_<主机标识>.json
+    """
+    skip = set(skip or [])
+    presets = presets or (["standard"] if quick else BENCHMARK_PRESETS)
+    inputs = corpus_inputs(names=["testsrc2_720p30_h264_mp4"])
+    if not inputs:
+        return {"error": "无法生成测试素材"}
+    input_file = inputs[0]
+
+    result = {
+        "suite_version": SUITE_VERSION,
+        "revision": git_revision(),
+        "host": host_info(),
+        "timestamp": time.time(),
+        "quick": quick,
+        "metrics": {},
+    }
+    groups = [
+        ("probe", lambda work_dir: bench_probe(input_file, 3 if quick else 10)),
+        ("command", lambda work_dir: bench_command_build(input_file, 200 if quick else 2000)),
+        ("progress", lambda work_dir: bench_progress_parser(2000 if quick else 20000)),
+        ("presets", lambda work_dir: bench_presets(input_file, presets, work_dir)),
+        ("queue", lambda work_dir: bench_queue(input_file, 2 if quick else max(2, min(4, available_cores() // 2)),
+                                               work_dir)),
+        ("startup", lambda work_dir: bench_startup(1 if quick else 3)),
+    ]
+
+    work_dir = Path(tempfile.mkdtemp(prefix="vc_bench_suite_"))
+    try:
+        for name, run in groups:
+            if name in skip:
+                continue
+            if progress_callback:
+                progress_callback(f"基准测试: {name}...")
+            group_dir = work_dir / name
+            group_dir.mkdir()
+            result["metrics"].update(run(group_dir))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output_file = output_file or str(results_dir() / f"{result['revision']}_{result['host']['host_id']}.json")
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    result["output_file"] = output_file
+    return result
+
+
+def find_result(reference: str) -> Optional[str]:
+    """按文件路径或git版本前缀查找结果文件（同一版本有多个时取最新的）"""
+    if Path(reference).is_file():
+        return reference
+    matches = sorted(results_dir().glob(f"{reference}*.json"), key=lambda path: path.stat().st_mtime)
+    return str(matches[-1]) if matches else None
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> Dict[str, Any]:
+    """
+    对比两次基准结果
+
+    Returns:
+        Dict: metrics（每个共有指标的基线值、当前值、变化比例和是否退化）、regressions（退化的指标名）、
+              host_mismatch（两次结果是否来自不同主机，此时对比仅供参考）
+    """
+    metrics = {}
+    regressions = []
+    for name, base in sorted(baseline.get("metrics", {}).items()):
+        now = current.get("metrics", {}).get(name)
+        if not now or not base["value"]:
+            continue
+        change = (now["value"] - base["value"]) / base["value"]
+        if base["better"] == LOWER_IS_BETTER:
+            regressed = change > threshold
+        else:
+            regressed = change < -threshold
+        metrics[name] = {
+            "baseline": base["value"],
+            "current": now["value"],
+            "unit": now["unit"],
+            "change": round(change, 4),
+            "regressed": regressed,
+        }
+        if regressed:
+            regressions.append(name)
+
+    return {
+        "baseline_revision": baseline.get("revision"),
+        "current_revision": current.get("revision"),
+        "host_mismatch": (baseline.get("host") or {}).get("host_id") != (current.get("host") or {}).get("host_id"),
+        "threshold": threshold,
+        "metrics": metrics,
+        "regressions": regressions,
+    }
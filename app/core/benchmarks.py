@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准 - 对比不同调度和输出方式的实际吞吐
+"""
+
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from app.core.corpus import corpus_inputs
+from app.core.media_probe import media_probe
+from app.core.cpu_topology import discover_numa_nodes
+from app.core.mp4_layout import MP4_LAYOUTS
+
+
+def _run_batch(inputs: List[str], output_dir: Path, settings: Dict[str, Any],
+               scheduler_config: Dict[str, Any]) -> Dict[str, Any]:
+    """用调度器并发压缩一批文件，返回墙钟时间和吞吐"""
+    from app.core.job_scheduler import JobScheduler, STATUS_COMPLETED
+
+    scheduler = JobScheduler(scheduler_config)
+    start = time.time()
+    jobs = [
+        scheduler.submit(input_file, str(output_dir / f"bench_{i}.mp4"), settings)
+        for i, input_file in enumerate(inputs)
+    ]
+    scheduler.wait_all()
+    wall_time = time.time() - start
+    scheduler.shutdown()
+
+    frames = sum(media_probe.probe(input_file).get("nb_frames", 0) for input_file in inputs)
+    return {
+        "wall_time": round(wall_time, 3),
+        "frames": frames,
+        "fps": round(frames / wall_time, 2) if wall_time > 0 else 0.0,
+        "completed": sum(1 for job in jobs if job.status == STATUS_COMPLETED),
+        "jobs": len(jobs),
+    }
+
+
+def benchmark_pinning(inputs: Optional[List[str]] = None, concurrent_jobs: Optional[int] = None,
+                      settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    对比CPU绑定与不绑定时的并发压缩吞吐
+
+    Args:
+        inputs: 输入文件列表，为空时使用合成测试素材
+        concurrent_jobs: 并发任务数，默认每个NUMA节点2个
+        settings: 压缩设置
+    """
+    settings = settings or {"preset": "standard", "encode_preset": "veryfast"}
+    nodes = discover_numa_nodes()
+    concurrent_jobs = concurrent_jobs or max(2, len(nodes) * 2)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="vc_pin_bench_"))
+    try:
+        if not inputs:
+            inputs = corpus_inputs(tags=["pinning"])
+            if not inputs:
+                return {"error": "无法生成测试片段"}
+
+        # 每种模式跑同样数量的任务
+        batch = [inputs[i % len(inputs)] for i in range(concurrent_jobs)]
+        # 测试的是CPU绑定，关闭按设备限流以免同盘任务被串行化
+        base_config = {"max_concurrent_jobs": concurrent_jobs, "preempt_mode": "none", "disk_aware": False}
+
+        results = {
+            "numa_nodes": {str(node): len(cpus) for node, cpus in nodes.items()},
+            "concurrent_jobs": concurrent_jobs,
+        }
+        for mode, pinned in (("unpinned", False), ("pinned", True)):
+            output_dir = work_dir / mode
+            output_dir.mkdir()
+            results[mode] = _run_batch(batch, output_dir, settings, dict(base_config, cpu_pinning=pinned))
+
+        if results["unpinned"]["fps"]:
+            results["speedup"] = round(results["pinned"]["fps"] / results["unpinned"]["fps"], 3)
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _is_playable_mp4(path: str) -> bool:
+    """文件中已写完的顶层box是否足以开始播放（完整的moov和至少一个完整的mdat）"""
+    try:
+        file_size = Path(path).stat().st_size
+        seen = set()
+        offset = 0
+        with open(path, "rb") as f:
+            while offset + 8 <= file_size:
+                f.seek(offset)
+                size, box_type = struct.unpack(">I4s", f.read(8))
+                if size == 1:
+                    size = struct.unpack(">Q", f.read(8))[0]
+                if size < 8 or offset + size > file_size:
+                    break  # 写入中或长度待回填的box
+                seen.add(box_type)
+                offset += size
+        return b"moov" in seen and b"mdat" in seen
+    except (OSError, struct.error):
+        return False
+
+
+def _measure_layout(input_file: str, output_file: str, settings: Dict[str, Any],
+                    media_info: Dict[str, Any]) -> Dict[str, Any]:
+    """运行一次编码，记录最后一帧编码完成到进程退出的收尾耗时，以及输出最早可播放的时间"""
+    from app.core.video_compressor import video_compressor
+
+    cmd = video_compressor._build_ffmpeg_command(input_file, output_file, settings, "mp4", media_info)
+    cmd[1:1] = ["-stats_period", "0.1"]  # 提高进度输出频率以便精确定位最后一帧的时间
+
+    state = {"frames": 0, "last_frame_time": None}
+
+    def read_progress(stream):
+        for line in stream:
+            match = re.match(r"frame=\s*(\d+)", line.strip())
+            if match and int(match.group(1)) > state["frames"]:
+                state["frames"] = int(match.group(1))
+                state["last_frame_time"] = time.time()
+
+    start = time.time()
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    reader = threading.Thread(target=read_progress, args=(process.stderr,), daemon=True)
+    reader.start()
+
+    first_playable = None
+    while process.poll() is None:
+        if first_playable is None and _is_playable_mp4(output_file):
+            first_playable = time.time() - start
+        time.sleep(0.05)
+    end = time.time()
+    reader.join(timeout=5)
+
+    if process.returncode != 0:
+        return {"error": f"FFmpeg返回码 {process.returncode}"}
+
+    last_frame_time = state["last_frame_time"] or end
+    return {
+        "wall_time": round(end - start, 3),
+        "finalize_seconds": round(end - last_frame_time, 3),
+        "first_playable_seconds": round(first_playable if first_playable is not None else end - start, 3),
+        "output_size": Path(output_file).stat().st_size,
+    }
+
+
+def benchmark_mp4_layouts(inputs: Optional[List[str]] = None, settings: Optional[Dict[str, Any]] = None,
+                          layouts: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    对比各MP4布局的收尾延迟（最后一帧编码完成到输出就绪）和最早可播放时间
+
+    Args:
+        inputs: 输入文件列表，为空时使用合成测试素材
+        settings: 压缩设置（默认web_optimized预设）
+        layouts: 参与对比的布局，默认全部
+    """
+    settings = settings or {"preset": "web_optimized", "encode_preset": "veryfast"}
+    layouts = layouts or MP4_LAYOUTS
+
+    work_dir = Path(tempfile.mkdtemp(prefix="vc_layout_bench_"))
+    try:
+        if not inputs:
+            inputs = corpus_inputs(tags=["layout"])
+            if not inputs:
+                return {"error": "无法生成测试片段"}
+
+        results = {}
+        for input_file in inputs:
+            media_info = media_probe.probe(input_file)
+            file_results = {}
+            for layout in layouts:
+                output_file = str(work_dir / f"layout_{layout}.mp4")
+                file_results[layout] = _measure_layout(input_file, output_file,
+                                                       dict(settings, mp4_layout=layout), media_info)
+                Path(output_file).unlink(missing_ok=True)
+            results[Path(input_file).name] = file_results
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
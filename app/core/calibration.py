@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+主机校准 - 在合成测试素材上实测各编码器、速度预设、分辨率和线程数的编码帧率，
+写入主机校准数据文件，供速度模型（停滞检测、截止时间规划、预计剩余时间）使用
+
+只重新测量缺失的组合和FFmpeg版本变化后过期的组合，升级FFmpeg后增量校准即可。
+"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Callable
+from app.core.corpus import ensure_clip, make_spec
+from app.core.ffmpeg_manager import ffmpeg_manager
+from app.core.media_probe import media_probe
+from app.core.speed_model import DEFAULT_THREAD_EXPONENT, REFERENCE_PIXELS, available_cores, host_profile_path
+from app.core.thread_planner import codec_thread_args
+
+
+# 默认校准矩阵（VP9不使用速度预设，只测一个）
+CALIBRATION_PRESETS = {
+    "libx264": ["ultrafast", "veryfast", "fast", "medium", "slow"],
+    "libx265": ["ultrafast", "veryfast", "medium"],
+    "libvpx-vp9": ["medium"],
+}
+CALIBRATION_HEIGHTS = [720, 1080]
+CALIBRATION_SECONDS = 4.0
+CALIBRATION_FPS = 30
+
+# 计算线程扩展指数时的取值范围
+MIN_THREAD_EXPONENT = 0.3
+MAX_THREAD_EXPONENT = 1.0
+
+
+def calibration_threads(cores: Optional[int] = None) -> List[int]:
+    """校准的线程数：半数核心和全部核心（用于拟合线程扩展指数）"""
+    cores = cores or available_cores()
+    return sorted({max(1, cores // 2), cores})
+
+
+def entry_key(codec: str, preset: str, height: int, threads: int) -> str:
+    """校准条目的键"""
+    return f"{codec}|{preset}|{height}|{threads}"
+
+
+def calibration_spec(height: int) -> Dict[str, Any]:
+    """校准素材：带噪声的testsrc2（纯色块过于容易编码），近无损编码使解码开销很小"""
+    return make_spec(name=f"calibration_{height}p", width=int(round(height * 16 / 9 / 2)) * 2, height=height,
+                     fps=CALIBRATION_FPS, duration=CALIBRATION_SECONDS, noise=12, crf=10,
+                     encode_preset="ultrafast", audio=False)
+
+
+def measure_encode_fps(input_file: str, frames: int, codec: str, preset: str, threads: int,
+                       width: int = 0) -> Optional[float]:
+    """编码到空输出，返回实测帧率（帧/秒），失败时返回None"""
+    ffmpeg_info = ffmpeg_manager.get_ffmpeg_info()
+    if not ffmpeg_info["available"] or not frames:
+        return None
+
+    cmd = [ffmpeg_info["path"], "-hide_banner", "-loglevel", "error", "-y", "-i", input_file,
+           "-c:v", codec, "-crf", "30"]
+    if codec == "libvpx-vp9":
+        cmd.extend(["-b:v", "0"])
+    else:
+        cmd.extend(["-preset", preset])
+    cmd.extend(codec_thread_args(codec, threads, width))
+    cmd.extend(["-an", "-f", "null", "-"])
+
+    start = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0 or elapsed <= 0:
+        print(f"校准编码失败 ({codec} {preset}): {result.stderr.strip()[:200]}")
+        return None
+    return frames / elapsed
+
+
+def build_model(entries: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    把实测条目汇总为速度模型：每个编码器的线程扩展指数和各预设的1080p每核帧率
+
+    线程扩展指数由同一预设、同一分辨率下不同线程数的帧率比拟合。
+    """
+    by_codec: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in entries.values():
+        by_codec.setdefault(entry["codec"], []).append(entry)
+
+    model = {}
+    for codec, items in by_codec.items():
+        exponents = []
+        groups: Dict[tuple, Dict[int, float]] = {}
+        for item in items:
+            groups.setdefault((item["preset"], item["height"]), {})[item["threads"]] = item["fps"]
+        for measured in groups.values():
+            if len(measured) >= 2:
+                low, high = min(measured), max(measured)
+                if measured[low] > 0 and measured[high] > 0:
+                    exponents.append(math.log(measured[high] / measured[low]) / math.log(high / low))
+        exponent = sum(exponents) / len(exponents) if exponents else None
+        if exponent is not None:
+            exponent = min(MAX_THREAD_EXPONENT, max(MIN_THREAD_EXPONENT, exponent))
+        normalize_exponent = exponent or DEFAULT_THREAD_EXPONENT
+
+        # 换算到1080p、单核，再对各分辨率和线程数取平均
+        per_core: Dict[str, List[float]] = {}
+        for item in items:
+            pixel_scale = REFERENCE_PIXELS / max(item["width"] * item["height"], 1)
+            value = item["fps"] / pixel_scale / (item["threads"] ** normalize_exponent)
+            per_core.setdefault(item["preset"], []).append(value)
+        model[codec] = {
+            "fps_per_core": {preset: round(sum(values) / len(values), 3) for preset, values in per_core.items()},
+            "thread_exponent": round(exponent, 3) if exponent is not None else None,
+        }
+    return model
+
+
+def load_profile(path: Optional[Path] = None) -> Dict[str, Any]:
+    """读取校准数据文件，不存在或损坏时返回空数据"""
+    path = path or host_profile_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"读取主机校准数据失败: {e}")
+        return {}
+
+
+def save_profile(profile: Dict[str, Any], path: Optional[Path] = None):
+    """写入校准数据文件（先写临时文件再替换）"""
+    path = path or host_profile_path()
+    temp_file = f"{path}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    os.replace(temp_file, path)
+
+
+def calibrate(codecs: Optional[List[str]] = None, heights: Optional[List[int]] = None,
+              threads: Optional[List[int]] = None, force: bool = False,
+              progress_callback: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    运行校准并更新主机校准数据
+
+    Args:
+        codecs: 参与校准的编码器，默认全部
+        heights: 校准分辨率（高度）
+        threads: 校准线程数，默认半数核心和全部核心
+        force: 忽略已有数据全部重新测量
+
+    Returns:
+        Dict: 更新后的校准数据（measured为本次测量的条目数）；FFmpeg不可用时包含error
+    """
+    ffmpeg_info = ffmpeg_manager.get_ffmpeg_info()
+    if not ffmpeg_info["available"]:
+        return {"error": "FFmpeg未安装或不可用"}
+
+    codecs = codecs or list(CALIBRATION_PRESETS)
+    heights = heights or CALIBRATION_HEIGHTS
+    threads = threads or calibration_threads()
+    version = ffmpeg_info.get("version", "")
+
+    profile = load_profile()
+    entries = {} if force else dict(profile.get("entries") or {})
+    # FFmpeg版本变化后的条目视为过期
+    stale = {key for key, entry in entries.items() if entry.get("ffmpeg_version") != version}
+
+    measured = 0
+    for height in heights:
+        todo = [(codec, preset, thread_count)
+                for codec in codecs for preset in CALIBRATION_PRESETS.get(codec, ["medium"])
+                for thread_count in threads
+                if entry_key(codec, preset, height, thread_count) not in entries
+                or entry_key(codec, preset, height, thread_count) in stale]
+        if not todo:
+            continue
+
+        clip = ensure_clip(calibration_spec(height))
+        if not clip:
+            return {"error": "无法生成校准片段"}
+        info = media_probe.probe(clip, use_cache=False)
+
+        for codec, preset, thread_count in todo:
+            if progress_callback:
+                progress_callback(f"校准 {codec} {preset} {height}p {thread_count}线程...")
+            fps = measure_encode_fps(clip, info.get("nb_frames", 0), codec, preset, thread_count,
+                                     info.get("width", 0))
+            if fps is None:
+                continue
+            entries[entry_key(codec, preset, height, thread_count)] = {
+                "codec": codec, "preset": preset, "threads": thread_count,
+                "width": info.get("width", 0), "height": height, "fps": round(fps, 3),
+                "ffmpeg_version": version, "measured_at": time.time(),
+            }
+            measured += 1
+
+    profile = {
+        "host": {
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cores": available_cores(),
+        },
+        "ffmpeg_version": version,
+        "updated_at": time.time(),
+        "entries": entries,
+        # 未重新测量的过期条目仍比经验值可靠，继续参与汇总
+        "model": build_model(entries),
+    }
+    save_profile(profile)
+    return dict(profile, measured=measured)
@@ -4,7 +4,10 @@
 压缩预设配置 - 定义不同质量等级的压缩参数
 """
 
+import copy
 from typing import Dict, Any, List
+from app.core.filter_graph import plan_video_filters
+from app.core.thread_planner import codec_thread_args
 
 
 class CompressionPresets:
@@ -34,6 +37,7 @@ class CompressionPresets:
                 "channels": 2
             },
             "filters": [],
+            "video_filters": {"scaler": "quality"},  # 缩放使用lanczos
             "output_format": "mp4"
         },
         
@@ -109,6 +113,7 @@ class CompressionPresets:
                 "channels": 2
             },
             "filters": ["-movflags", "+faststart"],  # 为Web优化
+            "packaging": {"segment_seconds": 4, "hls_segment_type": "fmp4"},  # 启用HLS/DASH时的分片参数
             "output_format": "mp4"
         },
         
@@ -206,8 +211,8 @@ class CompressionPresets:
     
     @classmethod
     def get_preset(cls, preset_name: str) -> Dict[str, Any]:
-        """获取指定的压缩预设"""
-        return cls.PRESETS.get(preset_name, cls.PRESETS["standard"]).copy()
+        """获取指定的压缩预设（深拷贝，并发任务修改参数时互不影响）"""
+        return copy.deepcopy(cls.PRESETS.get(preset_name, cls.PRESETS["standard"]))
     
     @classmethod
     def get_all_presets(cls) -> Dict[str, Dict[str, Any]]:
@@ -265,8 +270,16 @@ class CompressionPresets:
     @classmethod
     def get_ffmpeg_args(cls, preset: Dict[str, Any], input_file: str, output_file: str,
                        keep_audio: bool = True, custom_resolution: tuple = None,
-                       custom_framerate: float = None) -> List[str]:
-        """将预设转换为FFmpeg命令行参数"""
+                       custom_framerate: float = None, threads: int = None,
+                       source_width: int = 0, crop: Dict[str, int] = None,
+                       source_info: Dict[str, Any] = None) -> List[str]:
+        """
+        将预设转换为FFmpeg命令行参数
+
+        threads为该任务的线程预算（None表示不限制）；crop为黑边检测得到的裁剪区域；
+        source_info为源的探测信息（原始宽高、帧率、场序），用于规划滤镜链。
+        分辨率、帧率、裁剪、去隔行和降噪统一生成一个 -vf；preset["filters"]是附加的封装参数。
+        """
         args = ["-i", input_file]
         
         # 视频编码参数
@@ -287,13 +300,21 @@ class CompressionPresets:
         if video_params.get("tune"):
             args.extend(["-tune", video_params["tune"]])
         
-        # 分辨率设置
-        if custom_resolution and custom_resolution[0] and custom_resolution[1]:
-            args.extend(["-s", f"{custom_resolution[0]}x{custom_resolution[1]}"])
+        # 视频滤镜链（裁剪、去隔行、帧率、缩放、降噪）
+        source_info = source_info or {"width": source_width}
+        resolution = None
+        if custom_resolution and (custom_resolution[0] or custom_resolution[1]):
+            resolution = (custom_resolution[0], custom_resolution[1])
+        plan = plan_video_filters(source_info, crop, resolution, custom_framerate,
+                                  preset.get("video_filters"))
+        
+        # 线程参数（按滤镜链输出的宽度）
+        args.extend(codec_thread_args(video_params["codec"], threads, plan["width"] or source_width))
         
-        # 帧率设置
-        if custom_framerate:
-            args.extend(["-r", str(custom_framerate)])
+        if plan["vf"]:
+            args.extend(["-vf", plan["vf"]])
+        if plan["vfr"]:
+            args.extend(["-vsync", "vfr"])  # 保留丢弃重复帧后的时间戳，不补帧
         
         # 音频编码参数
         if keep_audio:
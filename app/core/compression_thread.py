@@ -35,6 +35,7 @@ class CompressionThread(QThread):
         """执行压缩任务"""
         try:
             self.is_running = True
+            video_compressor.reset_cancel()
             
             # 检查参数
             if not self.input_file or not self.output_file:
@@ -84,14 +85,40 @@ class CompressionThread(QThread):
         """错误回调"""
         self.compression_error.emit(error_message)
     
-    def stop_compression(self):
-        """停止压缩任务"""
+    def stop_compression(self, wait_ms: int = 2000) -> bool:
+        """
+        停止压缩任务：终止FFmpeg进程组后等待线程自然退出
+        
+        不再调用QThread.terminate()，强制终止线程可能让锁和临时文件处于不一致状态。
+        
+        Returns:
+            bool: 线程是否已退出
+        """
         if self.is_running:
             video_compressor.cancel_compression()
             self.requestInterruption()
-            self.wait(5000)  # 等待最多5秒
-            if self.isRunning():
-                self.terminate()  # 强制终止
+            if not self.wait(wait_ms):
+                print("压缩线程未能及时退出，FFmpeg进程已终止，线程将在清理后结束")
+                return False
+        return True
+    
+    def pause_compression(self) -> bool:
+        """暂停压缩任务"""
+        return self.is_running and video_compressor.pause_compression()
+    
+    def resume_compression(self) -> bool:
+        """恢复压缩任务"""
+        return self.is_running and video_compressor.resume_compression()
+    
+    def set_background_mode(self, enabled: bool, config: Dict[str, Any] = None) -> bool:
+        """切换当前任务的前台/后台模式"""
+        if not self.is_running:
+            return False
+        return video_compressor.set_background_mode(enabled, config)
+    
+    def is_paused(self) -> bool:
+        """压缩任务是否处于暂停状态"""
+        return self.is_running and video_compressor.is_paused
     
     def get_estimated_output_size(self) -> int:
         """获取估算的输出文件大小"""
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容分析 - 在采样片段上分析画面特征，结果按文件指纹缓存在探测缓存中
+
+重复帧比例：用mpdecimate统计采样片段中可丢弃的重复帧，比例高的（录屏、幻灯片）
+适合丢弃重复帧、输出可变帧率编码。
+
+复杂度：在缩小后的采样片段上统计signalstats（帧间亮度差YDIF、时域离群像素TOUT）和
+scdet场景切换分数，把内容归为静态、人像讲话、高运动或高噪声，并给出建议的预设、CRF和速度预设。
+"""
+
+import copy
+import math
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+from app.core.crop_detect import sample_positions
+from app.core.ffmpeg_manager import ffmpeg_manager
+from app.core.media_probe import media_probe
+from app.core.speed_model import available_cores
+
+
+# 内容模式
+CONTENT_NORMAL = "normal"
+CONTENT_SCREEN = "screen"
+CONTENT_AUTO = "auto"
+
+DEFAULT_SCREEN_CONFIG = {
+    "redundancy_threshold": 0.5,    # 重复帧比例达到此值时按录屏处理
+    "tune_stillimage": True,        # libx264使用tune=stillimage
+}
+
+REDUNDANCY_SAMPLES = 6
+REDUNDANCY_SAMPLE_SECONDS = 3.0
+
+_FRAME_PATTERN = re.compile(r"frame=\s*(\d+)")
+
+# 内容类别
+COMPLEXITY_STATIC = "static"
+COMPLEXITY_TALKING_HEAD = "talking_head"
+COMPLEXITY_HIGH_MOTION = "high_motion"
+COMPLEXITY_NOISY = "noisy"
+
+COMPLEXITY_SAMPLES = 8
+# 分析方法变化时递增，使缓存的旧结果失效（2: 修正指数形式TOUT的解析）
+COMPLEXITY_VERSION = 2
+COMPLEXITY_SAMPLE_SECONDS = 2.0
+# 分析前缩小到此宽度，统计量基本不变而解码后的处理量小得多
+COMPLEXITY_ANALYSIS_WIDTH = 320
+
+# 分类阈值
+STATIC_MAX_MOTION = 1.0         # 平均YDIF低于此值为静态画面
+TALKING_HEAD_MAX_MOTION = 5.0   # 平均YDIF低于此值且切换少为人像讲话
+NOISY_MIN_TOUT = 0.01           # 平均TOUT（时域离群像素比例）高于此值为高噪声
+SCENE_CUT_SCORE = 10.0          # scdet分数高于此值计为一次场景切换
+HIGH_MOTION_MIN_CUTS = 20.0     # 每分钟场景切换次数高于此值按高运动处理
+
+# 各类别的建议参数
+COMPLEXITY_SUGGESTIONS = {
+    COMPLEXITY_STATIC: {"preset": "high_compression", "crf": 26, "encode_preset": "fast"},
+    COMPLEXITY_TALKING_HEAD: {"preset": "standard", "crf": 23, "encode_preset": "medium"},
+    COMPLEXITY_HIGH_MOTION: {"preset": "high_quality", "crf": 20, "encode_preset": "medium"},
+    COMPLEXITY_NOISY: {"preset": "standard", "crf": 24, "encode_preset": "medium",
+                       "video_filters": {"denoise": "light"}},
+}
+
+# 取等号后的整个数值（TOUT用%g输出，很小的值是7.8125e-05这样的指数形式）
+_METRIC_PATTERN = re.compile(r"lavfi\.(signalstats\.YDIF|signalstats\.TOUT|scd\.score)=(\S+)")
+
+
+def parse_metrics(log: str) -> Dict[str, float]:
+    """从metadata=mode=print的日志中累计帧数、YDIF、TOUT和超过阈值的场景切换数"""
+    totals = {"frames": 0, "ydif": 0.0, "tout": 0.0, "cuts": 0}
+    for key, text in _METRIC_PATTERN.findall(log):
+        try:
+            value = float(text)
+        except ValueError:
+            continue
+        if not math.isfinite(value):
+            continue
+        if key == "signalstats.YDIF":
+            totals["frames"] += 1
+            totals["ydif"] += value
+        elif key == "signalstats.TOUT":
+            totals["tout"] += value
+        elif value >= SCENE_CUT_SCORE:
+            totals["cuts"] += 1
+    return totals
+
+
+def classify_complexity(metrics: Dict[str, float]) -> str:
+    """按采样统计量分类（噪声会抬高帧间差，因此先判断噪声）"""
+    if metrics["noise"] >= NOISY_MIN_TOUT:
+        return COMPLEXITY_NOISY
+    if metrics["motion"] < STATIC_MAX_MOTION and metrics["cuts_per_minute"] < HIGH_MOTION_MIN_CUTS:
+        return COMPLEXITY_STATIC
+    if metrics["motion"] < TALKING_HEAD_MAX_MOTION and metrics["cuts_per_minute"] < HIGH_MOTION_MIN_CUTS:
+        return COMPLEXITY_TALKING_HEAD
+    return COMPLEXITY_HIGH_MOTION
+
+
+class ContentAnalyzer:
+    """内容分析器"""
+
+    def __init__(self):
+        self.ffmpeg_manager = ffmpeg_manager
+
+    def redundancy(self, input_file: str, use_cache: bool = True) -> Optional[float]:
+        """
+        重复帧比例（0~1），在若干采样点并行统计mpdecimate丢弃的帧数
+
+        Returns:
+            Optional[float]: 分析失败时返回None
+        """
+        if use_cache:
+            cached = media_probe.cache.get(input_file, "redundancy")
+            if cached is not None:
+                return cached.get("ratio")
+
+        ffmpeg_info = self.ffmpeg_manager.get_ffmpeg_info()
+        info = media_probe.probe(input_file)
+        fps = info.get("fps")
+        if not ffmpeg_info["available"] or not fps:
+            return None
+
+        positions = sample_positions(info.get("duration", 0), REDUNDANCY_SAMPLES)
+        with ThreadPoolExecutor(max_workers=min(len(positions), available_cores()),
+                                thread_name_prefix="redundancy") as executor:
+            results = list(executor.map(
+                lambda position: self._count_kept_frames(ffmpeg_info["path"], input_file, position),
+                positions
+            ))
+
+        samples = [kept for kept in results if kept is not None]
+        if not samples:
+            return None
+        # 采样片段的原始帧数按帧率计算（采样点已避开文件末尾）
+        total = fps * min(REDUNDANCY_SAMPLE_SECONDS, info.get("duration") or REDUNDANCY_SAMPLE_SECONDS) * len(samples)
+        ratio = round(min(1.0, max(0.0, 1 - sum(samples) / total)), 3)
+
+        if use_cache:
+            media_probe.cache.set(input_file, "redundancy", {"ratio": ratio, "samples": len(samples)})
+        return ratio
+
+    def _count_kept_frames(self, ffmpeg_path: str, input_file: str, position: float) -> Optional[int]:
+        """统计采样片段经mpdecimate后保留的帧数"""
+        cmd = [
+            ffmpeg_path, "-hide_banner", "-stats",
+            "-ss", f"{position:.3f}", "-i", input_file,
+            "-t", str(REDUNDANCY_SAMPLE_SECONDS), "-map", "0:v:0",
+            "-vf", "mpdecimate", "-vsync", "vfr", "-an", "-f", "null", "-"
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        except (subprocess.TimeoutExpired, OSError) as e:
+            print(f"重复帧分析失败 ({position}s): {e}")
+            return None
+        matches = _FRAME_PATTERN.findall(result.stderr)
+        return int(matches[-1]) if matches else None
+
+    def complexity(self, input_file: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        分析内容复杂度，在若干采样点并行统计
+
+        Returns:
+            Optional[Dict]: category、motion（平均YDIF）、noise（平均TOUT）、cuts_per_minute、
+                            suggestion（建议的preset/crf/encode_preset）；分析失败时返回None
+        """
+        if use_cache:
+            cached = media_probe.cache.get(input_file, "complexity")
+            if cached is not None and cached.get("version") == COMPLEXITY_VERSION:
+                return cached
+
+        ffmpeg_info = self.ffmpeg_manager.get_ffmpeg_info()
+        info = media_probe.probe(input_file)
+        if not ffmpeg_info["available"]:
+            return None
+
+        positions = sample_positions(info.get("duration", 0), COMPLEXITY_SAMPLES)
+        with ThreadPoolExecutor(max_workers=min(len(positions), available_cores()),
+                                thread_name_prefix="complexity") as executor:
+            results = list(executor.map(
+                lambda position: self._sample_metrics(ffmpeg_info["path"], input_file, position),
+                positions
+            ))
+
+        samples = [result for result in results if result and result["frames"]]
+        if not samples:
+            return None
+        frames = sum(sample["frames"] for sample in samples)
+        analyzed_seconds = min(COMPLEXITY_SAMPLE_SECONDS, info.get("duration") or COMPLEXITY_SAMPLE_SECONDS) * len(samples)
+        metrics = {
+            "motion": round(sum(sample["ydif"] for sample in samples) / frames, 3),
+            "noise": round(sum(sample["tout"] for sample in samples) / frames, 4),
+            "cuts_per_minute": round(sum(sample["cuts"] for sample in samples) * 60 / analyzed_seconds, 1),
+        }
+        category = classify_complexity(metrics)
+        result = dict(metrics, category=category, samples=len(samples), version=COMPLEXITY_VERSION,
+                      suggestion=copy.deepcopy(COMPLEXITY_SUGGESTIONS[category]))
+
+        if use_cache:
+            media_probe.cache.set(input_file, "complexity", result)
+        return result
+
+    def _sample_metrics(self, ffmpeg_path: str, input_file: str, position: float) -> Optional[Dict[str, float]]:
+        """在单个采样点统计每帧的YDIF、TOUT和场景切换分数（逐帧metadata输出到日志）"""
+        cmd = [
+            ffmpeg_path, "-hide_banner", "-nostats",
+            "-ss", f"{position:.3f}", "-i", input_file,
+            "-t", str(COMPLEXITY_SAMPLE_SECONDS), "-map", "0:v:0",
+            "-vf", f"scale={COMPLEXITY_ANALYSIS_WIDTH}:-2:flags=fast_bilinear,"
+                   f"signalstats=stat=tout,scdet=threshold={SCENE_CUT_SCORE},metadata=mode=print",
+            "-an", "-f", "null", "-"
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        except (subprocess.TimeoutExpired, OSError) as e:
+            print(f"复杂度分析失败 ({position}s): {e}")
+            return None
+
+        return parse_metrics(result.stderr)
+
+    def suggest_settings(self, input_file: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        按复杂度分析结果自动选择预设，分析失败时原样返回
+
+        CRF和速度预设只在调用方未设置时填入，不覆盖用户指定或截止时间规划分配的值。
+        """
+        analysis = self.complexity(input_file)
+        if not analysis:
+            return settings
+        suggestion = analysis["suggestion"]
+        print(f"内容类别: {analysis['category']}，建议预设 {suggestion['preset']} CRF {suggestion['crf']}")
+        result = dict(settings, preset=suggestion["preset"])
+        for key in ("crf", "encode_preset"):
+            if settings.get(key) is None:
+                result[key] = suggestion[key]
+        if suggestion.get("video_filters"):
+            result["video_filters"] = dict(suggestion["video_filters"], **(settings.get("video_filters") or {}))
+        return result
+
+    def resolve_content_mode(self, input_file: str, mode: str,
+                             config: Optional[Dict[str, Any]] = None) -> str:
+        """把auto解析为具体的内容模式"""
+        if mode != CONTENT_AUTO:
+            return mode or CONTENT_NORMAL
+        config = dict(DEFAULT_SCREEN_CONFIG, **(config or {}))
+        ratio = self.redundancy(input_file)
+        if ratio is not None and ratio >= config["redundancy_threshold"]:
+            print(f"重复帧比例 {ratio:.0%}，按录屏内容处理")
+            return CONTENT_SCREEN
+        return CONTENT_NORMAL
+
+
+def screen_settings(settings: Dict[str, Any], codec: str,
+                    config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """录屏模式的压缩设置：丢弃重复帧并输出可变帧率，libx264可选tune=stillimage"""
+    config = dict(DEFAULT_SCREEN_CONFIG, **(config or {}))
+    video_filters = dict(settings.get("video_filters") or {}, decimate=True)
+    result = dict(settings, video_filters=video_filters)
+    if config["tune_stillimage"] and codec == "libx264":
+        result["tune"] = "stillimage"
+    return result
+
+
+# 全局内容分析器实例
+content_analyzer = ContentAnalyzer()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成测试素材 - 用FFmpeg lavfi信号源（testsrc2、mandelbrot、noise、smptebars、sine）生成
+覆盖不同分辨率、时长、帧率、编码器、封装格式和画面复杂度的可复现输入集
+
+每个素材由规格字典描述，按规格哈希缓存在缓存目录中，规格不变时直接复用；
+噪声使用固定种子，同一FFmpeg版本下生成的内容完全一致。
+"""
+
+import copy
+import hashlib
+import json
+import os
+import subprocess
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Callable
+from app.core.ffmpeg_manager import ffmpeg_manager
+from app.utils.app_paths import get_cache_dir
+
+
+# 生成方式变化时递增，使旧缓存失效
+CORPUS_VERSION = 1
+
+DEFAULT_SPEC = {
+    "source": "testsrc2",       # testsrc2 / smptebars / mandelbrot / noise / slides
+    "width": 1280,
+    "height": 720,
+    "fps": 30,                  # 可以是 "30000/1001"
+    "duration": 10.0,
+    "codec": "libx264",         # libx264 / libx265 / libvpx-vp9 / mpeg2video
+    "container": "mp4",         # mp4 / mkv / mov / webm / ts
+    "crf": 18,
+    "encode_preset": "veryfast",
+    "noise": 0,                 # 叠加的时域噪声强度（0~100），模拟胶片颗粒和传感器噪声
+    "audio": True,              # 440Hz正弦音轨
+    "seed": 0,
+    "tags": [],
+}
+
+# 默认素材集
+DEFAULT_CORPUS = [
+    {"name": "testsrc2_720p30_h264_mp4", "tags": ["default", "pinning"]},
+    {"name": "testsrc2_1080p30_h264_mp4", "width": 1920, "height": 1080, "duration": 30.0,
+     "tags": ["default", "layout"]},
+    {"name": "bars_480p2997_mpeg2_ts", "source": "smptebars", "width": 720, "height": 480,
+     "fps": "30000/1001", "codec": "mpeg2video", "container": "ts", "tags": ["default", "legacy"]},
+    {"name": "mandelbrot_1080p24_h264_mkv", "source": "mandelbrot", "width": 1920, "height": 1080,
+     "fps": 24, "container": "mkv", "audio": False, "tags": ["default", "complex"]},
+    {"name": "noise_1080p30_h264_mp4", "source": "noise", "width": 1920, "height": 1080,
+     "duration": 6.0, "tags": ["default", "complex"]},
+    {"name": "grain_720p24_vp9_webm", "noise": 25, "fps": 24, "codec": "libvpx-vp9",
+     "container": "webm", "tags": ["default", "noisy"]},
+    {"name": "testsrc2_1080p60_hevc_mp4", "width": 1920, "height": 1080, "fps": 60,
+     "codec": "libx265", "tags": ["default", "hevc"]},
+    {"name": "testsrc2_2160p30_h264_mov", "width": 3840, "height": 2160, "duration": 5.0,
+     "container": "mov", "tags": ["default", "uhd"]},
+    {"name": "slides_1080p30_h264_mp4", "source": "slides", "width": 1920, "height": 1080,
+     "duration": 30.0, "tags": ["default", "screen"]},
+    {"name": "long_360p30_h264_mp4", "width": 640, "height": 360, "duration": 120.0,
+     "tags": ["long"]},
+]
+
+# 各封装格式默认的音频编码器
+AUDIO_CODECS = {
+    "webm": ["-c:a", "libopus", "-b:a", "96k"],
+    "ts": ["-c:a", "mp2", "-b:a", "192k"],
+}
+DEFAULT_AUDIO_CODEC = ["-c:a", "aac", "-b:a", "128k"]
+
+CONTAINER_FORMATS = {"mp4": "mp4", "mkv": "matroska", "mov": "mov", "webm": "webm", "ts": "mpegts"}
+
+
+def make_spec(**overrides) -> Dict[str, Any]:
+    """以默认值补全素材规格"""
+    spec = copy.deepcopy(DEFAULT_SPEC)
+    spec.update(overrides)
+    return spec
+
+
+def spec_hash(spec: Dict[str, Any]) -> str:
+    """规格哈希（不含名称和标签，这两项不影响生成内容）"""
+    content = {key: value for key, value in spec.items() if key not in ("name", "tags")}
+    text = json.dumps(dict(content, version=CORPUS_VERSION), sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def _video_source(spec: Dict[str, Any]) -> str:
+    """lavfi视频源描述"""
+    size = f"{spec['width']}x{spec['height']}"
+    rate = spec["fps"]
+    source = spec["source"]
+    if source == "smptebars":
+        graph = f"smptebars=size={size}:rate={rate}"
+    elif source == "mandelbrot":
+        graph = f"mandelbrot=size={size}:rate={rate}"
+    elif source == "noise":
+        # 全画面随机噪声，最难压缩
+        graph = f"color=c=gray:size={size}:rate={rate},noise=alls=80:allf=t+u:all_seed={spec['seed']}"
+    elif source == "slides":
+        # 每两秒换一页，其余帧完全重复（录屏、幻灯片）
+        graph = f"testsrc2=size={size}:rate=0.5,fps={rate}"
+    elif source == "testsrc2":
+        graph = f"testsrc2=size={size}:rate={rate}"
+    else:
+        raise ValueError(f"不支持的素材信号源: {source}")
+
+    if spec.get("noise"):
+        graph += f",noise=alls={spec['noise']}:allf=t:all_seed={spec['seed'] + 1}"
+    return graph + f",format=yuv420p,trim=duration={spec['duration']}"
+
+
+def _video_codec_args(spec: Dict[str, Any]) -> List[str]:
+    """素材的视频编码参数"""
+    codec = spec["codec"]
+    if codec == "libvpx-vp9":
+        return ["-c:v", codec, "-crf", str(spec["crf"]), "-b:v", "0",
+                "-deadline", "realtime", "-cpu-used", "8", "-row-mt", "1"]
+    if codec == "mpeg2video":
+        return ["-c:v", codec, "-q:v", "3"]
+    args = ["-c:v", codec, "-crf", str(spec["crf"]), "-preset", spec["encode_preset"]]
+    if codec == "libx265":
+        args.extend(["-x265-params", "log-level=error"])
+        if spec["container"] in ("mp4", "mov"):
+            args.extend(["-tag:v", "hvc1"])
+    return args
+
+
+def build_generate_command(ffmpeg_path: str, spec: Dict[str, Any], output_file: str) -> List[str]:
+    """生成素材的FFmpeg命令（bitexact避免写入版本号等随环境变化的元数据）"""
+    cmd = [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y",
+           "-f", "lavfi", "-i", _video_source(spec)]
+    if spec["audio"]:
+        cmd.extend(["-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={spec['duration']}"])
+    cmd.extend(["-map", "0:v:0"])
+    cmd.extend(_video_codec_args(spec))
+    if spec["audio"]:
+        cmd.extend(["-map", "1:a:0"])
+        cmd.extend(AUDIO_CODECS.get(spec["container"], DEFAULT_AUDIO_CODEC))
+    cmd.extend(["-map_metadata", "-1", "-fflags", "+bitexact", "-flags:v", "+bitexact"])
+    if spec["audio"]:
+        cmd.extend(["-flags:a", "+bitexact"])
+    cmd.extend(["-f", CONTAINER_FORMATS.get(spec["container"], spec["container"]), output_file])
+    return cmd
+
+
+def corpus_path(spec: Dict[str, Any], corpus_dir: Optional[Path] = None) -> Path:
+    """素材在缓存中的路径：<名称>-<规格哈希>.<扩展名>"""
+    corpus_dir = corpus_dir or get_cache_dir("corpus")
+    name = spec.get("name") or spec["source"]
+    return corpus_dir / f"{name}-{spec_hash(spec)}.{spec['container']}"
+
+
+def ensure_clip(spec: Dict[str, Any], force: bool = False,
+                corpus_dir: Optional[Path] = None) -> Optional[str]:
+    """
+    生成（或复用缓存的）素材
+
+    Returns:
+        Optional[str]: 素材路径，FFmpeg不可用或生成失败时返回None
+    """
+    spec = make_spec(**spec)
+    path = corpus_path(spec, corpus_dir)
+    if not force and path.exists() and path.stat().st_size > 0:
+        return str(path)
+
+    ffmpeg_info = ffmpeg_manager.get_ffmpeg_info()
+    if not ffmpeg_info["available"]:
+        print("FFmpeg不可用，无法生成测试素材")
+        return None
+
+    # 先写临时文件，中断时不会留下被当作缓存的半成品
+    temp_file = f"{path}.partial"
+    cmd = build_generate_command(ffmpeg_info["path"], spec, temp_file)
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except OSError as e:
+        print(f"生成测试素材失败 ({path.name}): {e}")
+        return None
+    if result.returncode != 0:
+        print(f"生成测试素材失败 ({path.name}): {result.stderr.strip()[:200]}")
+        Path(temp_file).unlink(missing_ok=True)
+        return None
+    os.replace(temp_file, path)
+    return str(path)
+
+
+def select_specs(names: Optional[List[str]] = None, tags: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """按名称或标签选择默认素材集中的规格（都为空时选择带default标签的）"""
+    specs = [make_spec(**spec) for spec in DEFAULT_CORPUS]
+    if names:
+        unknown = set(names) - {spec["name"] for spec in specs}
+        if unknown:
+            raise ValueError(f"未知的测试素材: {', '.join(sorted(unknown))}")
+        return [spec for spec in specs if spec["name"] in names]
+    tags = tags or ["default"]
+    return [spec for spec in specs if set(tags) & set(spec["tags"])]
+
+
+def generate_corpus(names: Optional[List[str]] = None, tags: Optional[List[str]] = None,
+                    force: bool = False,
+                    progress_callback: Optional[Callable[[str], None]] = None) -> List[Dict[str, Any]]:
+    """
+    生成选中的素材
+
+    Returns:
+        List[Dict]: 每个素材的 name、hash、path（生成失败时为None）
+    """
+    results = []
+    for spec in select_specs(names, tags):
+        if progress_callback:
+            progress_callback(f"准备测试素材 {spec['name']}...")
+        results.append({"name": spec["name"], "hash": spec_hash(spec), "path": ensure_clip(spec, force)})
+    return results
+
+
+def corpus_inputs(names: Optional[List[str]] = None, tags: Optional[List[str]] = None) -> List[str]:
+    """基准测试使用的素材路径（只返回生成成功的）"""
+    return [item["path"] for item in generate_corpus(names, tags) if item["path"]]
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU拓扑与绑定 - 发现NUMA节点，并按节点为并发的FFmpeg进程分配CPU集合
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Hashable, Callable
+
+
+NUMA_NODE_DIR = Path("/sys/devices/system/node")
+
+
+def parse_cpu_list(text: str) -> List[int]:
+    """解析内核CPU列表格式，如 "0-3,8-11" """
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def allowed_cpus() -> List[int]:
+    """当前进程允许使用的CPU"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def discover_numa_nodes() -> Dict[int, List[int]]:
+    """
+    读取 /sys/devices/system/node 获取各NUMA节点的CPU（仅保留当前进程允许的CPU）
+
+    不支持NUMA信息的平台返回单个节点。
+    """
+    allowed = set(allowed_cpus())
+    nodes = {}
+    try:
+        for node_dir in sorted(NUMA_NODE_DIR.glob("node[0-9]*")):
+            node_id = int(node_dir.name[4:])
+            cpus = [cpu for cpu in parse_cpu_list((node_dir / "cpulist").read_text()) if cpu in allowed]
+            if cpus:
+                nodes[node_id] = cpus
+    except (OSError, ValueError) as e:
+        print(f"读取NUMA拓扑失败: {e}")
+        nodes = {}
+
+    return nodes or {0: sorted(allowed)}
+
+
+def make_affinity_setter(cpus: List[int]) -> Callable[[], None]:
+    """生成在子进程中设置CPU亲和性的函数（用于preexec_fn）"""
+    cpu_set = set(cpus)
+
+    def set_affinity():
+        os.sched_setaffinity(0, cpu_set)
+
+    return set_affinity
+
+
+class CpuPinningPlanner:
+    """按NUMA节点打包分配CPU集合，同一任务尽量留在一个节点内"""
+
+    def __init__(self, nodes: Optional[Dict[int, List[int]]] = None):
+        self.nodes = nodes or discover_numa_nodes()
+        self.assignments: Dict[Hashable, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def _free_cpus(self) -> Dict[int, List[int]]:
+        """各节点中尚未分配的CPU"""
+        used = {cpu for cpus in self.assignments.values() for cpu in cpus}
+        return {node: [cpu for cpu in cpus if cpu not in used] for node, cpus in self.nodes.items()}
+
+    def assign(self, job_id: Hashable, cpu_count: int) -> List[int]:
+        """
+        为任务分配cpu_count个CPU
+
+        优先选择能完整容纳的节点中空闲CPU最少的那个（紧凑打包，给后续大任务留出整节点），
+        都放不下时从空闲最多的节点开始跨节点分配。所有CPU都已分配时退化为共享整个节点。
+        """
+        with self._lock:
+            free = self._free_cpus()
+            cpu_count = max(1, cpu_count)
+
+            fitting = [node for node, cpus in free.items() if len(cpus) >= cpu_count]
+            if fitting:
+                node = min(fitting, key=lambda n: len(free[n]))
+                chosen = free[node][:cpu_count]
+            else:
+                chosen = []
+                for node in sorted(free, key=lambda n: -len(free[n])):
+                    chosen.extend(free[node][:cpu_count - len(chosen)])
+                    if len(chosen) >= cpu_count:
+                        break
+
+            if not chosen:
+                # 已无空闲CPU：与负载最轻的节点共享
+                node = min(self.nodes, key=lambda n: self._node_load(n))
+                chosen = list(self.nodes[node])
+
+            self.assignments[job_id] = chosen
+            return list(chosen)
+
+    def _node_load(self, node: int) -> int:
+        """节点上已分配的任务数"""
+        node_cpus = set(self.nodes[node])
+        return sum(1 for cpus in self.assignments.values() if node_cpus & set(cpus))
+
+    def release(self, job_id: Hashable):
+        """释放任务占用的CPU"""
+        with self._lock:
+            self.assignments.pop(job_id, None)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+黑边检测 - 在若干采样点并行运行cropdetect（-ss放在-i之前，只解码采样片段），
+投票得到稳定的裁剪区域，结果按文件指纹缓存在探测缓存中
+"""
+
+import re
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+from app.core.ffmpeg_manager import ffmpeg_manager
+from app.core.media_probe import media_probe
+from app.core.speed_model import available_cores
+
+
+DEFAULT_SAMPLE_COUNT = 8
+SAMPLE_SECONDS = 1.0
+
+# 投票一致比例低于此值时取所有采样的并集（宁可少裁也不裁掉画面）
+MIN_AGREEMENT = 0.6
+# 裁掉的像素比例低于此值时不裁剪
+MIN_CROP_RATIO = 0.02
+
+_CROP_PATTERN = re.compile(r"crop=(\d+):(\d+):(\d+):(\d+)")
+
+
+def sample_positions(duration: float, count: int) -> List[float]:
+    """在片头片尾各留5%后均匀分布的采样时间点（避开黑场开头和字幕结尾）"""
+    if duration <= SAMPLE_SECONDS:
+        return [0.0]
+    start, end = duration * 0.05, duration * 0.95 - SAMPLE_SECONDS
+    if end <= start:
+        return [0.0]
+    step = (end - start) / max(count - 1, 1)
+    return [round(start + step * i, 3) for i in range(count)]
+
+
+def vote_crop(samples: List[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
+    """多数一致时取众数，否则取并集"""
+    if not samples:
+        return None
+    rect, votes = Counter(samples).most_common(1)[0]
+    if votes / len(samples) >= MIN_AGREEMENT:
+        return rect
+
+    left = min(x for _, _, x, _ in samples)
+    top = min(y for _, _, _, y in samples)
+    right = max(x + w for w, _, x, _ in samples)
+    bottom = max(y + h for _, h, _, y in samples)
+    return right - left, bottom - top, left, top
+
+
+class CropDetector:
+    """黑边检测器"""
+
+    def __init__(self):
+        self.ffmpeg_manager = ffmpeg_manager
+
+    def detect(self, input_file: str, sample_count: int = DEFAULT_SAMPLE_COUNT,
+               use_cache: bool = True) -> Optional[Dict[str, int]]:
+        """
+        检测黑边
+
+        Returns:
+            Optional[Dict]: 裁剪区域 {"width", "height", "x", "y"}，无需裁剪或检测失败时返回None
+        """
+        if use_cache:
+            cached = media_probe.cache.get(input_file, "crop")
+            if cached is not None:
+                return cached.get("crop")
+
+        ffmpeg_info = self.ffmpeg_manager.get_ffmpeg_info()
+        info = media_probe.probe(input_file)
+        if not ffmpeg_info["available"] or not info.get("width") or not info.get("height"):
+            return None
+
+        positions = sample_positions(info.get("duration", 0), sample_count)
+        workers = min(len(positions), available_cores())
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cropdetect") as executor:
+            results = list(executor.map(
+                lambda position: self._detect_at(ffmpeg_info["path"], input_file, position), positions
+            ))
+
+        rect = vote_crop([result for result in results if result])
+        crop = None
+        if rect:
+            width, height, x, y = rect
+            cropped_ratio = 1 - (width * height) / (info["width"] * info["height"])
+            if width > 0 and height > 0 and cropped_ratio >= MIN_CROP_RATIO:
+                crop = {"width": width, "height": height, "x": x, "y": y}
+
+        if crop:
+            print(f"检测到黑边，裁剪为 {crop['width']}x{crop['height']}+{crop['x']}+{crop['y']}")
+        if use_cache:
+            media_probe.cache.set(input_file, "crop", {"crop": crop, "samples": len(positions)})
+        return crop
+
+    def _detect_at(self, ffmpeg_path: str, input_file: str,
+                   position: float) -> Optional[Tuple[int, int, int, int]]:
+        """在单个采样点运行cropdetect，返回最后一次检测结果 (w, h, x, y)"""
+        cmd = [
+            ffmpeg_path, "-hide_banner", "-nostats",
+            "-ss", f"{position:.3f}", "-i", input_file,
+            "-t", str(SAMPLE_SECONDS), "-map", "0:v:0",
+            "-vf", "cropdetect=limit=24:round=2:reset=0",
+            "-an", "-f", "null", "-"
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        except (subprocess.TimeoutExpired, OSError) as e:
+            print(f"黑边检测失败 ({position}s): {e}")
+            return None
+
+        matches = _CROP_PATTERN.findall(result.stderr)
+        if not matches:
+            return None
+        return tuple(int(value) for value in matches[-1])
+
+
+# 全局黑边检测器实例
+crop_detector = CropDetector()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截止时间规划 - 给定批量任务的完成时限，按速度模型和探测时长为每个x264/x265任务
+选择仍能按时完成的最慢速度预设；任务实际耗时与预测不符时修正系数并重新规划
+"""
+
+import threading
+import time
+from typing import Dict, Any, Optional, List
+from app.core.speed_model import SPEED_PRESETS, available_cores, estimate_encode_fps
+
+
+# 支持按截止时间调整速度预设的编码器
+DEADLINE_CODECS = ("libx264", "libx265")
+
+DEFAULT_DEADLINE_CONFIG = {
+    "slowest_preset": "slow",       # 时间充裕时最慢使用的速度预设
+    "fastest_preset": "ultrafast",  # 时间再紧也不快于此预设
+    "safety_margin": 0.1,           # 预留的时间比例（应对预测误差和收尾开销）
+    "correction_weight": 0.5,       # 实际/预测耗时比的滑动平均权重
+}
+
+
+class DeadlinePlanner:
+    """按截止时间为排队任务选择速度预设"""
+
+    def __init__(self, deadline: float, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            deadline: 批量任务的完成时限（time.time()时间戳）
+        """
+        self.deadline = deadline
+        self.config = dict(DEFAULT_DEADLINE_CONFIG, **(config or {}))
+        self.correction = 1.0
+        self._lock = threading.Lock()
+        slowest = SPEED_PRESETS.index(self.config["slowest_preset"])
+        fastest = SPEED_PRESETS.index(self.config["fastest_preset"])
+        # 由慢到快排列的候选预设
+        self.candidates = SPEED_PRESETS[fastest:slowest + 1][::-1]
+
+    def estimate_seconds(self, workload: Dict[str, Any], preset: str, threads: int) -> float:
+        """按速度模型和修正系数估算编码耗时"""
+        fps = estimate_encode_fps(workload["codec"], preset, workload["width"], workload["height"], threads)
+        return workload["frames"] / fps * self.correction
+
+    def plan(self, pending: List[Dict[str, Any]], running_remaining: List[float],
+             slots: int, now: Optional[float] = None) -> Dict[Any, Dict[str, Any]]:
+        """
+        为排队任务选择速度预设
+
+        所有任务先取最慢的候选预设；总耗时超出可用时间时，反复把预计耗时最长的任务加快一档。
+
+        Args:
+            pending: [{"key", "workload"}, ...]，workload为eta.encode_workload的结果（调用方预先探测，
+                     规划时不再探测，可以在调度锁内调用）
+            running_remaining: 运行中任务的预计剩余秒数
+            slots: 并发槽位数
+
+        Returns:
+            Dict: key -> {"encode_preset", "seconds"}（不支持的任务不在结果中）
+        """
+        now = now or time.time()
+        slots = max(1, slots)
+        threads = max(1, available_cores() // slots)
+        remaining = (self.deadline - now) * (1 - self.config["safety_margin"])
+        capacity = remaining * slots - sum(running_remaining)
+
+        # 只调整x264/x265任务
+        workloads = {item["key"]: item["workload"] for item in pending
+                     if item.get("workload") and item["workload"]["codec"] in DEADLINE_CODECS}
+
+        levels = {key: 0 for key in workloads}
+        with self._lock:
+            seconds = {key: self.estimate_seconds(workload, self.candidates[0], threads)
+                       for key, workload in workloads.items()}
+            while sum(seconds.values()) > capacity:
+                adjustable = [key for key in workloads if levels[key] < len(self.candidates) - 1]
+                if not adjustable:
+                    break
+                key = max(adjustable, key=lambda k: seconds[k])
+                levels[key] += 1
+                seconds[key] = self.estimate_seconds(workloads[key], self.candidates[levels[key]], threads)
+
+        if workloads and sum(seconds.values()) > capacity:
+            print("按最快速度预设也无法在截止时间前完成全部任务")
+        return {key: {"encode_preset": self.candidates[levels[key]], "seconds": seconds[key]}
+                for key in workloads}
+
+    def observe(self, predicted_seconds: float, actual_seconds: float):
+        """任务完成后用实际编码耗时（不含探测分析和被抢占的时间）修正之后的预测"""
+        if predicted_seconds <= 0 or actual_seconds <= 0:
+            return
+        # 预测值已包含当前修正系数，比值直接作用在系数上
+        ratio = actual_seconds / predicted_seconds
+        weight = self.config["correction_weight"]
+        with self._lock:
+            self.correction *= (1 - weight) + weight * ratio
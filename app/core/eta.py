@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预计剩余时间 - 融合帧数进度、平滑后的实测编码速度和主机校准的预期速度，
+给出单个任务和整个队列的预计剩余时间
+
+刚开始时实测速度不稳定（编码器预热、前瞻缓冲），以速度模型的预期值为主，
+随着已编码时间增加逐步过渡到实测值。
+"""
+
+import heapq
+import time
+from collections import deque
+from typing import Dict, Any, Optional, List
+from app.core.compression_presets import compression_presets
+from app.core.filter_graph import fit_resolution
+from app.core.media_probe import media_probe
+from app.core.speed_model import estimate_encode_fps
+
+
+# 实测速度完全取代预期速度所需的编码时间（秒）
+WARMUP_SECONDS = 10.0
+# 计算实测速度的滑动窗口（秒）
+RATE_WINDOW_SECONDS = 30.0
+# 窗口速度的指数平滑系数
+RATE_SMOOTHING = 0.2
+
+
+def encode_workload(input_file: str, settings: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    任务的编码工作量：编码器、速度预设、输出时长、输出帧数和输出尺寸，探测不到时长时返回None
+
+    合并任务（settings中有merge_inputs）的时长和帧数是各分段之和，尺寸取第一个分段（与拼接输出一致）。
+    """
+    preset_data = compression_presets.get_preset(settings.get("preset", "standard"))
+    infos = [media_probe.probe(path) for path in settings.get("merge_inputs") or [input_file]]
+    if not infos or not all(info.get("duration") for info in infos):
+        return None
+    target_fps = (settings.get("framerate") or {}).get("fps")
+    duration = sum(info["duration"] for info in infos)
+    frames = sum(info["duration"] * (target_fps or info.get("fps") or 30) for info in infos)
+    info = infos[0]
+    width, height = info.get("width", 0), info.get("height", 0)
+    resolution = settings.get("resolution") or {}
+    fitted = fit_resolution(width, height, resolution.get("width"), resolution.get("height"))
+    if fitted:
+        width, height = fitted
+    return {
+        "codec": settings.get("video_codec") or preset_data["video"]["codec"],
+        "preset": settings.get("encode_preset") or preset_data["video"]["preset"],
+        "duration": duration,
+        "frames": frames,
+        "width": width,
+        "height": height,
+    }
+
+
+def workload_seconds(workload: Dict[str, Any], preset: Optional[str] = None,
+                     threads: Optional[int] = None) -> float:
+    """按速度模型估算编码工作量的耗时（preset为空时使用工作量中的速度预设），不做探测"""
+    fps = estimate_encode_fps(workload["codec"], preset or workload["preset"], workload["width"],
+                              workload["height"], threads)
+    return workload["frames"] / fps
+
+
+def estimate_job_seconds(input_file: str, settings: Dict[str, Any], threads: Optional[int] = None) -> Optional[float]:
+    """按速度模型估算尚未开始的任务的编码耗时"""
+    workload = encode_workload(input_file, settings)
+    if not workload:
+        return None
+    return workload_seconds(workload, threads=threads or settings.get("threads"))
+
+
+def queue_eta(running_remaining: List[float], pending_seconds: List[float], slots: int) -> float:
+    """按槽位模拟调度：每个排队任务交给最早空闲的槽位，返回全部完成还需的秒数"""
+    slots = max(1, slots)
+    finish = sorted(running_remaining)[-slots:] if running_remaining else []
+    finish += [0.0] * (slots - len(finish))
+    heapq.heapify(finish)
+    for seconds in pending_seconds:
+        heapq.heappush(finish, heapq.heappop(finish) + seconds)
+    return max(finish)
+
+
+class EtaEstimator:
+    """单个编码进程的进度和剩余时间估算"""
+
+    def __init__(self, total_frames: float = 0, duration: float = 0,
+                 expected_fps: Optional[float] = None, count_frames: bool = True):
+        """
+        Args:
+            total_frames: 预计输出帧数（0表示未知）
+            duration: 输出时长（秒，0表示未知）
+            expected_fps: 速度模型给出的预期编码帧率
+            count_frames: 输出帧数与进度成正比时为True（丢弃重复帧时只能按时间计算）
+        """
+        self.total_frames = total_frames if count_frames else 0
+        self.expected_frames = total_frames
+        self.duration = duration
+        self.expected_fps = expected_fps
+        self.frame = 0
+        self.out_time = 0.0
+        self.start_time = None
+        self.paused_at = None
+        self.samples = deque()
+        self.smoothed_rate = None
+
+    def _fraction(self) -> Optional[float]:
+        """已完成比例：优先按帧数，其次按输出时间"""
+        if self.total_frames and self.frame:
+            return min(1.0, self.frame / self.total_frames)
+        if self.duration and self.out_time:
+            return min(1.0, self.out_time / self.duration)
+        return None
+
+    def update(self, frame: Optional[int] = None, out_time: Optional[float] = None,
+               now: Optional[float] = None):
+        """记录FFmpeg报告的已编码帧数或输出时间"""
+        now = now or time.time()
+        if self.paused_at is not None:
+            return
+        if frame is not None:
+            self.frame = max(self.frame, frame)
+        if out_time is not None:
+            self.out_time = max(self.out_time, out_time)
+
+        fraction = self._fraction()
+        if fraction is None:
+            return
+        if self.start_time is None:
+            self.start_time = now
+        self.samples.append((now, fraction))
+        while len(self.samples) > 2 and now - self.samples[0][0] > RATE_WINDOW_SECONDS:
+            self.samples.popleft()
+
+        first_time, first_fraction = self.samples[0]
+        if now - first_time > 0 and fraction > first_fraction:
+            # 完成比例/秒
+            rate = (fraction - first_fraction) / (now - first_time)
+            if self.smoothed_rate is None:
+                self.smoothed_rate = rate
+            else:
+                self.smoothed_rate += RATE_SMOOTHING * (rate - self.smoothed_rate)
+
+    def pause(self):
+        """暂停期间不计入耗时"""
+        if self.paused_at is None:
+            self.paused_at = time.time()
+
+    def resume(self):
+        """恢复后把暂停的时长从各采样点中扣除"""
+        if self.paused_at is None:
+            return
+        paused = time.time() - self.paused_at
+        self.paused_at = None
+        self.samples = deque((sample_time + paused, fraction) for sample_time, fraction in self.samples)
+        if self.start_time is not None:
+            self.start_time += paused
+
+    def _expected_rate(self) -> Optional[float]:
+        """按速度模型预期的完成比例/秒"""
+        if not self.expected_fps or not self.expected_frames:
+            return None
+        return self.expected_fps / self.expected_frames
+
+    def progress(self) -> Optional[int]:
+        """进度百分比，无法确定时返回None"""
+        fraction = self._fraction()
+        return None if fraction is None else min(100, int(fraction * 100))
+
+    def eta_seconds(self, now: Optional[float] = None) -> Optional[float]:
+        """预计剩余秒数"""
+        fraction = self._fraction()
+        expected = self._expected_rate()
+        if fraction is None:
+            # 还没有进度时按预期速度估算整体耗时
+            return 1.0 / expected if expected else None
+
+        now = self.paused_at or now or time.time()
+        measured = self.smoothed_rate
+        elapsed = now - self.start_time if self.start_time is not None else 0.0
+        if measured and expected:
+            weight = min(1.0, elapsed / WARMUP_SECONDS)
+            rate = weight * measured + (1 - weight) * expected
+        else:
+            rate = measured or expected
+        if not rate:
+            return None
+        return max(0.0, (1.0 - fraction) / rate)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """进度快照"""
+        eta = self.eta_seconds()
+        return {
+            "progress": self.progress(),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "frame": self.frame,
+            "out_time": round(self.out_time, 3),
+        }
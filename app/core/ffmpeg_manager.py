@@ -58,6 +58,18 @@ class FFmpegManager:
         
         return None
     
+    def get_ffprobe_path(self) -> Optional[str]:
+        """获取FFprobe可执行文件路径（优先与FFmpeg同目录）"""
+        ffmpeg_path = self.get_ffmpeg_path()
+        probe_name = "ffprobe.exe" if self.system == "windows" else "ffprobe"
+        
+        if ffmpeg_path:
+            sibling = Path(ffmpeg_path).parent / probe_name
+            if sibling.exists() and os.access(sibling, os.X_OK):
+                return str(sibling)
+        
+        return shutil.which("ffprobe")
+    
     def check_system_ffmpeg(self) -> Optional[str]:
         """检查系统是否已安装FFmpeg"""
         try:
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视频滤镜链 - 把裁剪、去隔行、帧率、缩放、降噪按代价排序组合成一个 -vf 字符串
+
+顺序：裁剪 -> 去隔行（必须在原始场结构上进行）-> 降帧 -> 丢弃重复帧 -> 缩小 -> 降噪 -> 升帧，
+先减少帧数和像素再做昂贵的处理；等价于无操作的滤镜不输出，也不会放大到超过源分辨率。
+"""
+
+from typing import Dict, Any, Optional, List
+
+
+# 缩放算法
+SCALER_FAST = "fast"
+SCALER_BALANCED = "balanced"
+SCALER_QUALITY = "quality"
+
+SCALER_FLAGS = {
+    SCALER_FAST: "fast_bilinear",
+    SCALER_BALANCED: "bicubic",
+    SCALER_QUALITY: "lanczos",
+}
+
+# 去隔行：auto只处理标记为隔行的帧
+DEINTERLACE_OFF = "off"
+DEINTERLACE_AUTO = "auto"
+DEINTERLACE_ON = "on"
+
+INTERLACED_FIELD_ORDERS = {"tt", "bb", "tb", "bt"}
+
+# hqdn3d降噪强度
+DENOISE_LEVELS = {
+    "light": "hqdn3d=2:1:2:3",
+    "medium": "hqdn3d=4:3:6:4.5",
+    "strong": "hqdn3d=6:4:9:6.75",
+}
+
+DEFAULT_FILTER_OPTIONS = {
+    "scaler": SCALER_BALANCED,
+    "deinterlace": DEINTERLACE_AUTO,
+    "denoise": None,
+    "decimate": False,      # 丢弃重复帧（mpdecimate），输出可变帧率
+}
+
+# 帧率相差小于此值视为相同
+FPS_TOLERANCE = 0.01
+
+
+def _even(value: float) -> int:
+    """取不小于2的偶数（yuv420p要求宽高为偶数）"""
+    return max(2, int(round(value / 2)) * 2)
+
+
+def fit_resolution(source_width: int, source_height: int, target_width: Optional[int],
+                   target_height: Optional[int]) -> Optional[tuple]:
+    """
+    在目标框内保持宽高比缩放（只缩小不放大），返回 (宽, 高)；无需缩放时返回None
+
+    目标宽或高为空时按另一边等比计算。
+    """
+    if not source_width or not source_height or not (target_width or target_height):
+        return None
+
+    scale = min(
+        (target_width / source_width) if target_width else 1.0,
+        (target_height / source_height) if target_height else 1.0,
+        1.0,
+    )
+    width, height = _even(source_width * scale), _even(source_height * scale)
+    if width >= source_width and height >= source_height:
+        return None
+    return width, height
+
+
+def plan_video_filters(source: Dict[str, Any], crop: Optional[Dict[str, int]] = None,
+                       resolution: Optional[tuple] = None, fps: Optional[float] = None,
+                       options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    规划滤镜链
+
+    Args:
+        source: 探测信息（width、height为原始尺寸，fps、field_order）
+        crop: 黑边裁剪区域 {"width", "height", "x", "y"}
+        resolution: 目标分辨率框 (宽, 高)，任一边可为空
+        fps: 目标帧率
+        options: scaler、deinterlace、denoise、decimate，见DEFAULT_FILTER_OPTIONS
+
+    Returns:
+        Dict: filters（滤镜列表）、vf（逗号连接的字符串，可能为空）、width、height、fps（输出参数）、
+              vfr（是否需要以可变帧率输出）
+    """
+    options = dict(DEFAULT_FILTER_OPTIONS, **(options or {}))
+    width, height = source.get("width", 0), source.get("height", 0)
+    source_fps = source.get("fps") or 0.0
+    filters: List[str] = []
+
+    # 裁剪（与原尺寸相同的裁剪是无操作）
+    if crop and (crop["width"], crop["height"]) != (width, height):
+        filters.append(f"crop={crop['width']}:{crop['height']}:{crop['x']}:{crop['y']}")
+        width, height = crop["width"], crop["height"]
+
+    # 去隔行
+    deinterlace = options.get("deinterlace") or DEINTERLACE_OFF
+    if deinterlace == DEINTERLACE_ON or (
+            deinterlace == DEINTERLACE_AUTO and source.get("field_order") in INTERLACED_FIELD_ORDERS):
+        mode = "all" if deinterlace == DEINTERLACE_ON else "interlaced"
+        filters.append(f"yadif=mode=send_frame:parity=auto:deint={mode}")
+
+    # 降帧在缩放和降噪之前，升帧放在最后
+    fps_filter = None
+    output_fps = source_fps
+    if fps and (not source_fps or abs(fps - source_fps) > FPS_TOLERANCE):
+        fps_filter = f"fps={fps:g}"
+        output_fps = fps
+        if source_fps and fps < source_fps:
+            filters.append(fps_filter)
+            fps_filter = None
+
+    # 丢弃重复帧；之后再升帧会重新插入重复帧，因此不再升帧
+    decimate = bool(options.get("decimate"))
+    if decimate:
+        filters.append("mpdecimate")
+        if fps_filter:
+            fps_filter = None
+            output_fps = source_fps
+
+    # 缩小（保持宽高比，不放大）
+    if resolution:
+        flags = SCALER_FLAGS.get(options.get("scaler"), SCALER_FLAGS[SCALER_BALANCED])
+        if width and height:
+            fitted = fit_resolution(width, height, resolution[0], resolution[1])
+            if fitted:
+                filters.append(f"scale={fitted[0]}:{fitted[1]}:flags={flags}")
+                width, height = fitted
+        else:
+            # 源尺寸未知时交给scale滤镜按比例计算，目标框与源尺寸取小，保证不放大（逗号需转义）
+            target_width = f"min(iw\\,{resolution[0]})" if resolution[0] else "-2"
+            target_height = f"min(ih\\,{resolution[1]})" if resolution[1] else "-2"
+            if resolution[0] and resolution[1]:
+                filters.append(f"scale={target_width}:{target_height}:force_original_aspect_ratio=decrease:"
+                               f"force_divisible_by=2:flags={flags}")
+            else:
+                filters.append(f"scale={target_width}:{target_height}:flags={flags}")
+            width, height = resolution[0] or 0, resolution[1] or 0
+
+    # 降噪在缩小之后，处理的像素更少
+    denoise = options.get("denoise")
+    if denoise:
+        filters.append(DENOISE_LEVELS.get(denoise, denoise))
+
+    if fps_filter:
+        filters.append(fps_filter)
+
+    return {
+        "filters": filters,
+        "vf": ",".join(filters),
+        "width": width,
+        "height": height,
+        "fps": output_fps,
+        "vfr": decimate,
+    }
+
+
+def scale_filter(height: int, width: Optional[int] = None, scaler: Optional[str] = None) -> str:
+    """按高度缩放（宽度按比例取偶数），用于多码率的各路分支"""
+    flags = SCALER_FLAGS.get(scaler, SCALER_FLAGS[SCALER_BALANCED])
+    return f"scale={width or -2}:{height}:flags={flags}"
@@ -0,0 +1,642 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩任务调度器 - 带优先级、抢占和老化的批量压缩队列，可按截止时间选择速度预设
+"""
+
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Callable, List
+from app.core.video_compressor import VideoCompressor
+from app.core import process_control
+from app.core.thread_planner import ThreadBudgetPlanner
+from app.core.cpu_topology import CpuPinningPlanner
+from app.core.storage import DeviceScheduler
+from app.core.prefetch import InputPrefetcher, PREFETCH_OFF
+from app.core.deadline_planner import DeadlinePlanner
+from app.core.eta import encode_workload, queue_eta, workload_seconds
+
+
+# 任务优先级
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+PRIORITY_URGENT = 3
+
+# 任务状态
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_PREEMPTED = "preempted"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+FINISHED_STATUSES = (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED)
+
+# 抢占方式
+PREEMPT_PAUSE = "pause"     # SIGSTOP暂停低优先级任务
+PREEMPT_RENICE = "renice"   # 降低低优先级任务的调度优先级，继续运行
+PREEMPT_NONE = "none"       # 不抢占，只影响排队顺序
+
+# 被抢占任务的nice值
+PREEMPTED_NICENESS = 19
+
+DEFAULT_SCHEDULER_CONFIG = {
+    "max_concurrent_jobs": 1,
+    "aging_seconds": 600,       # 等待多久提升一级有效优先级
+    "dispatch_interval_seconds": 5,     # 定时重新调度的间隔（老化提升、等待FFmpeg启动后抢占）
+    "preempt_mode": PREEMPT_PAUSE,
+    "cpu_pinning": False,       # 按NUMA节点把每个FFmpeg进程绑定到独立的CPU集合
+    "background": {"enabled": False},   # 全局后台模式（nice/ionice/SCHED_IDLE）
+    "resource_limits": {},      # 每个任务的资源限制（max_memory_mb / max_cpu_seconds）
+    "history_limit": 1000,      # 内存中保留的历史任务数
+    "history_file": "",         # 历史记录追加写入的JSON Lines文件，为空则不落盘
+    "disk_aware": True,         # 按存储设备限制并发，并在开始前检查剩余空间
+    "device_limits": {},        # 按设备类型的并发上限（rotational / non_rotational / unknown）
+    "device_overrides": {},     # 按路径指定所在设备的并发上限，如 {"/mnt/nas": 1}
+    "free_space_margin_mb": 512,
+    "prefetch": {"mode": "auto"},   # 预取下一个任务的输入（auto / fadvise / stage / off）
+    "deadline": {},             # 截止时间模式的参数（slowest_preset / fastest_preset / safety_margin）
+}
+
+
+class CompressionJob:
+    """单个压缩任务"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, input_file: str, output_file: str, settings: Dict[str, Any],
+                 priority: int = PRIORITY_NORMAL):
+        self.job_id = next(self._ids)
+        self.input_file = input_file
+        self.output_file = output_file
+        self.settings = settings.copy()
+        self.priority = priority
+        self.status = STATUS_PENDING
+        self.progress = 0
+        self.message = ""
+        self.error = ""
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.niceness = 0
+        self.threads = None
+        self.cpus = None
+        self.auto_pinned = False        # CPU集合由调度器分配（而非用户指定），抢占时可以收回
+        self.estimated_output_size = 0
+        self.predicted_seconds = None
+        self.workload = None            # 提交时探测的编码工作量（供截止时间规划和ETA使用）
+        self.encode_started_at = None   # 第一个FFmpeg编码进程启动的时间
+        self.preempted_at = None
+        self.preempted_seconds = 0.0
+        self.compressor = VideoCompressor()
+        self.thread = None
+
+    def effective_priority(self, aging_seconds: float, now: Optional[float] = None) -> float:
+        """有效优先级：基础优先级加上等待时间带来的老化提升"""
+        if aging_seconds <= 0:
+            return float(self.priority)
+        now = now or time.time()
+        return self.priority + (now - self.submitted_at) / aging_seconds
+
+    def encode_seconds(self, now: Optional[float] = None) -> float:
+        """FFmpeg实际编码的时长（不含探测、分析阶段和被抢占的时间）"""
+        if self.encode_started_at is None:
+            return 0.0
+        end = self.finished_at or now or time.time()
+        preempted = self.preempted_seconds + (end - self.preempted_at if self.preempted_at else 0.0)
+        return max(0.0, end - self.encode_started_at - preempted)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """任务状态快照"""
+        return {
+            "job_id": self.job_id,
+            "input_file": self.input_file,
+            "output_file": self.output_file,
+            "priority": self.priority,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "threads": self.threads,
+            "cpus": self.cpus,
+            "encode_preset": self.settings.get("encode_preset"),
+            "predicted_seconds": self.predicted_seconds,
+            "resources": self.compressor.get_resource_usage(),
+            "eta": self.compressor.get_eta() if self.status in (STATUS_RUNNING, STATUS_PREEMPTED) else None,
+        }
+
+
+class JobScheduler:
+    """压缩任务调度器"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(DEFAULT_SCHEDULER_CONFIG, **(config or {}))
+        self.jobs: List[CompressionJob] = []
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[CompressionJob], None]] = []
+        self._notifications: "deque[CompressionJob]" = deque()
+        self._shutting_down = False
+        self.thread_planner = ThreadBudgetPlanner()
+        self.thread_planner.add_listener(self._on_thread_budgets_changed)
+        self.pinning_planner = CpuPinningPlanner() if self.config["cpu_pinning"] else None
+        self.history: List[Dict[str, Any]] = []
+        self.device_scheduler = None
+        if self.config["disk_aware"]:
+            self.device_scheduler = DeviceScheduler(self.config["device_limits"],
+                                                    self.config["device_overrides"],
+                                                    self.config["free_space_margin_mb"])
+        self.prefetcher = None
+        if self.config["prefetch"].get("mode") != PREFETCH_OFF:
+            self.prefetcher = InputPrefetcher(self.config["prefetch"])
+        self.deadline_planner = None
+        self._stop_event = threading.Event()
+        self._ticker = threading.Thread(target=self._tick_loop, daemon=True)
+        self._ticker.start()
+
+    def _tick_loop(self):
+        """定时重新调度：老化提升只随时间变化，不能只在提交、取消、结束时计算"""
+        interval = max(0.5, float(self.config["dispatch_interval_seconds"]))
+        while not self._stop_event.wait(interval):
+            with self._lock:
+                waiting = any(job.status in (STATUS_PENDING, STATUS_PREEMPTED) for job in self.jobs)
+            if waiting:
+                self._dispatch()
+
+    def add_listener(self, callback: Callable[[CompressionJob], None]):
+        """注册任务状态变化回调（在工作线程中调用）"""
+        self._listeners.append(callback)
+
+    def _notify(self, job: CompressionJob):
+        """登记任务状态变化，回调由_flush_notifications在释放调度锁后调用"""
+        self._notifications.append(job)
+
+    def _flush_notifications(self):
+        """
+        调用已登记的状态变化回调
+
+        必须在不持有调度锁时调用：回调中可能再次调用调度器（提交、取消、查询），
+        在锁内调用时其他线程等待该锁而回调又等待其他线程，会造成死锁。
+        """
+        while True:
+            try:
+                job = self._notifications.popleft()
+            except IndexError:
+                return
+            for callback in list(self._listeners):
+                try:
+                    callback(job)
+                except Exception as e:
+                    print(f"任务回调执行失败: {e}")
+
+    def submit(self, input_file: str, output_file: str, settings: Dict[str, Any],
+               priority: int = PRIORITY_NORMAL) -> CompressionJob:
+        """提交压缩任务，高优先级任务会立即抢占低优先级任务"""
+        job = CompressionJob(input_file, output_file, settings, priority)
+        background = job.settings.setdefault("background", self.config["background"])
+        job.settings.setdefault("resource_limits", self.config["resource_limits"])
+        job.niceness = self._base_niceness(background)
+        # 在锁外探测，调度时的截止时间规划和ETA估算不再调用ffprobe
+        job.workload = encode_workload(input_file, job.settings)
+        with self._lock:
+            self.jobs.append(job)
+        self._notify(job)
+        self._dispatch()
+        return job
+
+    def submit_merge(self, inputs: List[str], output_file: str, settings: Dict[str, Any],
+                     priority: int = PRIORITY_NORMAL) -> CompressionJob:
+        """提交合并任务：各分段拼接后直接进入压缩，不产生中间文件"""
+        return self.submit(inputs[0], output_file, dict(settings, merge_inputs=list(inputs)), priority)
+
+    def get_job(self, job_id: int) -> Optional[CompressionJob]:
+        """按ID查找任务"""
+        with self._lock:
+            return next((job for job in self.jobs if job.job_id == job_id), None)
+
+    def cancel(self, job_id: int) -> bool:
+        """取消任务（排队中的直接移除，运行中的终止进程）"""
+        with self._lock:
+            job = self.get_job(job_id)
+            if not job or job.status in FINISHED_STATUSES:
+                return False
+            if job.status == STATUS_PENDING:
+                job.status = STATUS_CANCELLED
+                job.finished_at = time.time()
+            else:
+                job.compressor.cancel_compression()
+        self._notify(job)
+        self._dispatch()
+        return True
+
+    def set_priority(self, job_id: int, priority: int):
+        """调整任务优先级并重新调度"""
+        with self._lock:
+            job = self.get_job(job_id)
+            if job and job.status not in FINISHED_STATUSES:
+                job.priority = priority
+        self._dispatch()
+
+    def set_deadline(self, deadline: Optional[float]):
+        """
+        设置批量任务的完成时限（time.time()时间戳），None表示取消
+
+        设置后排队中的x264/x265任务按时限重新选择速度预设，每次调度时根据进度重新规划。
+        """
+        with self._lock:
+            self.deadline_planner = DeadlinePlanner(deadline, self.config["deadline"]) if deadline else None
+        self._dispatch()
+
+    def _replan_deadline(self, now: float):
+        """按截止时间为排队任务重新选择速度预设"""
+        pending = [job for job in self.jobs if job.status == STATUS_PENDING]
+        if not pending:
+            return
+        running_remaining = [self._remaining_seconds(job, now) for job in self.jobs
+                             if job.status in (STATUS_RUNNING, STATUS_PREEMPTED)]
+        plan = self.deadline_planner.plan(
+            [{"key": job.job_id, "workload": job.workload} for job in pending],
+            running_remaining, int(self.config["max_concurrent_jobs"]), now
+        )
+        for job in pending:
+            if job.job_id in plan:
+                job.settings["encode_preset"] = plan[job.job_id]["encode_preset"]
+                job.predicted_seconds = plan[job.job_id]["seconds"]
+
+    @staticmethod
+    def _remaining_seconds(job: CompressionJob, now: float) -> float:
+        """运行中任务的预计剩余秒数：优先使用ETA估算，其次按进度外推"""
+        eta = job.compressor.get_eta()
+        if eta and eta.get("eta_seconds") is not None:
+            return eta["eta_seconds"]
+        if job.progress > 0 and job.started_at:
+            elapsed = job.encode_seconds(now) or (now - job.started_at)
+            return elapsed * (100 - job.progress) / job.progress
+        return job.predicted_seconds or 0.0
+
+    def eta(self) -> Dict[str, Any]:
+        """
+        各任务和整个队列的预计剩余时间（秒）
+
+        排队任务按速度模型（有主机校准数据时为实测值）估算，按当前并发槽位模拟调度得到队列完成时间。
+        """
+        with self._lock:
+            now = time.time()
+            slots = max(1, int(self.config["max_concurrent_jobs"]))
+            threads = max(1, self.thread_planner.total_cores // slots)
+            jobs = {}
+            running = []
+            for job in self.jobs:
+                if job.status in (STATUS_RUNNING, STATUS_PREEMPTED):
+                    jobs[job.job_id] = round(self._remaining_seconds(job, now), 1)
+                    running.append(jobs[job.job_id])
+            pending = []
+            for job in self._candidates(now):
+                if job.status != STATUS_PENDING:
+                    continue
+                seconds = job.predicted_seconds
+                if seconds is None and job.workload:
+                    seconds = workload_seconds(job.workload, job.settings.get("encode_preset"),
+                                               job.settings.get("threads") or threads)
+                jobs[job.job_id] = round(seconds, 1) if seconds is not None else None
+                pending.append(seconds or 0.0)
+
+        return {
+            "jobs": jobs,
+            "queue_seconds": round(queue_eta(running, pending, slots), 1),
+            "unknown": [job_id for job_id, seconds in jobs.items() if seconds is None],
+        }
+
+    @staticmethod
+    def _base_niceness(background: Any) -> int:
+        """任务未被抢占时应有的nice值"""
+        config = process_control.get_background_config({"background": background})
+        return config["niceness"] if config else 0
+
+    def set_background_mode(self, enabled: bool, job_id: Optional[int] = None):
+        """
+        切换后台模式：指定job_id时只切换该任务，否则切换全局模式并作用于所有未完成任务
+
+        运行中的任务会立即调整nice值、I/O类别和调度策略。
+        """
+        with self._lock:
+            background = dict(self.config["background"], enabled=enabled)
+            if job_id is None:
+                self.config["background"] = background
+                jobs = [job for job in self.jobs if job.status not in FINISHED_STATUSES]
+            else:
+                job = self.get_job(job_id)
+                jobs = [job] if job and job.status not in FINISHED_STATUSES else []
+
+            for job in jobs:
+                job.settings["background"] = background
+                job.niceness = self._base_niceness(background)
+                if job.status in (STATUS_RUNNING, STATUS_PREEMPTED):
+                    job.compressor.set_background_mode(enabled, background)
+
+    def _active_jobs(self) -> List[CompressionJob]:
+        """占用执行槽位的任务"""
+        return [job for job in self.jobs if job.status == STATUS_RUNNING]
+
+    def _candidates(self, now: float) -> List[CompressionJob]:
+        """等待执行的任务（含被抢占的），按有效优先级从高到低排序"""
+        aging = self.config["aging_seconds"]
+        waiting = [job for job in self.jobs if job.status in (STATUS_PENDING, STATUS_PREEMPTED)]
+        return sorted(waiting, key=lambda job: (-job.effective_priority(aging, now), job.submitted_at))
+
+    def _dispatch(self):
+        """按优先级分配执行槽位，必要时抢占低优先级任务"""
+        with self._lock:
+            self._dispatch_locked()
+        self._flush_notifications()
+
+    def _dispatch_locked(self):
+        """_dispatch的主体，调用方持有调度锁；关闭过程中不再启动或恢复任务"""
+        if self._shutting_down:
+            return
+        now = time.time()
+        slots = max(1, int(self.config["max_concurrent_jobs"]))
+        aging = self.config["aging_seconds"]
+
+        if self.deadline_planner:
+            self._replan_deadline(now)
+
+        candidates = self._candidates(now)
+        expected_jobs = min(slots, len(self._active_jobs()) + len(candidates))
+
+        for candidate in candidates:
+            victim = None
+            active = self._active_jobs()
+            if len(active) >= slots:
+                # 槽位已满：仅当候选任务的基础优先级高于某个运行任务的有效优先级时抢占，
+                # 运行任务的老化保证低优先级任务不会被无限期推迟
+                if self.config["preempt_mode"] == PREEMPT_NONE:
+                    break
+                victims = [job for job in active
+                           if candidate.priority > job.effective_priority(aging, now)
+                           and job.compressor.is_compression_running()]
+                if not victims:
+                    break
+                victim = min(victims, key=lambda job: job.effective_priority(aging, now))
+
+            # 选定被抢占任务后再检查存储：被抢占任务让出的设备并发可供候选任务使用
+            if not self._storage_ready(candidate, victim):
+                continue
+            if victim and not self._preempt(victim):
+                break
+
+            if candidate.status == STATUS_PREEMPTED:
+                self._restore(candidate)
+            else:
+                self._start(candidate, expected_jobs)
+
+        # 当前任务编码的同时预取下一个排队任务的输入
+        if self.prefetcher:
+            next_job = next((job for job in self._candidates(now) if job.status == STATUS_PENDING), None)
+            if next_job:
+                self.prefetcher.prefetch(next_job.input_file)
+
+    def _storage_ready(self, job: CompressionJob, victim: Optional[CompressionJob] = None) -> bool:
+        """
+        检查任务的存储条件：读写设备有并发余量，输出设备有足够空间
+
+        victim为即将被抢占的任务，其设备并发视为已释放；被抢占的任务恢复时只检查设备并发。
+        空间不足且与其他运行任务的预留无关时直接判定任务失败，否则等待其他任务结束。
+        """
+        if not self.device_scheduler:
+            return True
+        # 要恢复的任务自身（降低优先级抢占时仍登记为运行中）不计入占用
+        ignore = [job.job_id] + ([victim.job_id] if victim else [])
+        if not self.device_scheduler.can_start(job.input_file, job.output_file, ignore):
+            return False
+        if job.status == STATUS_PREEMPTED:
+            return True
+
+        estimated = job.compressor.get_estimated_output_size(job.input_file, job.settings) or 0
+        if not self.device_scheduler.check_free_space(job.output_file, estimated):
+            job.estimated_output_size = estimated
+            return True
+
+        reason = self.device_scheduler.check_free_space(job.output_file, estimated, include_reserved=False)
+        if reason:
+            job.status = STATUS_FAILED
+            job.error = reason
+            job.finished_at = time.time()
+            print(f"任务 {job.job_id} 无法开始: {reason}")
+            self._record_history(job)
+            self._notify(job)
+        return False
+
+    def _preempt(self, job: CompressionJob) -> bool:
+        """暂停或降低运行中任务的优先级，让出执行槽位"""
+        if self.config["preempt_mode"] == PREEMPT_RENICE:
+            if not process_control.renice_process(job.compressor.current_process, PREEMPTED_NICENESS):
+                return False
+        elif not job.compressor.pause_compression():
+            return False
+
+        if self.config["preempt_mode"] == PREEMPT_PAUSE:
+            # 暂停的任务不再占用线程预算、CPU集合和设备并发，全部让给抢占它的任务
+            self.thread_planner.release(job.job_id)
+            if self.pinning_planner and job.auto_pinned:
+                self.pinning_planner.release(job.job_id)
+            if self.device_scheduler:
+                self.device_scheduler.suspend(job.job_id)
+        job.status = STATUS_PREEMPTED
+        job.preempted_at = time.time()
+        job.message = "已被高优先级任务抢占"
+        print(f"任务 {job.job_id} 被抢占 ({self.config['preempt_mode']})")
+        self._notify(job)
+        return True
+
+    def _restore(self, job: CompressionJob):
+        """恢复被抢占的任务"""
+        if self.config["preempt_mode"] == PREEMPT_RENICE:
+            process_control.renice_process(job.compressor.current_process, job.niceness)
+        else:
+            self._reacquire_cpus(job)
+            job.compressor.resume_compression()
+        if self.device_scheduler:
+            self.device_scheduler.resume(job.job_id)
+        if job.preempted_at:
+            job.preempted_seconds += time.time() - job.preempted_at
+            job.preempted_at = None
+        job.status = STATUS_RUNNING
+        job.message = "已恢复"
+        self._notify(job)
+
+    def _reacquire_cpus(self, job: CompressionJob):
+        """
+        暂停抢占的任务恢复前重新申请线程预算和CPU集合
+
+        FFmpeg的编码线程数启动后无法修改，新预算只记录在任务上；CPU集合直接作用于运行中的进程。
+        """
+        job.threads = self.thread_planner.allocate(job.job_id, len(self._active_jobs()) + 1)
+        if self.pinning_planner and job.auto_pinned:
+            cpus = self.pinning_planner.assign(job.job_id, job.threads)
+            job.settings["cpu_affinity"] = cpus
+            job.cpus = cpus
+            process_control.set_process_affinity(job.compressor.current_process, cpus)
+
+    def _start(self, job: CompressionJob, expected_jobs: int = 1):
+        """在工作线程中启动任务"""
+        # 按预计并发数分配线程预算（用户显式指定threads时不覆盖）
+        budget = self.thread_planner.allocate(job.job_id, expected_jobs)
+        if not job.settings.get("threads"):
+            job.settings["threads"] = budget
+        job.threads = job.settings["threads"]
+
+        if self.pinning_planner and not job.settings.get("cpu_affinity"):
+            job.settings["cpu_affinity"] = self.pinning_planner.assign(job.job_id, job.threads)
+            job.auto_pinned = True
+        job.cpus = job.settings.get("cpu_affinity")
+
+        if self.device_scheduler:
+            self.device_scheduler.acquire(job.job_id, job.input_file, job.output_file,
+                                          job.estimated_output_size)
+
+        job.status = STATUS_RUNNING
+        job.started_at = time.time()
+        job.thread = threading.Thread(target=self._run_job, args=(job,), daemon=True)
+        job.thread.start()
+        self._notify(job)
+
+    def _run_job(self, job: CompressionJob):
+        """工作线程：执行压缩并在结束后触发下一轮调度"""
+        dispatched_for = []
+
+        def on_progress(progress, status):
+            if progress is not None:
+                job.progress = progress
+            job.message = status
+            self._notify(job)
+            self._flush_notifications()
+            # 探测和分析阶段无法暂停，FFmpeg启动后才可被抢占：每个编码进程启动时重新调度一次
+            process = job.compressor.current_process
+            if process is not None and process not in dispatched_for and job.compressor.is_compression_running():
+                dispatched_for.append(process)
+                if job.encode_started_at is None:
+                    job.encode_started_at = time.time()
+                self._dispatch()
+
+        def on_error(error_message):
+            job.error = error_message
+
+        try:
+            # 输入已暂存到本地时读取副本
+            input_file = self.prefetcher.resolve(job.input_file) if self.prefetcher else job.input_file
+            success = job.compressor.compress_video(
+                input_file, job.output_file, job.settings,
+                progress_callback=on_progress, error_callback=on_error
+            )
+        except Exception as e:
+            success = False
+            job.error = f"任务执行异常: {e}"
+        finally:
+            if self.prefetcher:
+                self.prefetcher.release(job.input_file)
+
+        with self._lock:
+            if success:
+                job.status = STATUS_COMPLETED
+            elif job.compressor.is_cancelling:
+                job.status = STATUS_CANCELLED
+            else:
+                job.status = STATUS_FAILED
+            job.finished_at = time.time()
+            # 实际编码耗时与预测不符时修正后续规划
+            if success and self.deadline_planner and job.predicted_seconds:
+                self.deadline_planner.observe(job.predicted_seconds, job.encode_seconds())
+
+        self.thread_planner.release(job.job_id)
+        if self.pinning_planner:
+            self.pinning_planner.release(job.job_id)
+        if self.device_scheduler:
+            self.device_scheduler.release(job.job_id)
+        self._record_history(job)
+        self._notify(job)
+        self._dispatch()
+
+    def _on_thread_budgets_changed(self, changed: Dict[int, int]):
+        """
+        运行中任务的线程预算发生变化
+
+        FFmpeg启动后无法修改编码线程数，新预算记录在任务上，由之后的调度（如CPU绑定）使用。
+        """
+        with self._lock:
+            for job_id, threads in changed.items():
+                job = self.get_job(job_id)
+                if job and job.status not in FINISHED_STATUSES:
+                    job.threads = threads
+
+    def _record_history(self, job: CompressionJob):
+        """记录结束任务的快照（含资源使用汇总）"""
+        entry = job.snapshot()
+        with self._lock:
+            self.history.append(entry)
+            limit = self.config["history_limit"]
+            if limit and len(self.history) > limit:
+                del self.history[:-limit]
+
+        if self.config["history_file"]:
+            try:
+                with open(self.config["history_file"], "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"写入任务历史失败: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        """调度器汇总指标：任务数、运行中任务的实时资源、已结束任务的资源累计"""
+        with self._lock:
+            status_counts = {}
+            for job in self.jobs:
+                status_counts[job.status] = status_counts.get(job.status, 0) + 1
+            running = [job.snapshot() for job in self.jobs
+                       if job.status in (STATUS_RUNNING, STATUS_PREEMPTED)]
+            history = list(self.history)
+
+        finished_resources = [entry.get("resources") or {} for entry in history]
+        return {
+            "jobs": status_counts,
+            "running": [{"job_id": entry["job_id"], "resources": entry["resources"]} for entry in running],
+            "current_cpu_percent": round(sum(entry["resources"].get("cpu_percent", 0) for entry in running), 1),
+            "current_rss_mb": round(sum(entry["resources"].get("rss_mb", 0) for entry in running), 1),
+            "total_cpu_seconds": round(sum(r.get("cpu_seconds", 0) for r in finished_resources), 2),
+            "max_peak_rss_mb": max((r.get("peak_rss_mb", 0) for r in finished_resources), default=0),
+            "total_read_bytes": sum(r.get("read_bytes", 0) for r in finished_resources),
+            "total_write_bytes": sum(r.get("write_bytes", 0) for r in finished_resources),
+            "devices": self.device_scheduler.usage() if self.device_scheduler else [],
+        }
+
+    def pending_count(self) -> int:
+        """排队中的任务数"""
+        with self._lock:
+            return sum(1 for job in self.jobs if job.status == STATUS_PENDING)
+
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        """等待所有任务结束"""
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            with self._lock:
+                if all(job.status in FINISHED_STATUSES for job in self.jobs):
+                    return True
+            if deadline and time.time() > deadline:
+                return False
+            time.sleep(0.2)
+
+    def shutdown(self):
+        """取消所有未完成的任务，停止定时调度和预取，清理本调度器的暂存副本"""
+        self._stop_event.set()
+        with self._lock:
+            # 取消过程中会触发调度，先标记关闭，避免排队任务在此期间被启动
+            self._shutting_down = True
+            job_ids = [job.job_id for job in self.jobs if job.status not in FINISHED_STATUSES]
+        for job_id in job_ids:
+            self.cancel(job_id)
+        if self.prefetcher:
+            self.prefetcher.shutdown()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+媒体探测 - 使用FFprobe获取输入文件信息，并按文件指纹缓存探测和分析结果
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+from app.core.ffmpeg_manager import ffmpeg_manager
+from app.utils.app_paths import get_cache_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# 缓存最多保留的文件数，超出时淘汰最久未使用的
+PROBE_CACHE_MAX_ENTRIES = 2000
+# 每条缓存记录最近使用时间的键（与结果类别并列）
+_USED_AT_KEY = "_used_at"
+
+
+def _parse_rate(rate: Optional[str]) -> float:
+    """解析FFprobe的帧率字符串（如 30000/1001）"""
+    if not rate:
+        return 0.0
+    try:
+        if "/" in rate:
+            num, den = rate.split("/", 1)
+            return float(num) / float(den) if float(den) else 0.0
+        return float(rate)
+    except ValueError:
+        return 0.0
+
+
+def stream_rotation(stream: Dict[str, Any]) -> int:
+    """
+    视频流的显示旋转角度（0/90/180/270）
+
+    新版FFprobe在side_data_list的Display Matrix中给出rotation，旧版在tags.rotate中。
+    """
+    value = None
+    for side_data in stream.get("side_data_list") or []:
+        if "rotation" in side_data:
+            value = side_data["rotation"]
+            break
+    if value is None:
+        value = (stream.get("tags") or {}).get("rotate")
+    try:
+        return int(round(float(value))) % 360 if value is not None else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def display_size(width: int, height: int, rotation: int) -> tuple:
+    """FFmpeg解码时会自动旋转，旋转90/270度的视频按交换后的宽高处理"""
+    if rotation in (90, 270):
+        return height, width
+    return width, height
+
+
+def parse_ffprobe_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把FFprobe的JSON输出整理为探测信息
+
+    width、height为自动旋转后的显示尺寸（滤镜、裁剪和多码率都按此规划），rotation为原始旋转角度。
+    """
+    fmt = data.get("format", {})
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+
+    duration = float(fmt.get("duration") or video.get("duration") or 0)
+    rotation = stream_rotation(video)
+    width, height = display_size(int(video.get("width") or 0), int(video.get("height") or 0), rotation)
+    return {
+        "duration": duration,
+        "size": int(fmt.get("size") or 0),
+        "bit_rate": int(fmt.get("bit_rate") or 0),
+        "format_name": fmt.get("format_name", ""),
+        "video_codec": video.get("codec_name", ""),
+        "width": width,
+        "height": height,
+        "rotation": rotation,
+        "pix_fmt": video.get("pix_fmt", ""),
+        "field_order": video.get("field_order", ""),
+        "fps": _parse_rate(video.get("avg_frame_rate")) or _parse_rate(video.get("r_frame_rate")),
+        "nb_frames": int(video.get("nb_frames") or 0),
+        "has_audio": bool(audio),
+        "audio_codec": audio.get("codec_name", ""),
+        "sample_rate": int(audio.get("sample_rate") or 0),
+        "channels": int(audio.get("channels") or 0),
+    }
+
+
+class ProbeCache:
+    """
+    按文件指纹（路径、大小、修改时间）缓存探测与分析结果
+
+    条目数有上限，超出时按最近使用时间淘汰。多个进程共用缓存文件：写回时在文件锁内
+    重新读取磁盘内容，只合并本进程改动过的条目，不覆盖其他进程写入的结果。
+    """
+
+    def __init__(self, cache_file: Optional[Path] = None, max_entries: int = PROBE_CACHE_MAX_ENTRIES):
+        self.cache_file = cache_file or (get_cache_dir() / "probe_cache.json")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._dirty = set()
+
+    def _load(self) -> Dict[str, Any]:
+        """从磁盘加载缓存"""
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        except OSError as e:
+            print(f"加载探测缓存失败: {e}")
+            return {}
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程的缓存文件锁（不支持fcntl的平台上只保证单次写入原子）"""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.cache_file}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _trim(self, entries: Dict[str, Any]):
+        """淘汰最久未使用的条目，直到不超过上限"""
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+        oldest = sorted(entries, key=lambda key: entries[key].get(_USED_AT_KEY, 0))[:excess]
+        for key in oldest:
+            del entries[key]
+
+    def _save(self):
+        """合并其他进程的写入后写回磁盘（先写临时文件再替换）"""
+        temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            with self._file_lock():
+                entries = self._load()
+                for key in self._dirty:
+                    if key in self._entries:
+                        entries[key] = dict(entries.get(key) or {}, **self._entries[key])
+                self._trim(entries)
+                with open(temp_file, "w", encoding="utf-8") as f:
+                    json.dump(entries, f, ensure_ascii=False)
+                os.replace(temp_file, self.cache_file)
+            self._entries = entries
+            self._dirty.clear()
+        except OSError as e:
+            print(f"保存探测缓存失败: {e}")
+
+    @staticmethod
+    def fingerprint(input_file: str) -> Optional[str]:
+        """计算文件指纹，文件不存在时返回None"""
+        try:
+            stat = os.stat(input_file)
+        except OSError:
+            return None
+        key = f"{os.path.realpath(input_file)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def get(self, input_file: str, section: str = "probe") -> Optional[Any]:
+        """读取缓存的某类结果"""
+        key = self.fingerprint(input_file)
+        if not key:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry or section not in entry:
+                return None
+            # 只在内存中更新使用时间，随下一次写入一起保存
+            entry[_USED_AT_KEY] = time.time()
+            self._dirty.add(key)
+            return entry[section]
+
+    def set(self, input_file: str, section: str, data: Any):
+        """写入某类结果"""
+        key = self.fingerprint(input_file)
+        if not key:
+            return
+        with self._lock:
+            entry = self._entries.setdefault(key, {})
+            entry[section] = data
+            entry[_USED_AT_KEY] = time.time()
+            self._dirty.add(key)
+            self._save()
+
+
+class MediaProbe:
+    """媒体信息探测器"""
+
+    def __init__(self, cache: Optional[ProbeCache] = None):
+        self.ffmpeg_manager = ffmpeg_manager
+        self._cache = cache
+
+    @property
+    def cache(self) -> ProbeCache:
+        """延迟创建缓存，避免导入时读写磁盘"""
+        if self._cache is None:
+            self._cache = ProbeCache()
+        return self._cache
+
+    def probe(self, input_file: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        探测媒体信息
+
+        Returns:
+            Dict: duration, width, height（自动旋转后的显示尺寸）, rotation, fps, nb_frames, video_codec,
+                  has_audio 等字段，探测失败时返回空字典
+        """
+        if use_cache:
+            cached = self.cache.get(input_file)
+            # 旧版本缓存没有rotation，尺寸可能未按旋转交换，需要重新探测
+            if cached and "rotation" in cached:
+                return cached
+
+        info = self._probe_with_ffprobe(input_file) or self._probe_with_ffmpeg(input_file)
+        if not info:
+            return {}
+
+        # 没有容器帧数时按时长和帧率估算
+        if not info.get("nb_frames") and info.get("duration") and info.get("fps"):
+            info["nb_frames"] = int(info["duration"] * info["fps"])
+            info["nb_frames_estimated"] = True
+
+        if use_cache:
+            self.cache.set(input_file, "probe", info)
+        return info
+
+    def keyframes(self, input_file: str, use_cache: bool = True) -> List[float]:
+        """
+        视频流关键帧的时间点列表（秒，升序）
+
+        只读取包头部标志（不解码），长文件也只需几秒；需要FFprobe，失败时返回空列表。
+        """
+        if use_cache:
+            cached = self.cache.get(input_file, "keyframes")
+            if cached is not None:
+                return cached
+
+        ffprobe_path = self.ffmpeg_manager.get_ffprobe_path()
+        if not ffprobe_path:
+            return []
+
+        try:
+            result = subprocess.run(
+                [ffprobe_path, "-v", "error", "-select_streams", "v:0",
+                 "-show_entries", "packet=pts_time,flags", "-of", "csv=print_section=0",
+                 input_file],
+                capture_output=True,
+                text=True,
+                timeout=300
+            )
+        except (subprocess.TimeoutExpired, OSError) as e:
+            print(f"读取关键帧索引失败: {e}")
+            return []
+        if result.returncode != 0:
+            print(f"读取关键帧索引失败: {result.stderr.strip()[:200]}")
+            return []
+
+        keyframes = []
+        for line in result.stdout.splitlines():
+            parts = line.strip().split(",")
+            if len(parts) >= 2 and "K" in parts[1] and parts[0] not in ("", "N/A"):
+                try:
+                    keyframes.append(float(parts[0]))
+                except ValueError:
+                    continue
+        keyframes.sort()
+
+        if use_cache and keyframes:
+            self.cache.set(input_file, "keyframes", keyframes)
+        return keyframes
+
+    def _probe_with_ffprobe(self, input_file: str) -> Dict[str, Any]:
+        """使用FFprobe读取容器和流信息（只读头部，不解码）"""
+        ffprobe_path = self.ffmpeg_manager.get_ffprobe_path()
+        if not ffprobe_path:
+            return {}
+
+        try:
+            result = subprocess.run(
+                [ffprobe_path, "-v", "error", "-print_format", "json",
+                 "-show_format", "-show_streams", input_file],
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+            if result.returncode != 0:
+                print(f"FFprobe探测失败: {result.stderr.strip()[:200]}")
+                return {}
+            data = json.loads(result.stdout or "{}")
+        except (subprocess.TimeoutExpired, json.JSONDecodeError, OSError) as e:
+            print(f"FFprobe探测失败: {e}")
+            return {}
+
+        return parse_ffprobe_data(data)
+
+    def _probe_with_ffmpeg(self, input_file: str) -> Dict[str, Any]:
+        """没有FFprobe时从 ffmpeg -i 的输出中解析基本信息"""
+        ffmpeg_info = self.ffmpeg_manager.get_ffmpeg_info()
+        if not ffmpeg_info["available"]:
+            return {}
+
+        try:
+            # 不指定输出，FFmpeg打印输入信息后即退出（返回码非0属正常）
+            result = subprocess.run(
+                [ffmpeg_info["path"], "-hide_banner", "-i", input_file],
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+        except (subprocess.TimeoutExpired, OSError) as e:
+            print(f"FFmpeg探测失败: {e}")
+            return {}
+
+        output_text = result.stderr
+        info = {"duration": 0.0, "width": 0, "height": 0, "rotation": 0, "fps": 0.0, "nb_frames": 0,
+                "video_codec": "", "has_audio": " Audio: " in output_text}
+
+        duration_match = re.search(r'Duration: (\d{2}):(\d{2}):(\d{2}\.?\d*)', output_text)
+        if duration_match:
+            info["duration"] = (int(duration_match.group(1)) * 3600 +
+                                int(duration_match.group(2)) * 60 +
+                                float(duration_match.group(3)))
+
+        video_match = re.search(r'Video: (\w+).*?, (\d{2,5})x(\d{2,5})', output_text)
+        if video_match:
+            info["video_codec"] = video_match.group(1)
+            info["width"] = int(video_match.group(2))
+            info["height"] = int(video_match.group(3))
+
+        fps_match = re.search(r'([\d.]+) fps', output_text)
+        if fps_match:
+            info["fps"] = float(fps_match.group(1))
+
+        # 旋转：新版输出 "displaymatrix: rotation of -90.00 degrees"，旧版输出 "rotate : 90"
+        rotation_match = (re.search(r'rotation of (-?[\d.]+) degrees', output_text)
+                          or re.search(r'rotate\s*:\s*(-?[\d.]+)', output_text))
+        if rotation_match:
+            info["rotation"] = stream_rotation({"tags": {"rotate": rotation_match.group(1)}})
+            info["width"], info["height"] = display_size(info["width"], info["height"], info["rotation"])
+
+        return info if (info["duration"] or info["width"]) else {}
+
+
+# 全局媒体探测器实例
+media_probe = MediaProbe()
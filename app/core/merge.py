@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合并输入 - 把分段录制的多个文件拼接起来：参数一致时用concat分离器直接复制流，
+不一致时用concat滤镜在同一次编码中统一分辨率、帧率和音频格式
+"""
+
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+from app.core import atomic_output
+from app.core import process_control
+from app.core.ffmpeg_manager import ffmpeg_manager
+from app.core.media_probe import media_probe
+
+
+# 拼接时统一的音频格式（仅在需要转码时使用）
+MERGE_SAMPLE_RATE = 48000
+MERGE_CHANNEL_LAYOUT = "stereo"
+
+# 参与兼容性判断的探测字段
+COMPATIBILITY_FIELDS = ["video_codec", "width", "height", "pix_fmt", "fps",
+                        "has_audio", "audio_codec", "sample_rate", "channels"]
+
+
+def find_incompatibility(infos: List[Dict[str, Any]]) -> Optional[str]:
+    """检查各分段能否直接复制流拼接，不能时返回第一个不一致的字段说明"""
+    if not infos or any(not info for info in infos):
+        return "部分文件探测失败"
+    first = infos[0]
+    for index, info in enumerate(infos[1:], 2):
+        for field in COMPATIBILITY_FIELDS:
+            a, b = first.get(field), info.get(field)
+            if field == "fps":
+                a, b = round(a or 0, 2), round(b or 0, 2)
+            if a != b:
+                return f"第 {index} 个文件的 {field} 不一致: {b} != {a}"
+    return None
+
+
+def write_concat_list(inputs: List[str], list_file: str):
+    """写concat分离器的文件列表（路径中的单引号需要转义）"""
+    with open(list_file, "w", encoding="utf-8") as f:
+        for input_file in inputs:
+            escaped = os.path.abspath(input_file).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+
+def build_concat_filter(infos: List[Dict[str, Any]], with_audio: bool,
+                        silence_inputs: Dict[int, int]) -> str:
+    """
+    构建把各分段统一到第一个分段的分辨率和帧率后拼接的滤镜图，输出 [vcat] [acat]
+
+    Args:
+        silence_inputs: 没有音轨的分段序号 -> 为其补静音的lavfi输入序号
+    """
+    first = infos[0]
+    width, height = first.get("width") or 1280, first.get("height") or 720
+    fps = first.get("fps") or 30
+
+    parts = []
+    pads = ""
+    for index, info in enumerate(infos):
+        parts.append(
+            f"[{index}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},format=yuv420p[v{index}]"
+        )
+        pads += f"[v{index}]"
+        if with_audio:
+            audio_input = silence_inputs.get(index, index)
+            parts.append(
+                f"[{audio_input}:a]aresample={MERGE_SAMPLE_RATE},"
+                f"aformat=sample_rates={MERGE_SAMPLE_RATE}:channel_layouts={MERGE_CHANNEL_LAYOUT}[a{index}]"
+            )
+            pads += f"[a{index}]"
+
+    outputs = "[vcat][acat]" if with_audio else "[vcat]"
+    parts.append(f"{pads}concat=n={len(infos)}:v=1:a={1 if with_audio else 0}{outputs}")
+    return ";".join(parts)
+
+
+def prepare_merge_source(inputs: List[str], keep_audio: bool = True,
+                         work_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    生成合并输入在FFmpeg命令中的表示
+
+    Returns:
+        Dict: input_args（输入参数）、filter（需要转码时的滤镜图，否则为空）、
+              video_pad/audio_map（视频滤镜输入和音频映射）、stream_copy、duration、
+              media_info（以第一个分段为准、时长为总时长）、list_file（需调用方删除）
+    """
+    infos = [media_probe.probe(input_file) for input_file in inputs]
+    reason = find_incompatibility(infos)
+    with_audio = keep_audio and any(info.get("has_audio") for info in infos)
+    duration = sum(info.get("duration", 0) for info in infos)
+    media_info = dict(infos[0], duration=duration,
+                      nb_frames=sum(info.get("nb_frames", 0) for info in infos),
+                      has_audio=with_audio)
+
+    if reason is None:
+        fd, list_file = tempfile.mkstemp(prefix="vc_concat_", suffix=".txt", dir=work_dir)
+        os.close(fd)
+        write_concat_list(inputs, list_file)
+        return {
+            "input_args": ["-f", "concat", "-safe", "0", "-i", list_file],
+            "filter": "",
+            "video_pad": "[0:v]",
+            "audio_map": "0:a:0?" if with_audio else None,
+            "stream_copy": True,
+            "duration": duration,
+            "media_info": media_info,
+            "list_file": list_file,
+        }
+
+    print(f"分段参数不一致，使用滤镜拼接并转码: {reason}")
+    input_args = []
+    for input_file in inputs:
+        input_args.extend(["-i", input_file])
+    silence_inputs = {}
+    if with_audio:
+        for index, info in enumerate(infos):
+            if not info.get("has_audio"):
+                silence_inputs[index] = len(inputs) + len(silence_inputs)
+                input_args.extend(["-f", "lavfi", "-t", f"{info.get('duration', 0):.3f}",
+                                   "-i", f"anullsrc=r={MERGE_SAMPLE_RATE}:cl={MERGE_CHANNEL_LAYOUT}"])
+    return {
+        "input_args": input_args,
+        "filter": build_concat_filter(infos, with_audio, silence_inputs),
+        "video_pad": "[vcat]",
+        "audio_map": "[acat]" if with_audio else None,
+        "stream_copy": False,
+        "duration": duration,
+        "media_info": media_info,
+        "list_file": None,
+    }
+
+
+def release_merge_source(source: Optional[Dict[str, Any]]):
+    """删除合并时生成的临时文件列表"""
+    if source and source.get("list_file"):
+        try:
+            os.remove(source["list_file"])
+        except OSError:
+            pass
+
+
+class VideoMerger:
+    """合并分段录制的文件"""
+
+    def __init__(self):
+        self.ffmpeg_manager = ffmpeg_manager
+        self.current_process = None
+
+    def merge(self, inputs: List[str], output_file: str, settings: Optional[Dict[str, Any]] = None,
+              progress_callback: Optional[Callable[[int, str], None]] = None,
+              error_callback: Optional[Callable[[str], None]] = None) -> bool:
+        """
+        合并为一个文件：参数一致时直接复制流，否则按settings（默认标准预设）转码
+
+        需要合并后再压缩时，直接把 merge_inputs 放进压缩设置即可，不产生中间文件。
+        """
+        ffmpeg_info = self.ffmpeg_manager.get_ffmpeg_info()
+        if not ffmpeg_info["available"]:
+            if error_callback:
+                error_callback("FFmpeg未安装或不可用")
+            return False
+        missing = [input_file for input_file in inputs if not Path(input_file).exists()]
+        if missing:
+            if error_callback:
+                error_callback(f"输入文件不存在: {missing[0]}")
+            return False
+
+        infos = [media_probe.probe(input_file) for input_file in inputs]
+        if find_incompatibility(infos) is not None:
+            from app.core.video_compressor import VideoCompressor
+            return VideoCompressor().compress_video(
+                inputs[0], output_file, dict(settings or {}, merge_inputs=list(inputs)),
+                progress_callback, error_callback
+            )
+
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+        output_format = atomic_output.get_container_format(output_file)
+        temp_file = atomic_output.make_temp_output_path(output_file)
+        source = prepare_merge_source(inputs)
+        try:
+            if progress_callback:
+                progress_callback(0, f"正在直接拼接 {len(inputs)} 个文件...")
+            cmd = [ffmpeg_info["path"], "-hide_banner", "-loglevel", "error", "-y"]
+            cmd.extend(source["input_args"])
+            cmd.extend(["-map", "0:v:0", "-map", "0:a:0?", "-c", "copy"])
+            if output_format:
+                cmd.extend(["-f", output_format])
+            cmd.append(temp_file)
+
+            print(f"执行FFmpeg命令: {' '.join(cmd)}")
+            self.current_process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                                    text=True, **process_control.popen_kwargs())
+            _, stderr = self.current_process.communicate()
+            if self.current_process.returncode != 0:
+                if error_callback:
+                    error_callback(f"拼接失败 (返回码: {self.current_process.returncode})\n{stderr.strip()[:300]}")
+                return False
+
+            if not atomic_output.commit_output(temp_file, output_file, output_format):
+                if error_callback:
+                    error_callback("输出文件不完整，已丢弃")
+                return False
+            temp_file = None
+            if progress_callback:
+                progress_callback(100, "拼接完成")
+            return True
+        finally:
+            self.current_process = None
+            atomic_output.discard_output(temp_file)
+            release_merge_source(source)
+
+    def cancel(self):
+        """取消正在进行的拼接"""
+        if self.current_process and self.current_process.poll() is None:
+            process_control.terminate_process(self.current_process)
+
+
+# 全局合并器实例
+video_merger = VideoMerger()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MP4布局 - 控制moov的位置，避免faststart在编码结束后整文件重写
+
+- faststart: 编码结束后把moov移到文件头（需要把整个文件再写一遍）
+- fragmented: 分段MP4（frag_keyframe+empty_moov），边编码边可播放，结束时无需重写
+- reserved_moov: 在文件头预留moov空间，结束时原地写入，文件头即有moov且无需重写
+- plain: moov写在文件尾
+"""
+
+import math
+from typing import Dict, Any, List, Optional
+
+
+LAYOUT_FASTSTART = "faststart"
+LAYOUT_FRAGMENTED = "fragmented"
+LAYOUT_RESERVED_MOOV = "reserved_moov"
+LAYOUT_PLAIN = "plain"
+
+MP4_LAYOUTS = [LAYOUT_FASTSTART, LAYOUT_FRAGMENTED, LAYOUT_RESERVED_MOOV, LAYOUT_PLAIN]
+
+# 估算moov大小：每个样本在stts/stsz/stco/ctts等表中的近似字节数
+BYTES_PER_VIDEO_SAMPLE = 20
+BYTES_PER_AUDIO_SAMPLE = 12
+AAC_FRAME_SAMPLES = 1024
+MOOV_BASE_BYTES = 64 * 1024
+MOOV_SAFETY_FACTOR = 2.0
+
+
+def estimate_moov_size(media_info: Dict[str, Any], output_fps: Optional[float] = None) -> Optional[int]:
+    """
+    按输出帧数估算moov大小（字节），留足余量；时长和帧数未知（无法估算）时返回None
+
+    预留空间不足时FFmpeg会在编码结束时报错退出，因此宁可多留。
+
+    Args:
+        media_info: 探测信息（duration、fps、nb_frames、has_audio、sample_rate）
+        output_fps: 输出帧率（滤镜链规划的结果），为空时与源帧率相同
+    """
+    duration = media_info.get("duration") or 0
+    source_fps = media_info.get("fps") or 0
+    fps = output_fps or source_fps or 30
+    if duration:
+        # 帧率转换后帧数按输出帧率计算，不能用源文件的帧数
+        video_frames = math.ceil(duration * fps)
+    elif media_info.get("nb_frames") and not media_info.get("has_audio") and (
+            not output_fps or output_fps == source_fps):
+        # 音频帧数只能按时长推算；帧率改变时源帧数也不再适用
+        video_frames = media_info["nb_frames"]
+    else:
+        return None
+    audio_frames = 0
+    if media_info.get("has_audio"):
+        sample_rate = media_info.get("sample_rate") or 48000
+        audio_frames = int(duration * sample_rate / AAC_FRAME_SAMPLES)
+
+    table_bytes = video_frames * BYTES_PER_VIDEO_SAMPLE + audio_frames * BYTES_PER_AUDIO_SAMPLE
+    return int(MOOV_BASE_BYTES + table_bytes * MOOV_SAFETY_FACTOR)
+
+
+def strip_movflags(filters: List[str]) -> List[str]:
+    """去掉预设参数中已有的 -movflags（由布局重新指定）"""
+    result = []
+    skip_next = False
+    for arg in filters:
+        if skip_next:
+            skip_next = False
+            continue
+        if arg == "-movflags":
+            skip_next = True
+            continue
+        result.append(arg)
+    return result
+
+
+def layout_args(layout: str, media_info: Optional[Dict[str, Any]] = None,
+                output_fps: Optional[float] = None) -> List[str]:
+    """布局对应的封装参数（output_fps为输出帧率，用于估算预留的moov大小）"""
+    if layout == LAYOUT_FASTSTART:
+        return ["-movflags", "+faststart"]
+    if layout == LAYOUT_FRAGMENTED:
+        return ["-movflags", "+frag_keyframe+empty_moov+default_base_moof"]
+    if layout == LAYOUT_RESERVED_MOOV:
+        moov_size = estimate_moov_size(media_info or {}, output_fps)
+        if moov_size is None:
+            # 估算不了就无法保证预留足够，改用faststart（慢一些但不会在最后失败）
+            print("无法估算moov大小，改用faststart布局")
+            return ["-movflags", "+faststart"]
+        return ["-moov_size", str(moov_size)]
+    if layout == LAYOUT_PLAIN:
+        return []
+    raise ValueError(f"未知的MP4布局: {layout}")
+
+
+def apply_layout(filters: List[str], layout: Optional[str],
+                 media_info: Optional[Dict[str, Any]] = None,
+                 output_fps: Optional[float] = None) -> List[str]:
+    """用指定布局替换预设中的movflags，layout为空时保持预设原样"""
+    if not layout:
+        return list(filters)
+    return strip_movflags(filters) + layout_args(layout, media_info, output_fps)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片封装 - 编码时直接输出HLS（fMP4或TS分片）或DASH，省去对MP4二次读写的打包步骤
+"""
+
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+
+# 封装格式
+PACKAGING_NONE = "none"
+PACKAGING_HLS = "hls"
+PACKAGING_DASH = "dash"
+
+# HLS分片类型
+SEGMENT_FMP4 = "fmp4"
+SEGMENT_TS = "mpegts"
+
+DEFAULT_PACKAGING_CONFIG = {
+    "format": PACKAGING_NONE,
+    "segment_seconds": 6,           # 目标分片时长
+    "hls_segment_type": SEGMENT_FMP4,
+    "align_keyframes": True,        # 按分片时长强制关键帧，保证各版本分片边界一致
+}
+
+HLS_MASTER_PLAYLIST = "master.m3u8"
+HLS_MEDIA_PLAYLIST = "index.m3u8"
+DASH_MANIFEST = "manifest.mpd"
+
+
+def resolve_packaging(settings: Dict[str, Any], preset: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    合并默认值、预设中的封装参数和用户设置，未启用分片封装时返回None
+
+    settings["packaging"]可以是格式名（"hls"/"dash"）或完整配置字典。
+    """
+    packaging = settings.get("packaging")
+    if isinstance(packaging, str):
+        packaging = {"format": packaging}
+    config = dict(DEFAULT_PACKAGING_CONFIG, **(preset.get("packaging") or {}), **(packaging or {}))
+    if config["format"] in (None, "", PACKAGING_NONE):
+        return None
+    if config["format"] not in (PACKAGING_HLS, PACKAGING_DASH):
+        raise ValueError(f"不支持的封装格式: {config['format']}")
+    return config
+
+
+def package_dir(output_file: str, config: Dict[str, Any]) -> str:
+    """分片输出目录: <输出名>_hls / <输出名>_dash"""
+    path = Path(output_file)
+    return str(path.with_name(f"{path.stem}_{config['format']}"))
+
+
+def entry_file_name(config: Dict[str, Any], multi_rendition: bool) -> str:
+    """播放入口文件名（多码率HLS为主播放列表）"""
+    if config["format"] == PACKAGING_DASH:
+        return DASH_MANIFEST
+    return HLS_MASTER_PLAYLIST if multi_rendition else HLS_MEDIA_PLAYLIST
+
+
+def keyframe_args(config: Dict[str, Any]) -> List[str]:
+    """在每个分片边界强制关键帧（对所有视频流生效）"""
+    if not config.get("align_keyframes", True):
+        return []
+    seconds = config["segment_seconds"]
+    return ["-force_key_frames", f"expr:gte(t,n_forced*{seconds})"]
+
+
+def build_packaging_args(config: Dict[str, Any], directory: str,
+                         rendition_names: Optional[List[str]] = None,
+                         with_audio: bool = True) -> List[str]:
+    """
+    生成封装器参数和输出路径（放在编码参数之后）
+
+    Args:
+        config: resolve_packaging返回的配置
+        directory: 分片输出目录（通常是临时目录，完成后整体重命名）
+        rendition_names: 多码率时各视频流的版本名，与v:0 v:1 ...对应
+        with_audio: 输出中是否包含一路共享音频
+    """
+    directory = Path(directory)
+    seconds = str(config["segment_seconds"])
+    multi_rendition = bool(rendition_names and len(rendition_names) > 1)
+
+    if config["format"] == PACKAGING_DASH:
+        adaptation_sets = "id=0,streams=v" + (" id=1,streams=a" if with_audio else "")
+        return [
+            "-f", "dash",
+            "-seg_duration", seconds,
+            "-use_template", "1",
+            "-use_timeline", "1",
+            "-init_seg_name", "init-$RepresentationID$.m4s",
+            "-media_seg_name", "chunk-$RepresentationID$-$Number%05d$.m4s",
+            "-adaptation_sets", adaptation_sets,
+            str(directory / DASH_MANIFEST),
+        ]
+
+    fmp4 = config.get("hls_segment_type", SEGMENT_FMP4) == SEGMENT_FMP4
+    segment_ext = "m4s" if fmp4 else "ts"
+    args = [
+        "-f", "hls",
+        "-hls_time", seconds,
+        "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_type", SEGMENT_FMP4 if fmp4 else SEGMENT_TS,
+    ]
+    if fmp4:
+        args.extend(["-hls_fmp4_init_filename", "init.mp4"])
+
+    if not multi_rendition:
+        args.extend(["-hls_segment_filename", str(directory / f"seg_%05d.{segment_ext}")])
+        args.append(str(directory / HLS_MEDIA_PLAYLIST))
+        return args
+
+    # 每个版本一个子目录，音频单独作为一组被所有视频版本引用
+    stream_map = []
+    if with_audio:
+        stream_map.append("a:0,agroup:audio,name:audio")
+    for i, name in enumerate(rendition_names):
+        stream_map.append(f"v:{i},agroup:audio,name:{name}" if with_audio else f"v:{i},name:{name}")
+    args.extend([
+        "-master_pl_name", HLS_MASTER_PLAYLIST,
+        "-var_stream_map", " ".join(stream_map),
+        "-hls_segment_filename", str(directory / "%v" / f"seg_%05d.{segment_ext}"),
+        str(directory / "%v" / HLS_MEDIA_PLAYLIST),
+    ])
+    return args
+
+
+def verify_package(directory: str, config: Dict[str, Any], multi_rendition: bool) -> bool:
+    """检查分片输出是否完整：入口文件存在，点播播放列表都已写入结束标记"""
+    directory = Path(directory)
+    entry = directory / entry_file_name(config, multi_rendition)
+    try:
+        if not entry.is_file() or entry.stat().st_size == 0:
+            return False
+
+        if config["format"] == PACKAGING_DASH:
+            return 'type="static"' in entry.read_text(encoding="utf-8", errors="replace")
+
+        media_playlists = 0
+        for playlist in directory.rglob("*.m3u8"):
+            content = playlist.read_text(encoding="utf-8", errors="replace")
+            if "#EXTINF" in content:
+                media_playlists += 1
+                if "#EXT-X-ENDLIST" not in content:
+                    return False
+        return media_playlists > 0
+
+    except OSError as e:
+        print(f"校验分片输出失败: {e}")
+        return False
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输入预取 - 当前任务编码时预先读取下一个任务的输入：
+本地磁盘使用posix_fadvise(WILLNEED)预读，网络挂载复制到本地暂存目录（LRU淘汰）
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+from typing import Dict, Any, Optional
+from app.utils.app_paths import get_cache_dir
+
+
+# 预取方式
+PREFETCH_AUTO = "auto"          # 网络挂载暂存到本地，本地磁盘fadvise预读
+PREFETCH_FADVISE = "fadvise"
+PREFETCH_STAGE = "stage"
+PREFETCH_OFF = "off"
+
+DEFAULT_PREFETCH_CONFIG = {
+    "mode": PREFETCH_AUTO,
+    "scratch_dir": "",              # 为空时使用应用缓存目录下的scratch
+    "scratch_budget_mb": 20480,     # 暂存目录容量上限
+    "fadvise_mb": 512,              # fadvise预读的文件头部大小
+}
+
+NETWORK_FILESYSTEMS = {
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "sshfs", "9p",
+    "ceph", "glusterfs", "fuse.glusterfs", "davfs", "fuse.rclone", "afs",
+}
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+# 旧版本直接放在暂存根目录下的副本，超过此时长才视为遗留文件删除
+STALE_SCRATCH_SECONDS = 24 * 3600
+
+
+def filesystem_type(path: str) -> str:
+    """根据 /proc/mounts 找到路径所在挂载点的文件系统类型"""
+    try:
+        real_path = os.path.realpath(path)
+        with open("/proc/mounts", "r") as f:
+            mounts = [line.split()[:3] for line in f if line.strip()]
+    except OSError:
+        return ""
+
+    best_mount, best_type = "", ""
+    for _, mount_point, fs_type in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        prefix = mount_point.rstrip("/") + "/"
+        if (real_path == mount_point or real_path.startswith(prefix)) and len(mount_point) > len(best_mount):
+            best_mount, best_type = mount_point, fs_type
+    return best_type
+
+
+def is_network_path(path: str) -> bool:
+    """路径是否位于网络文件系统上"""
+    return filesystem_type(path) in NETWORK_FILESYSTEMS
+
+
+def fadvise_willneed(path: str, length: int = 0) -> bool:
+    """通知内核预读文件（length为0表示整个文件）"""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, length, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+        return True
+    except OSError as e:
+        print(f"预读失败: {path} ({e})")
+        return False
+
+
+def _process_alive(pid: int) -> bool:
+    """进程是否仍在运行"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ScratchStager:
+    """本地暂存目录：复制慢速卷上的输入，超出容量时按LRU淘汰未在使用的副本"""
+
+    def __init__(self, scratch_dir: Optional[str] = None, budget_bytes: int = 20 * 1024 ** 3):
+        self.scratch_root = Path(scratch_dir) if scratch_dir else get_cache_dir("scratch")
+        self.scratch_root.mkdir(parents=True, exist_ok=True)
+        # 每个实例使用独立子目录（<pid>-<随机后缀>），多个调度器或进程共用暂存根目录时互不干扰
+        self.scratch_dir = self.scratch_root / f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.scratch_dir.mkdir()
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.cleanup()
+
+    def _staged_path(self, source: str) -> Path:
+        """暂存副本路径（保留扩展名，便于FFmpeg识别格式）"""
+        source_path = Path(source)
+        key = f"{os.path.realpath(source)}|{source_path.stat().st_mtime_ns}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return self.scratch_dir / f"{digest}_{source_path.name}"
+
+    def used_bytes(self) -> int:
+        """暂存副本总大小"""
+        return sum(entry["size"] for entry in self._entries.values())
+
+    def _evict_for(self, size: int) -> bool:
+        """按最久未使用顺序淘汰副本，直到能放下size字节"""
+        for source in list(self._entries.keys()):
+            if self.used_bytes() + size <= self.budget_bytes:
+                break
+            entry = self._entries[source]
+            # 使用中或仍在复制的副本都不能淘汰
+            if entry["in_use"] > 0 or not entry["ready"]:
+                continue
+            try:
+                os.remove(entry["path"])
+            except OSError:
+                pass
+            del self._entries[source]
+        return self.used_bytes() + size <= self.budget_bytes
+
+    def stage(self, source: str) -> Optional[str]:
+        """复制到暂存目录，返回副本路径；超出容量或复制失败时返回None"""
+        size = os.path.getsize(source)
+        target = self._staged_path(source)
+
+        with self._lock:
+            entry = self._entries.get(source)
+            if entry and not entry["ready"]:
+                # 另一个线程正在复制同一输入，不重复写同一个.part文件
+                return None
+            if entry and Path(entry["path"]).exists():
+                self._entries.move_to_end(source)
+                return entry["path"]
+            if size > self.budget_bytes or not self._evict_for(size):
+                print(f"暂存空间不足，直接读取原文件: {source}")
+                return None
+            # 先登记占用，避免并发复制时超出容量
+            entry = {"path": str(target), "size": size, "in_use": 0, "ready": False}
+            self._entries[source] = entry
+
+        temp_target = target.with_name(target.name + ".part")
+        try:
+            start = time.time()
+            with open(source, "rb") as src, open(temp_target, "wb") as dst:
+                shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+            os.replace(temp_target, target)
+            print(f"已暂存输入 {Path(source).name} ({size / 1024 / 1024:.0f} MB, {time.time() - start:.1f}秒)")
+        except OSError as e:
+            print(f"暂存输入失败: {e}")
+            with self._lock:
+                if self._entries.get(source) is entry:
+                    del self._entries[source]
+            try:
+                os.remove(temp_target)
+            except OSError:
+                pass
+            return None
+
+        with self._lock:
+            if self._entries.get(source) is entry:
+                entry["ready"] = True
+                return str(target)
+        # 复制期间登记已被移除（例如close()），副本不再受管理，直接删除
+        try:
+            os.remove(target)
+        except OSError:
+            pass
+        return None
+
+    def acquire(self, source: str) -> Optional[str]:
+        """标记副本正在被使用（使用中的副本不会被淘汰）"""
+        with self._lock:
+            entry = self._entries.get(source)
+            if not entry or not entry["ready"]:
+                return None
+            entry["in_use"] += 1
+            self._entries.move_to_end(source)
+            return entry["path"]
+
+    def release(self, source: str):
+        """释放副本的使用标记"""
+        with self._lock:
+            entry = self._entries.get(source)
+            if entry and entry["in_use"] > 0:
+                entry["in_use"] -= 1
+
+    def cleanup(self):
+        """删除已退出进程遗留的暂存子目录（以及旧版本放在根目录下的过期副本）"""
+        for path in self.scratch_root.iterdir():
+            if path == self.scratch_dir:
+                continue
+            try:
+                if path.is_dir():
+                    owner = int(path.name.split("-", 1)[0])
+                    if _process_alive(owner):
+                        continue
+                    shutil.rmtree(path, ignore_errors=True)
+                elif time.time() - path.stat().st_mtime > STALE_SCRATCH_SECONDS:
+                    path.unlink()
+            except (OSError, ValueError):
+                pass
+
+    def close(self):
+        """删除本实例的暂存子目录（正在读取的副本在Linux上仍可读完）"""
+        with self._lock:
+            self._entries.clear()
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+class InputPrefetcher:
+    """在后台线程中预取下一个任务的输入"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(DEFAULT_PREFETCH_CONFIG, **(config or {}))
+        self.stager = None
+        if self.config["mode"] in (PREFETCH_AUTO, PREFETCH_STAGE):
+            self.stager = ScratchStager(self.config["scratch_dir"] or None,
+                                        int(self.config["scratch_budget_mb"]) * 1024 * 1024)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _method_for(self, input_file: str) -> str:
+        """确定某个输入使用的预取方式"""
+        mode = self.config["mode"]
+        if mode == PREFETCH_AUTO:
+            return PREFETCH_STAGE if is_network_path(input_file) else PREFETCH_FADVISE
+        return mode
+
+    def prefetch(self, input_file: str):
+        """提交后台预取（重复提交同一输入会被忽略）"""
+        if self.config["mode"] == PREFETCH_OFF:
+            return
+        with self._lock:
+            if input_file in self._futures:
+                return
+            self._futures[input_file] = self._executor.submit(self._do_prefetch, input_file)
+
+    def _do_prefetch(self, input_file: str) -> Optional[str]:
+        """执行预取，暂存成功时返回副本路径"""
+        method = self._method_for(input_file)
+        if method == PREFETCH_STAGE and self.stager:
+            return self.stager.stage(input_file)
+        if method == PREFETCH_FADVISE:
+            fadvise_willneed(input_file, int(self.config["fadvise_mb"]) * 1024 * 1024)
+        return None
+
+    def resolve(self, input_file: str) -> str:
+        """
+        任务开始时调用：返回实际读取的路径
+
+        正在进行的预取会等待完成；还在排队（或从未提交）的预取直接在调用线程中执行，
+        不排在其他任务的大文件复制之后，保证编码器始终读本地副本。
+        """
+        if self.config["mode"] == PREFETCH_OFF:
+            return input_file
+
+        inline = None
+        with self._lock:
+            future = self._futures.get(input_file)
+            if future is None or future.cancel():
+                # 占位，避免执行期间重复提交同一输入
+                inline = Future()
+                self._futures[input_file] = inline
+                future = None
+
+        if inline is not None:
+            try:
+                inline.set_result(self._do_prefetch(input_file))
+            except Exception as e:
+                inline.set_exception(e)
+                print(f"预取输入失败: {e}")
+        else:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"预取输入失败: {e}")
+
+        if self.stager:
+            staged = self.stager.acquire(input_file)
+            if staged:
+                return staged
+        return input_file
+
+    def release(self, input_file: str):
+        """任务结束，释放暂存副本（保留在LRU中，容量不足时淘汰）"""
+        with self._lock:
+            self._futures.pop(input_file, None)
+        if self.stager:
+            self.stager.release(input_file)
+
+    def shutdown(self):
+        """停止后台预取线程并删除本实例的暂存副本"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.stager:
+            self.stager.close()
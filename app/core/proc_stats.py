@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程统计 - 从Linux的/proc读取FFmpeg子进程的资源使用情况
+"""
+
+import os
+from typing import Optional
+
+
+try:
+    CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+except (AttributeError, ValueError, OSError):
+    CLOCK_TICKS = 100
+
+
+def read_stat_fields(pid: int) -> Optional[list]:
+    """读取/proc/<pid>/stat，返回从state（第3个字段）开始的字段列表"""
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            content = f.read()
+    except OSError:
+        return None
+
+    # 进程名可能包含空格和括号，以最后一个')'为界
+    return content.rsplit(")", 1)[1].split()
+
+
+def read_cpu_seconds(pid: int) -> Optional[float]:
+    """读取进程累计CPU时间（用户态+内核态，秒），不支持/proc时返回None"""
+    fields = read_stat_fields(pid)
+    if not fields or len(fields) < 13:
+        return None
+    try:
+        utime = int(fields[11])
+        stime = int(fields[12])
+    except ValueError:
+        return None
+    return (utime + stime) / CLOCK_TICKS
+
+
+def read_status_memory(pid: int) -> Optional[dict]:
+    """读取/proc/<pid>/status中的内存信息（KB）：VmRSS当前常驻内存，VmHWM峰值常驻内存"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    memory = {}
+    for line in lines:
+        key, _, value = line.partition(":")
+        if key in ("VmRSS", "VmHWM", "VmSize", "Threads"):
+            parts = value.split()
+            if parts and parts[0].isdigit():
+                memory[key] = int(parts[0])
+    return memory
+
+
+def read_io_counters(pid: int) -> Optional[dict]:
+    """读取/proc/<pid>/io中的I/O计数（字节），只有同一用户的进程可读"""
+    try:
+        with open(f"/proc/{pid}/io", "r") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    counters = {}
+    for line in lines:
+        key, _, value = line.partition(":")
+        value = value.strip()
+        if value.isdigit():
+            counters[key] = int(value)
+    return counters
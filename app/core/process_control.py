@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程控制 - 以进程组为单位启动、暂停、恢复和终止FFmpeg子进程
+"""
+
+import ctypes
+import os
+import platform
+import signal
+import subprocess
+from typing import Dict, Any, Optional, List, Callable
+from app.core.cpu_topology import make_affinity_setter
+from app.core.resource_monitor import make_rlimit_setter
+
+
+IS_POSIX = os.name == "posix"
+
+# 后台模式默认参数
+DEFAULT_BACKGROUND_CONFIG = {
+    "niceness": 15,         # 后台任务的nice值
+    "io_idle": True,        # I/O调度使用idle类（只在磁盘空闲时读写）
+    "sched_idle": False,    # 使用SCHED_IDLE调度策略（比nice 19更低）
+}
+
+# ioprio_set系统调用号（Python没有封装，按架构区分）
+_IOPRIO_SET_SYSCALLS = {
+    "x86_64": 251,
+    "amd64": 251,
+    "i386": 289,
+    "i686": 289,
+    "aarch64": 30,
+    "arm64": 30,
+    "armv7l": 314,
+    "ppc64le": 273,
+    "riscv64": 30,
+}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+IOPRIO_CLASS_BE = 2
+IOPRIO_CLASS_IDLE = 3
+
+
+def _load_libc():
+    """
+    在父进程导入时加载libc（preexec_fn在多线程父进程fork出的子进程中执行，
+    不能在其中查找或加载动态库，子进程里的赋值也不会回到父进程）
+    """
+    if platform.system() != "Linux":
+        return None
+    try:
+        # 解释器本身已链接libc，直接取主程序的符号，不需要find_library启动ldconfig
+        return ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        return None
+
+
+_libc = _load_libc()
+_IOPRIO_SET_NR = _IOPRIO_SET_SYSCALLS.get(platform.machine().lower()) if _libc else None
+
+
+def supports_suspend() -> bool:
+    """当前平台是否支持暂停/恢复（SIGSTOP/SIGCONT）"""
+    return IS_POSIX
+
+
+def popen_kwargs(settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    启动FFmpeg时使用的额外参数：放入独立进程组，便于整组发信号
+
+    settings中的进程级设置（如cpu_affinity）通过preexec_fn在子进程exec之前生效，
+    这样FFmpeg创建的所有线程都会继承这些设置。
+    """
+    if not IS_POSIX:
+        return {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+
+    kwargs = {"start_new_session": True}
+    steps = _preexec_steps(settings or {})
+    if steps:
+        kwargs["preexec_fn"] = _chain_steps(steps)
+    return kwargs
+
+
+def _preexec_steps(settings: Dict[str, Any]) -> List[Callable[[], None]]:
+    """根据设置生成需要在子进程中执行的步骤"""
+    steps = []
+    if settings.get("cpu_affinity") and hasattr(os, "sched_setaffinity"):
+        steps.append(make_affinity_setter(settings["cpu_affinity"]))
+
+    background = get_background_config(settings)
+    if background:
+        steps.append(lambda: apply_background_priority(0, True, background))
+
+    rlimit_setter = make_rlimit_setter(settings.get("resource_limits") or {})
+    if rlimit_setter:
+        steps.append(rlimit_setter)
+    return steps
+
+
+def get_background_config(settings: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """从任务设置中取出后台模式参数，未启用时返回None"""
+    background = settings.get("background")
+    if not background:
+        return None
+    if isinstance(background, dict):
+        if not background.get("enabled", True):
+            return None
+        return dict(DEFAULT_BACKGROUND_CONFIG, **background)
+    return dict(DEFAULT_BACKGROUND_CONFIG)
+
+
+def _ioprio_set(tid: int, io_class: int, level: int = 0) -> bool:
+    """设置线程的I/O调度类别（可在preexec_fn中调用）"""
+    if _IOPRIO_SET_NR is None:
+        return False
+    try:
+        value = (io_class << _IOPRIO_CLASS_SHIFT) | level
+        return _libc.syscall(_IOPRIO_SET_NR, _IOPRIO_WHO_PROCESS, tid, value) == 0
+    except (OSError, AttributeError):
+        return False
+
+
+def apply_background_priority(tid: int, enabled: bool,
+                              config: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    对单个线程（0表示当前线程）应用或撤销后台优先级：nice值、I/O idle类、SCHED_IDLE
+
+    恢复前台时降低nice值通常需要CAP_SYS_NICE或RLIMIT_NICE，权限不足时返回False。
+    """
+    config = dict(DEFAULT_BACKGROUND_CONFIG, **(config or {}))
+    success = True
+
+    if config["sched_idle"] and hasattr(os, "SCHED_IDLE"):
+        policy = os.SCHED_IDLE if enabled else os.SCHED_OTHER
+        try:
+            os.sched_setscheduler(tid, policy, os.sched_param(0))
+        except OSError:
+            success = False
+
+    try:
+        os.setpriority(os.PRIO_PROCESS, tid, config["niceness"] if enabled else 0)
+    except OSError:
+        success = False
+
+    if config["io_idle"]:
+        io_class = IOPRIO_CLASS_IDLE if enabled else IOPRIO_CLASS_BE
+        success = _ioprio_set(tid, io_class, 0 if enabled else 4) and success
+
+    return success
+
+
+def _chain_steps(steps: List[Callable[[], None]]) -> Callable[[], None]:
+    """把多个步骤合并为一个preexec_fn（单步失败不影响启动）"""
+    def run_steps():
+        for step in steps:
+            try:
+                step()
+            except (OSError, ValueError):
+                pass
+    return run_steps
+
+
+def signal_process_group(process: subprocess.Popen, sig: int) -> bool:
+    """向进程所在的进程组发送信号，进程已退出时返回False"""
+    if process is None or process.poll() is not None:
+        return False
+    try:
+        if IS_POSIX:
+            os.killpg(process.pid, sig)
+        else:
+            process.send_signal(sig)
+        return True
+    except ProcessLookupError:
+        return False
+    except OSError as e:
+        print(f"发送信号失败: {e}")
+        return False
+
+
+def suspend_process(process: subprocess.Popen) -> bool:
+    """暂停进程组（不丢失编码进度）"""
+    if not IS_POSIX:
+        return False
+    return signal_process_group(process, signal.SIGSTOP)
+
+
+def resume_process(process: subprocess.Popen) -> bool:
+    """恢复被暂停的进程组"""
+    if not IS_POSIX:
+        return False
+    return signal_process_group(process, signal.SIGCONT)
+
+
+def _thread_ids(pid: int) -> List[int]:
+    """进程的所有线程ID（Linux上nice、ioprio、调度策略都按线程生效）"""
+    try:
+        return [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except OSError:
+        return [pid]
+
+
+def set_process_background(process: subprocess.Popen, enabled: bool,
+                           config: Optional[Dict[str, Any]] = None) -> bool:
+    """动态切换运行中进程（所有线程）的前台/后台模式"""
+    if not IS_POSIX or process is None or process.poll() is not None:
+        return False
+
+    success = True
+    for tid in _thread_ids(process.pid):
+        try:
+            success = apply_background_priority(tid, enabled, config) and success
+        except ProcessLookupError:
+            continue
+    if not success:
+        print("部分线程优先级调整失败（恢复前台可能需要CAP_SYS_NICE权限）")
+    return success
+
+
+def set_process_affinity(process: subprocess.Popen, cpus: List[int]) -> bool:
+    """调整运行中进程所有线程的CPU亲和性（Linux上亲和性按线程生效）"""
+    if not hasattr(os, "sched_setaffinity") or process is None or process.poll() is not None:
+        return False
+
+    success = True
+    for tid in _thread_ids(process.pid):
+        try:
+            os.sched_setaffinity(tid, set(cpus))
+        except ProcessLookupError:
+            continue
+        except OSError as e:
+            print(f"调整CPU绑定失败 (tid={tid}): {e}")
+            success = False
+    return success
+
+
+def renice_process(process: subprocess.Popen, niceness: int) -> bool:
+    """
+    调整进程所有线程的nice值
+
+    降低nice值（提高优先级）通常需要CAP_SYS_NICE权限，失败时返回False。
+    """
+    if not IS_POSIX or process is None or process.poll() is not None:
+        return False
+
+    success = True
+    for tid in _thread_ids(process.pid):
+        try:
+            os.setpriority(os.PRIO_PROCESS, tid, niceness)
+        except ProcessLookupError:
+            continue
+        except OSError as e:
+            print(f"调整进程优先级失败 (tid={tid}, nice={niceness}): {e}")
+            success = False
+    return success
+
+
+def terminate_process(process: subprocess.Popen, grace_seconds: float = 0.5) -> bool:
+    """
+    终止进程组：先发送SIGTERM，进程退出即返回；超过宽限时间仍未退出则SIGKILL
+
+    Returns:
+        bool: 进程是否已退出
+    """
+    if process is None or process.poll() is not None:
+        return True
+
+    if IS_POSIX:
+        signal_process_group(process, signal.SIGTERM)
+        # 被暂停的进程收不到SIGTERM，需要先恢复
+        signal_process_group(process, signal.SIGCONT)
+    else:
+        process.terminate()
+
+    try:
+        process.wait(timeout=grace_seconds)
+        return True
+    except subprocess.TimeoutExpired:
+        pass
+
+    if IS_POSIX:
+        signal_process_group(process, signal.SIGKILL)
+    else:
+        process.kill()
+
+    try:
+        process.wait(timeout=grace_seconds)
+        return True
+    except subprocess.TimeoutExpired:
+        print(f"进程 {process.pid} 未能及时退出")
+        return False
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多码率输出 - 一次解码，通过filter_complex的split/scale同时编码多个分辨率版本（ABR阶梯）
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+from app.core.filter_graph import scale_filter
+from app.core.speed_model import available_cores
+from app.core.thread_planner import codec_thread_args
+
+
+# 内置阶梯：按分辨率从高到低
+RENDITION_LADDERS = {
+    "abr": [
+        {"name": "1080p", "height": 1080, "crf": 23, "maxrate": "6000k"},
+        {"name": "720p", "height": 720, "crf": 24, "maxrate": "3000k"},
+        {"name": "480p", "height": 480, "crf": 26, "maxrate": "1200k"},
+    ],
+}
+
+DEFAULT_LADDER = "abr"
+
+
+def parse_bitrate(value: Union[str, int, float]) -> int:
+    """把 "3000k" / "6M" / 3000000 形式的码率转换为bit/s"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r"\s*([\d.]+)\s*([kKmM]?)\s*", str(value))
+    if not match:
+        raise ValueError(f"无效的码率: {value}")
+    number = float(match.group(1))
+    unit = match.group(2).lower()
+    return int(number * {"": 1, "k": 1000, "m": 1000 * 1000}[unit])
+
+
+def resolve_ladder(value: Union[str, List[Dict[str, Any]], bool, None]) -> List[Dict[str, Any]]:
+    """设置中的renditions可以是内置阶梯名、True（默认阶梯）或自定义列表"""
+    if value is True or value is None:
+        value = DEFAULT_LADDER
+    if isinstance(value, str):
+        if value not in RENDITION_LADDERS:
+            raise ValueError(f"未知的码率阶梯: {value}")
+        value = RENDITION_LADDERS[value]
+    ladder = [dict(rendition) for rendition in value]
+    for rendition in ladder:
+        if not rendition.get("height"):
+            raise ValueError(f"码率阶梯缺少height: {rendition}")
+        rendition.setdefault("name", f"{rendition['height']}p")
+    return sorted(ladder, key=lambda r: r["height"], reverse=True)
+
+
+def select_renditions(ladder: List[Dict[str, Any]], source_height: int) -> List[Dict[str, Any]]:
+    """
+    去掉高于源分辨率的版本（不放大）
+
+    源比所有档位都小时只输出一个源分辨率的版本，沿用最低一档的码率参数。
+    """
+    if not source_height:
+        return ladder
+    selected = [rendition for rendition in ladder if rendition["height"] <= source_height]
+    if selected or not ladder:
+        return selected
+    # 高度取偶数（yuv420p要求）
+    height = max(2, source_height - source_height % 2)
+    rendition = dict(ladder[-1], height=height, name=f"{height}p")
+    rendition.pop("width", None)
+    return [rendition]
+
+
+def rendition_output_path(output_file: str, rendition: Dict[str, Any]) -> str:
+    """各版本的输出路径: <名称>_<版本名><扩展名>"""
+    path = Path(output_file)
+    return str(path.with_name(f"{path.stem}_{rendition['name']}{path.suffix}"))
+
+
+def rendition_width(rendition: Dict[str, Any], source_width: int, source_height: int) -> int:
+    """按源宽高比计算版本宽度（取偶数，与scale=-2一致）"""
+    if rendition.get("width"):
+        return int(rendition["width"])
+    if not source_width or not source_height:
+        return 0
+    return int(round(source_width * rendition["height"] / source_height / 2)) * 2
+
+
+def build_filter_complex(renditions: List[Dict[str, Any]], video_source: str = "[0:v]",
+                         filter_prefix: str = "", scaler: Optional[str] = None) -> str:
+    """
+    构建 split -> 各路scale 的滤镜图，输出标签为 [vout0] [vout1] ...
+
+    video_source为视频来源（输入流或前置滤镜的输出标签），filter_prefix为产生该标签的前置滤镜图。
+    """
+    count = len(renditions)
+    branches = "".join(f"[vsplit{i}]" for i in range(count))
+    parts = [filter_prefix] if filter_prefix else []
+    parts.append(f"{video_source}split={count}{branches}")
+    for i, rendition in enumerate(renditions):
+        parts.append(f"[vsplit{i}]{scale_filter(rendition['height'], rendition.get('width'), scaler)}[vout{i}]")
+    return ";".join(parts)
+
+
+def _rendition_video_args(preset: Dict[str, Any], rendition: Dict[str, Any], encoder_threads: int,
+                          source_width: int, source_height: int) -> List[str]:
+    """单个版本的视频编码参数（均为 选项/值 成对出现）"""
+    video_params = preset["video"]
+    codec = video_params["codec"]
+    args = ["-c:v", codec]
+    args.extend(["-crf", str(rendition.get("crf", video_params["crf"]))])
+    args.extend(["-preset", video_params["preset"]])
+
+    # 码率：bitrate为目标码率，maxrate/bufsize限制峰值（VBV）
+    if rendition.get("bitrate"):
+        args.extend(["-b:v", str(rendition["bitrate"])])
+    if rendition.get("maxrate"):
+        bufsize = rendition.get("bufsize") or parse_bitrate(rendition["maxrate"]) * 2
+        args.extend(["-maxrate", str(rendition["maxrate"]), "-bufsize", str(bufsize)])
+
+    # level按预设的分辨率设定，多版本时交给编码器自动选择
+    if video_params.get("profile"):
+        args.extend(["-profile:v", video_params["profile"]])
+    if video_params.get("pixel_format"):
+        args.extend(["-pix_fmt", video_params["pixel_format"]])
+    if video_params.get("tune"):
+        args.extend(["-tune", video_params["tune"]])
+
+    width = rendition_width(rendition, source_width, source_height)
+    args.extend(codec_thread_args(codec, encoder_threads, width))
+    return args
+
+
+def _audio_args(preset: Dict[str, Any]) -> List[str]:
+    """音频编码参数（各版本共用）"""
+    audio_params = preset["audio"]
+    args = ["-c:a", audio_params["codec"], "-b:a", audio_params["bitrate"]]
+    if audio_params.get("sample_rate"):
+        args.extend(["-ar", str(audio_params["sample_rate"])])
+    if audio_params.get("channels"):
+        args.extend(["-ac", str(audio_params["channels"])])
+    return args
+
+
+def _encoder_threads(renditions: List[Dict[str, Any]], threads: Optional[int]) -> int:
+    """整个任务的线程预算在各版本编码器间平分"""
+    return max(1, (threads or available_cores()) // len(renditions))
+
+
+def build_ladder_args(preset: Dict[str, Any], renditions: List[Dict[str, Any]],
+                      outputs: List[str], keep_audio: bool = True, threads: Optional[int] = None,
+                      source_width: int = 0, source_height: int = 0,
+                      output_format: Optional[str] = None, video_source: str = "[0:v]",
+                      audio_map: str = "0:a:0?", filter_prefix: str = "") -> List[str]:
+    """
+    生成多输出的FFmpeg参数（不含输入），视频只解码一次
+
+    Args:
+        preset: 已合并用户设置的预设
+        renditions: 版本列表（height、crf，可选width/bitrate/maxrate/bufsize）
+        outputs: 与renditions一一对应的输出路径
+        threads: 整个任务的线程预算，在各版本编码器间平分
+        video_source/audio_map/filter_prefix: 输入不是单个文件时（如合并分段）的视频来源、音频映射和前置滤镜
+    """
+    encoder_threads = _encoder_threads(renditions, threads)
+
+    args = ["-filter_complex", build_filter_complex(renditions, video_source, filter_prefix,
+                                                     (preset.get("video_filters") or {}).get("scaler"))]
+    for i, (rendition, output_file) in enumerate(zip(renditions, outputs)):
+        args.extend(["-map", f"[vout{i}]"])
+        args.extend(_rendition_video_args(preset, rendition, encoder_threads, source_width, source_height))
+
+        # 音频：各版本使用相同的音频参数
+        if keep_audio and audio_map:
+            args.extend(["-map", audio_map])
+            args.extend(_audio_args(preset))
+
+        if preset.get("filters"):
+            args.extend(preset["filters"])
+        if output_format:
+            args.extend(["-f", output_format])
+        args.append(output_file)
+
+    return args
+
+
+def build_ladder_stream_args(preset: Dict[str, Any], renditions: List[Dict[str, Any]],
+                             with_audio: bool = True, threads: Optional[int] = None,
+                             source_width: int = 0, source_height: int = 0,
+                             video_source: str = "[0:v]", audio_map: str = "0:a:0",
+                             filter_prefix: str = "") -> List[str]:
+    """
+    生成单个输出内包含所有版本的参数（供HLS/DASH分片封装使用），不含封装格式和输出路径
+
+    视频流按版本顺序为 v:0 v:1 ...，编码参数用流说明符区分；音频只映射并编码一次。
+    """
+    encoder_threads = _encoder_threads(renditions, threads)
+
+    args = ["-filter_complex", build_filter_complex(renditions, video_source, filter_prefix,
+                                                     (preset.get("video_filters") or {}).get("scaler"))]
+    for i in range(len(renditions)):
+        args.extend(["-map", f"[vout{i}]"])
+    if with_audio:
+        args.extend(["-map", audio_map])
+
+    for i, rendition in enumerate(renditions):
+        options = _rendition_video_args(preset, rendition, encoder_threads, source_width, source_height)
+        for name, value in zip(options[::2], options[1::2]):
+            args.extend([f"{name.split(':')[0]}:v:{i}", value])
+
+    if with_audio:
+        args.extend(_audio_args(preset))
+    return args
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+资源监控 - 周期采样FFmpeg进程的CPU、内存和磁盘I/O，并提供子进程资源限制
+"""
+
+import time
+from typing import Dict, Any, Optional, Callable
+from app.core.proc_stats import read_cpu_seconds, read_status_memory, read_io_counters
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# 采样间隔（秒）
+SAMPLE_INTERVAL = 1.0
+
+
+def _clamp_to_hard_limit(kind: int, soft: int, hard: int) -> tuple:
+    """把软、硬限制收紧到当前硬限制以内"""
+    try:
+        current_hard = resource.getrlimit(kind)[1]
+    except (OSError, ValueError):
+        return kind, soft, hard
+    if current_hard != resource.RLIM_INFINITY:
+        hard = min(hard, current_hard)
+        soft = min(soft, hard)
+    return kind, soft, hard
+
+
+def make_rlimit_setter(limits: Dict[str, Any]) -> Optional[Callable[[], None]]:
+    """
+    生成在子进程中设置资源限制的函数（用于preexec_fn）
+
+    limits: max_memory_mb 对应RLIMIT_AS（虚拟内存，含线程栈，需留出余量），
+            max_cpu_seconds 对应RLIMIT_CPU（超出后进程收到SIGXCPU）。0或缺省表示不限制。
+    """
+    if resource is None or not limits:
+        return None
+
+    rlimits = []
+    if limits.get("max_memory_mb"):
+        size = int(limits["max_memory_mb"]) * 1024 * 1024
+        rlimits.append((resource.RLIMIT_AS, size, size))
+    if limits.get("max_cpu_seconds"):
+        # 硬限制多留几秒，保证进程先收到SIGXCPU而不是直接被SIGKILL
+        seconds = int(limits["max_cpu_seconds"])
+        rlimits.append((resource.RLIMIT_CPU, seconds, seconds + 5))
+    if not rlimits:
+        return None
+    # 不能超过当前硬限制（非特权进程无法提高硬限制，setrlimit会抛出ValueError），在父进程中取值
+    rlimits = [_clamp_to_hard_limit(kind, soft, hard) for kind, soft, hard in rlimits]
+
+    def set_limits():
+        for kind, soft, hard in rlimits:
+            resource.setrlimit(kind, (soft, hard))
+
+    return set_limits
+
+
+class ResourceMonitor:
+    """单个进程的资源采样器（在进度监控循环中调用，不额外创建线程）"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.start_time = time.time()
+        self.last_sample_time = 0.0
+        self.last_cpu = None
+        self.usage = {
+            "cpu_percent": 0.0,
+            "cpu_seconds": 0.0,
+            "rss_mb": 0.0,
+            "peak_rss_mb": 0.0,
+            "read_bytes": 0,
+            "write_bytes": 0,
+            "threads": 0,
+            "supported": True,
+        }
+
+    def sample(self, force: bool = False) -> Dict[str, Any]:
+        """采样一次（距上次采样不足SAMPLE_INTERVAL时直接返回上次结果）"""
+        now = time.time()
+        if not force and now - self.last_sample_time < SAMPLE_INTERVAL:
+            return self.usage
+
+        cpu = read_cpu_seconds(self.pid)
+        if cpu is None:
+            # 进程已退出或平台不支持/proc，保留最后一次的结果
+            if self.last_cpu is None:
+                self.usage["supported"] = False
+            return self.usage
+
+        if self.last_cpu is not None and now > self.last_sample_time:
+            self.usage["cpu_percent"] = round((cpu - self.last_cpu) / (now - self.last_sample_time) * 100, 1)
+        self.usage["cpu_seconds"] = round(cpu, 2)
+        self.last_cpu = cpu
+        self.last_sample_time = now
+
+        memory = read_status_memory(self.pid) or {}
+        if "VmRSS" in memory:
+            self.usage["rss_mb"] = round(memory["VmRSS"] / 1024, 1)
+        peak = memory.get("VmHWM", memory.get("VmRSS", 0)) / 1024
+        self.usage["peak_rss_mb"] = round(max(self.usage["peak_rss_mb"], peak), 1)
+        self.usage["threads"] = memory.get("Threads", 0)
+
+        io = read_io_counters(self.pid)
+        if io:
+            self.usage["read_bytes"] = io.get("read_bytes", 0)
+            self.usage["write_bytes"] = io.get("write_bytes", 0)
+
+        return self.usage
+
+    def summary(self) -> Dict[str, Any]:
+        """任务结束时的资源汇总"""
+        summary = dict(self.usage)
+        wall_time = (self.last_sample_time or time.time()) - self.start_time
+        summary["wall_seconds"] = round(wall_time, 2)
+        summary["avg_cpu_percent"] = round(summary["cpu_seconds"] / wall_time * 100, 1) if wall_time > 0 else 0.0
+        return summary
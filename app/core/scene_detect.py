@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景切换检测 - 在缩小后的解码画面上用scdet计算场景分数，把过短的场景合并到最小分段时长，
+并尽量对齐到源文件关键帧；原始切换点按文件指纹缓存在探测缓存中
+
+得到的边界列表可用于分段并行编码的切分，也可作为强制关键帧位置。
+"""
+
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+from app.core.ffmpeg_manager import ffmpeg_manager
+from app.core.media_probe import media_probe
+from app.core.speed_model import available_cores
+
+
+DEFAULT_SCENE_THRESHOLD = 10.0      # scdet分数（0~100）高于此值视为场景切换
+DEFAULT_MIN_CHUNK_SECONDS = 10.0    # 合并后每段的最小时长
+KEYFRAME_SNAP_SECONDS = 1.0         # 距离源关键帧不超过此值时对齐到关键帧
+ANALYSIS_WIDTH = 320                # 分析前缩小到此宽度
+
+# 并行分析时每段的最小时长（段首帧没有前一帧可比较，段太短会漏检过多）
+MIN_RANGE_SECONDS = 60.0
+
+_SCENE_PATTERN = re.compile(r"lavfi\.scd\.time=([\d.]+)")
+
+
+def merge_short_scenes(cuts: List[float], duration: float,
+                       min_seconds: float = DEFAULT_MIN_CHUNK_SECONDS) -> List[float]:
+    """丢弃使前后分段短于min_seconds的切换点（从前往后贪心保留）"""
+    boundaries = []
+    last = 0.0
+    for cut in sorted(cuts):
+        if cut - last < min_seconds:
+            continue
+        if duration and duration - cut < min_seconds:
+            break
+        boundaries.append(cut)
+        last = cut
+    return boundaries
+
+
+def align_to_keyframes(boundaries: List[float], keyframes: List[float],
+                       tolerance: float = KEYFRAME_SNAP_SECONDS) -> List[float]:
+    """把边界移到附近的源关键帧上（超出容差的保持原位，编码时作为强制关键帧），并去重"""
+    aligned = []
+    for boundary in boundaries:
+        if keyframes:
+            nearest = min(keyframes, key=lambda keyframe: abs(keyframe - boundary))
+            if abs(nearest - boundary) <= tolerance and nearest > 0:
+                boundary = nearest
+        boundary = round(boundary, 3)
+        if not aligned or boundary > aligned[-1]:
+            aligned.append(boundary)
+    return aligned
+
+
+def plan_chunks(boundaries: List[float], duration: float) -> List[Tuple[float, float]]:
+    """按边界把 [0, duration) 切成若干分段"""
+    points = [0.0] + [boundary for boundary in boundaries if 0 < boundary < duration] + [duration]
+    return [(points[i], points[i + 1]) for i in range(len(points) - 1)]
+
+
+def scene_keyframe_args(boundaries: List[float]) -> List[str]:
+    """在各场景边界强制关键帧"""
+    if not boundaries:
+        return []
+    return ["-force_key_frames", ",".join(f"{boundary:.3f}" for boundary in boundaries)]
+
+
+def _analysis_ranges(duration: float, workers: int) -> List[Tuple[float, Optional[float]]]:
+    """把全片划分为并行分析的时间段 (起点, 时长)，时长未知时整体分析"""
+    if duration <= 0:
+        return [(0.0, None)]
+    count = max(1, min(workers, int(duration // MIN_RANGE_SECONDS)))
+    step = duration / count
+    return [(step * i, step) for i in range(count)]
+
+
+class SceneDetector:
+    """场景切换检测器"""
+
+    def __init__(self):
+        self.ffmpeg_manager = ffmpeg_manager
+
+    def scene_cuts(self, input_file: str, threshold: float = DEFAULT_SCENE_THRESHOLD,
+                   use_cache: bool = True) -> Optional[List[float]]:
+        """
+        原始场景切换时间点（秒，升序）
+
+        Returns:
+            Optional[List[float]]: 检测失败时返回None
+        """
+        if use_cache:
+            cached = media_probe.cache.get(input_file, "scenes")
+            if cached is not None and cached.get("threshold") == threshold:
+                return cached["cuts"]
+
+        ffmpeg_info = self.ffmpeg_manager.get_ffmpeg_info()
+        if not ffmpeg_info["available"]:
+            return None
+
+        info = media_probe.probe(input_file)
+        ranges = _analysis_ranges(info.get("duration", 0), available_cores())
+        with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="scdet") as executor:
+            results = list(executor.map(
+                lambda item: self._detect_range(ffmpeg_info["path"], input_file, item[0], item[1], threshold),
+                ranges
+            ))
+        if any(result is None for result in results):
+            return None
+
+        cuts = sorted({round(cut, 3) for result in results for cut in result if cut > 0})
+        if use_cache:
+            media_probe.cache.set(input_file, "scenes", {"threshold": threshold, "cuts": cuts})
+        return cuts
+
+    def _detect_range(self, ffmpeg_path: str, input_file: str, start: float,
+                      length: Optional[float], threshold: float) -> Optional[List[float]]:
+        """检测一个时间段内的场景切换（输出的时间以文件起点为准）"""
+        cmd = [ffmpeg_path, "-hide_banner", "-nostats"]
+        if start > 0:
+            cmd.extend(["-ss", f"{start:.3f}"])
+        cmd.extend(["-i", input_file])
+        if length:
+            cmd.extend(["-t", f"{length:.3f}"])
+        cmd.extend([
+            "-map", "0:v:0",
+            "-vf", f"scale={ANALYSIS_WIDTH}:-2:flags=fast_bilinear,scdet=threshold={threshold},"
+                   f"metadata=mode=print:key=lavfi.scd.time",
+            "-an", "-sn", "-f", "null", "-"
+        ])
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)
+        except (subprocess.TimeoutExpired, OSError) as e:
+            print(f"场景检测失败 ({start:.0f}s): {e}")
+            return None
+        if result.returncode != 0:
+            print(f"场景检测失败 ({start:.0f}s): {result.stderr.strip()[-200:]}")
+            return None
+        # -ss在-i之前时时间戳从0开始
+        return [start + float(value) for value in _SCENE_PATTERN.findall(result.stderr)]
+
+    def detect(self, input_file: str, threshold: float = DEFAULT_SCENE_THRESHOLD,
+               min_chunk_seconds: float = DEFAULT_MIN_CHUNK_SECONDS,
+               use_cache: bool = True) -> List[float]:
+        """
+        场景边界列表：合并短场景后对齐到关键帧，不含0和片尾；检测失败时返回空列表
+        """
+        cuts = self.scene_cuts(input_file, threshold, use_cache)
+        if not cuts:
+            return []
+        duration = media_probe.probe(input_file).get("duration", 0)
+        boundaries = merge_short_scenes(cuts, duration, min_chunk_seconds)
+        return align_to_keyframes(boundaries, media_probe.keyframes(input_file, use_cache))
+
+    def chunks(self, input_file: str, min_chunk_seconds: float = DEFAULT_MIN_CHUNK_SECONDS,
+               threshold: float = DEFAULT_SCENE_THRESHOLD) -> List[Tuple[float, float]]:
+        """按场景边界切分的分段 [(起点, 终点), ...]"""
+        duration = media_probe.probe(input_file).get("duration", 0)
+        if not duration:
+            return []
+        return plan_chunks(self.detect(input_file, threshold, min_chunk_seconds), duration)
+
+
+def resolve_scene_config(config: Any) -> Optional[Dict[str, Any]]:
+    """scene_keyframes设置可以是布尔值或 {"threshold", "min_chunk_seconds"}，未启用时返回None"""
+    if not config:
+        return None
+    defaults = {"threshold": DEFAULT_SCENE_THRESHOLD, "min_chunk_seconds": DEFAULT_MIN_CHUNK_SECONDS}
+    return dict(defaults, **config) if isinstance(config, dict) else defaults
+
+
+# 全局场景检测器实例
+scene_detector = SceneDetector()
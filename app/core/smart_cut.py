@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+无损剪切 - 按关键帧索引裁剪/分割视频：完整GOP直接复制流，只重新编码切点处不完整的GOP（smart cut），
+最后把各段拼接起来
+"""
+
+import bisect
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from app.core import atomic_output
+from app.core import process_control
+from app.core.ffmpeg_manager import ffmpeg_manager
+from app.core.media_probe import media_probe
+
+
+# 剪切方式
+CUT_SMART = "smart"          # 切点精确，只重编码切点处的部分GOP
+CUT_KEYFRAME = "keyframe"    # 起点对齐到前一个关键帧，全部复制，最快
+
+# 判断时间点是否落在关键帧上的容差（秒）
+KEYFRAME_TOLERANCE = 0.001
+
+# 可以与原始码流拼接的编码器：源编码 -> (编码器, 参数)
+SMART_CUT_ENCODERS = {
+    "h264": ("libx264", ["-crf", "18", "-preset", "fast"]),
+    "hevc": ("libx265", ["-crf", "20", "-preset", "fast"]),
+}
+
+# 拼接用的中间格式：MPEG-TS在码流内携带参数集，重编码段与复制段的SPS/PPS不同也能拼接
+PIECE_SUFFIX = ".ts"
+
+PIECE_COPY = "copy"
+PIECE_ENCODE = "encode"
+
+
+def plan_pieces(keyframes: List[float], start: float, end: float,
+                duration: float) -> List[Dict[str, Any]]:
+    """
+    把 [start, end) 划分为重编码段和复制段
+
+    起点到其后第一个关键帧、最后一个关键帧到终点需要重编码，中间完整的GOP直接复制。
+    区间内没有完整GOP时整段重编码。
+    """
+    at_end = end >= duration - KEYFRAME_TOLERANCE
+    first_index = bisect.bisect_left(keyframes, start - KEYFRAME_TOLERANCE)
+    last_index = bisect.bisect_right(keyframes, end + KEYFRAME_TOLERANCE) - 1
+    if first_index >= len(keyframes) or last_index < 0:
+        return [{"mode": PIECE_ENCODE, "start": start, "end": end}]
+
+    copy_start = keyframes[first_index]
+    # 终点就是文件末尾时，最后一个GOP也是完整的
+    copy_end = end if at_end else keyframes[last_index]
+    if copy_end - copy_start <= KEYFRAME_TOLERANCE:
+        return [{"mode": PIECE_ENCODE, "start": start, "end": end}]
+
+    pieces = []
+    if copy_start - start > KEYFRAME_TOLERANCE:
+        pieces.append({"mode": PIECE_ENCODE, "start": start, "end": copy_start})
+    pieces.append({"mode": PIECE_COPY, "start": copy_start, "end": copy_end})
+    if end - copy_end > KEYFRAME_TOLERANCE:
+        pieces.append({"mode": PIECE_ENCODE, "start": copy_end, "end": end})
+    return pieces
+
+
+def keyframe_at_or_before(keyframes: List[float], position: float) -> float:
+    """position处或之前最近的关键帧"""
+    index = bisect.bisect_right(keyframes, position + KEYFRAME_TOLERANCE) - 1
+    return keyframes[index] if index >= 0 else 0.0
+
+
+def split_ranges(duration: float, points: Optional[List[float]] = None,
+                 part_seconds: Optional[float] = None) -> List[Tuple[float, float]]:
+    """按分割点或固定时长把 [0, duration) 切成若干区间"""
+    if part_seconds:
+        points = []
+        position = part_seconds
+        while position < duration - KEYFRAME_TOLERANCE:
+            points.append(position)
+            position += part_seconds
+    bounds = [0.0] + sorted(p for p in (points or []) if 0 < p < duration) + [duration]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)
+            if bounds[i + 1] - bounds[i] > KEYFRAME_TOLERANCE]
+
+
+class SmartCutter:
+    """裁剪和分割（尽量不重新编码）"""
+
+    def __init__(self):
+        self.ffmpeg_manager = ffmpeg_manager
+        self.current_process = None
+        self.is_cancelling = False
+
+    def trim(self, input_file: str, output_file: str, start: float = 0.0, end: Optional[float] = None,
+             mode: str = CUT_SMART,
+             progress_callback: Optional[Callable[[int, str], None]] = None,
+             error_callback: Optional[Callable[[str], None]] = None) -> bool:
+        """
+        裁剪出 [start, end) 区间
+
+        Args:
+            input_file: 输入文件路径
+            output_file: 输出文件路径
+            start: 起点（秒）
+            end: 终点（秒），None表示到文件末尾
+            mode: CUT_SMART（切点精确）或 CUT_KEYFRAME（起点对齐到关键帧，全部复制）
+        """
+        self.is_cancelling = False
+        ffmpeg_info = self.ffmpeg_manager.get_ffmpeg_info()
+        if not ffmpeg_info["available"]:
+            if error_callback:
+                error_callback("FFmpeg未安装或不可用")
+            return False
+
+        media_info = media_probe.probe(input_file)
+        duration = media_info.get("duration", 0)
+        end = duration if end is None or (duration and end > duration) else end
+        if not duration or start < 0 or end - start <= KEYFRAME_TOLERANCE:
+            if error_callback:
+                error_callback(f"无效的裁剪区间: {start} - {end}")
+            return False
+
+        keyframes = media_probe.keyframes(input_file)
+        if not keyframes:
+            if error_callback:
+                error_callback("无法读取关键帧索引（需要FFprobe）")
+            return False
+
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+        output_format = atomic_output.get_container_format(output_file)
+        temp_file = atomic_output.make_temp_output_path(output_file)
+        work_dir = Path(tempfile.mkdtemp(prefix="vc_cut_", dir=str(Path(output_file).parent)))
+        try:
+            if mode == CUT_KEYFRAME:
+                success = self._copy_range(ffmpeg_info["path"], input_file, temp_file,
+                                           keyframe_at_or_before(keyframes, start), end,
+                                           output_format, media_info)
+            else:
+                success = self._smart_cut(ffmpeg_info["path"], input_file, temp_file, start, end,
+                                          keyframes, media_info, output_format, work_dir,
+                                          progress_callback)
+            if not success or self.is_cancelling:
+                if error_callback and not self.is_cancelling:
+                    error_callback("裁剪失败")
+                return False
+
+            if not atomic_output.commit_output(temp_file, output_file, output_format):
+                if error_callback:
+                    error_callback("输出文件不完整，已丢弃")
+                return False
+            temp_file = None
+            if progress_callback:
+                progress_callback(100, "裁剪完成")
+            return True
+        finally:
+            atomic_output.discard_output(temp_file)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def split(self, input_file: str, output_dir: str, points: Optional[List[float]] = None,
+              part_seconds: Optional[float] = None, mode: str = CUT_SMART,
+              progress_callback: Optional[Callable[[int, str], None]] = None,
+              error_callback: Optional[Callable[[str], None]] = None) -> List[str]:
+        """
+        按分割点或固定时长分割为多个文件（<名称>_part01<扩展名> ...）
+
+        Returns:
+            List[str]: 成功写出的文件路径
+        """
+        duration = media_probe.probe(input_file).get("duration", 0)
+        ranges = split_ranges(duration, points, part_seconds)
+        input_path = Path(input_file)
+        outputs = []
+        for index, (start, end) in enumerate(ranges, 1):
+            if self.is_cancelling:
+                break
+            output_file = str(Path(output_dir) / f"{input_path.stem}_part{index:02d}{input_path.suffix}")
+            if progress_callback:
+                progress_callback(int((index - 1) * 100 / len(ranges)), f"正在分割第 {index}/{len(ranges)} 段...")
+            if not self.trim(input_file, output_file, start, end, mode, None, error_callback):
+                break
+            outputs.append(output_file)
+        if progress_callback and len(outputs) == len(ranges):
+            progress_callback(100, "分割完成")
+        return outputs
+
+    def cancel(self):
+        """取消正在进行的裁剪"""
+        self.is_cancelling = True
+        if self.current_process and self.current_process.poll() is None:
+            process_control.terminate_process(self.current_process)
+
+    def _smart_cut(self, ffmpeg_path: str, input_file: str, output_file: str, start: float, end: float,
+                   keyframes: List[float], media_info: Dict[str, Any], output_format: Optional[str],
+                   work_dir: Path, progress_callback: Optional[Callable]) -> bool:
+        """分段处理视频后拼接，音频从原文件按区间直接复制"""
+        encoder = SMART_CUT_ENCODERS.get(media_info.get("video_codec", ""))
+        pieces = plan_pieces(keyframes, start, end, media_info["duration"])
+        if not encoder:
+            # 无法与原始码流拼接的编码，整段重编码为H.264
+            print(f"{media_info.get('video_codec')} 不支持smart cut，整段重新编码")
+            encoder = SMART_CUT_ENCODERS["h264"]
+            pieces = [{"mode": PIECE_ENCODE, "start": start, "end": end}]
+
+        fps = media_info.get("fps") or 30.0
+        piece_files = []
+        for index, piece in enumerate(pieces):
+            if self.is_cancelling:
+                return False
+            if progress_callback:
+                action = "复制" if piece["mode"] == PIECE_COPY else "重新编码"
+                progress_callback(int(index * 90 / len(pieces)),
+                                  f"正在{action}第 {index + 1}/{len(pieces)} 段...")
+
+            piece_file = str(work_dir / f"piece_{index:03d}{PIECE_SUFFIX}")
+            cmd = [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y"]
+            if piece["mode"] == PIECE_COPY:
+                # 稍微越过关键帧时间以免取整误差导致定位到前一个关键帧；
+                # 时长少半帧，排除终点处属于下一段的关键帧
+                cmd.extend(["-ss", f"{piece['start'] + KEYFRAME_TOLERANCE:.6f}", "-i", input_file,
+                            "-t", f"{piece['end'] - piece['start'] - 0.5 / fps:.6f}",
+                            "-map", "0:v:0", "-c:v", "copy"])
+            else:
+                codec, codec_args = encoder
+                cmd.extend(["-ss", f"{piece['start']:.6f}", "-i", input_file,
+                            "-t", f"{piece['end'] - piece['start']:.6f}",
+                            "-map", "0:v:0", "-c:v", codec] + codec_args)
+                if media_info.get("pix_fmt"):
+                    cmd.extend(["-pix_fmt", media_info["pix_fmt"]])
+            cmd.extend(["-an", "-avoid_negative_ts", "make_zero", "-f", "mpegts", piece_file])
+            if not self._run(cmd):
+                return False
+            piece_files.append(piece_file)
+
+        list_file = work_dir / "pieces.txt"
+        list_file.write_text("".join(f"file '{Path(f).name}'\n" for f in piece_files), encoding="utf-8")
+
+        if progress_callback:
+            progress_callback(95, "正在拼接...")
+        cmd = [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "concat", "-safe", "0", "-i", str(list_file),
+               "-ss", f"{start:.6f}", "-t", f"{end - start:.6f}", "-i", input_file,
+               "-map", "0:v:0", "-map", "1:a:0?", "-c", "copy"]
+        if output_format:
+            cmd.extend(["-f", output_format])
+        cmd.append(output_file)
+        return self._run(cmd)
+
+    def _copy_range(self, ffmpeg_path: str, input_file: str, output_file: str, start: float, end: float,
+                    output_format: Optional[str], media_info: Dict[str, Any]) -> bool:
+        """从关键帧start开始直接复制所有流到end"""
+        cmd = [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y",
+               "-ss", f"{start + KEYFRAME_TOLERANCE:.6f}", "-i", input_file,
+               "-t", f"{end - start:.6f}", "-map", "0:v:0", "-map", "0:a:0?",
+               "-c", "copy", "-avoid_negative_ts", "make_zero"]
+        if output_format:
+            cmd.extend(["-f", output_format])
+        cmd.append(output_file)
+        return self._run(cmd)
+
+    def _run(self, cmd: list) -> bool:
+        """运行FFmpeg子命令，可被cancel()终止"""
+        print(f"执行FFmpeg命令: {' '.join(cmd)}")
+        self.current_process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                                text=True, **process_control.popen_kwargs())
+        _, stderr = self.current_process.communicate()
+        return_code = self.current_process.returncode
+        self.current_process = None
+        if return_code != 0:
+            if not self.is_cancelling:
+                print(f"FFmpeg失败 (返回码: {return_code}): {stderr.strip()[:300]}")
+            return False
+        return True
+
+
+# 全局剪切器实例
+smart_cutter = SmartCutter()
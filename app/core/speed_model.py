@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编码速度模型 - 根据编码器、速度预设、分辨率和线程数估算预期编码帧率
+
+有主机校准数据（见calibration模块）时使用实测的每核帧率和线程扩展指数，否则使用经验值。
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Any, Optional
+from app.utils.app_paths import get_data_dir
+
+
+# 编码器速度预设（由快到慢）
+SPEED_PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast",
+                 "medium", "slow", "slower", "veryslow", "placebo"]
+
+# 各速度预设相对medium的速度倍数
+PRESET_SPEED_FACTORS = {
+    "ultrafast": 8.0,
+    "superfast": 5.5,
+    "veryfast": 3.5,
+    "faster": 2.2,
+    "fast": 1.5,
+    "medium": 1.0,
+    "slow": 0.55,
+    "slower": 0.3,
+    "veryslow": 0.12,
+    "placebo": 0.04,
+}
+
+# 1080p、medium预设下每个核心的经验编码帧率（没有主机校准数据时使用）
+BASE_FPS_PER_CORE = {
+    "libx264": 12.0,
+    "libx265": 2.0,
+    "libvpx-vp9": 1.5,
+}
+
+REFERENCE_PIXELS = 1920 * 1080
+
+# 多线程并非线性扩展的经验指数
+DEFAULT_THREAD_EXPONENT = 0.85
+
+HOST_PROFILE_FILE = "host_profile.json"
+
+_profile_lock = threading.Lock()
+_profile_cache = {"mtime": None, "profile": None}
+
+
+def host_profile_path():
+    """主机校准数据文件路径"""
+    return get_data_dir() / HOST_PROFILE_FILE
+
+
+def load_host_profile() -> Optional[Dict[str, Any]]:
+    """读取主机校准数据（文件修改后自动重新加载），没有校准过时返回None"""
+    path = host_profile_path()
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    with _profile_lock:
+        if _profile_cache["mtime"] != mtime:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    _profile_cache["profile"] = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"读取主机校准数据失败: {e}")
+                _profile_cache["profile"] = None
+            _profile_cache["mtime"] = mtime
+        return _profile_cache["profile"]
+
+
+def _calibrated_speed(codec: str, preset: str) -> Optional[tuple]:
+    """校准数据中的 (1080p每核帧率, 线程扩展指数)；未校准的预设按最接近的已校准预设换算"""
+    profile = load_host_profile()
+    model = ((profile or {}).get("model") or {}).get(codec)
+    if not model or not model.get("fps_per_core"):
+        return None
+    measured = model["fps_per_core"]
+    exponent = model.get("thread_exponent") or DEFAULT_THREAD_EXPONENT
+    if preset in measured:
+        return measured[preset], exponent
+    if preset not in SPEED_PRESETS:
+        return None
+    known = [name for name in measured if name in SPEED_PRESETS]
+    if not known:
+        return None
+    nearest = min(known, key=lambda name: abs(SPEED_PRESETS.index(name) - SPEED_PRESETS.index(preset)))
+    ratio = PRESET_SPEED_FACTORS.get(preset, 1.0) / PRESET_SPEED_FACTORS.get(nearest, 1.0)
+    return measured[nearest] * ratio, exponent
+
+
+def available_cores() -> int:
+    """当前进程可用的CPU核心数（遵循CPU亲和性设置）"""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def faster_preset(preset: str) -> Optional[str]:
+    """返回比给定预设快一档的速度预设，已是最快时返回None"""
+    if preset not in SPEED_PRESETS:
+        return None
+    index = SPEED_PRESETS.index(preset)
+    return SPEED_PRESETS[index - 1] if index > 0 else None
+
+
+def estimate_encode_fps(codec: str, preset: str, width: int, height: int,
+                        threads: Optional[int] = None) -> float:
+    """估算预期编码帧率（帧/秒）"""
+    threads = threads or available_cores()
+    calibrated = _calibrated_speed(codec, preset)
+    if calibrated:
+        per_core, exponent = calibrated
+    else:
+        base = BASE_FPS_PER_CORE.get(codec, BASE_FPS_PER_CORE["libx264"])
+        per_core, exponent = base * PRESET_SPEED_FACTORS.get(preset, 1.0), DEFAULT_THREAD_EXPONENT
+
+    pixels = width * height if width and height else REFERENCE_PIXELS
+    pixel_scale = REFERENCE_PIXELS / max(pixels, 1)
+
+    return per_core * pixel_scale * (threads ** exponent)
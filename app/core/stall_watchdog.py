@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+停滞检测 - 结合预期编码速度、实际进度和进程CPU时间，区分"停滞"与"慢但仍在工作"
+"""
+
+import re
+import time
+from typing import Dict, Any, Optional
+from app.core.proc_stats import read_cpu_seconds
+
+
+# 停滞后的处理策略
+POLICY_KILL = "kill"        # 终止任务并报错
+POLICY_RETRY = "retry"      # 使用相同参数重新编码
+POLICY_DEMOTE = "demote"    # 换用更快一档的速度预设重新编码
+POLICIES = (POLICY_KILL, POLICY_RETRY, POLICY_DEMOTE)
+
+# 检测结果
+STATE_OK = "ok"
+STATE_SLOW = "slow"
+STATE_STALLED = "stalled"
+
+# 判定停滞的原因
+STALL_CPU_IDLE = "cpu_idle"         # 无进度且CPU时间不再增长
+STALL_MAX_TIMEOUT = "max_timeout"   # CPU仍有活动，但无进度超过最长容忍时间
+STALL_NO_PROGRESS = "no_progress"   # 无法读取CPU时间，仅依据无进度时长
+
+DEFAULT_WATCHDOG_CONFIG = {
+    "policy": POLICY_KILL,
+    "max_retries": 1,
+    "min_timeout": 30.0,        # 无进度超时下限（秒）
+    "max_timeout": 1800.0,      # 有CPU活动但无进度输出的最长容忍时间（秒）
+    "cpu_idle_timeout": 30.0,   # CPU时间不再增长多久视为停滞（秒）
+}
+
+# 编码器输出第一帧前需要预读的帧数（lookahead），以及超时的宽限倍数
+STARTUP_FRAMES = 60
+TIMEOUT_SLACK = 4.0
+
+# 实际帧率低于预期的比例时视为"慢"
+SLOW_RATIO = 0.25
+
+# CPU时间增长小于该值（秒）视为没有活动
+CPU_EPSILON = 0.05
+
+
+class StallWatchdog:
+    """编码进程停滞检测器"""
+
+    def __init__(self, expected_fps: float, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(DEFAULT_WATCHDOG_CONFIG, **(config or {}))
+        self.expected_fps = expected_fps
+        self.pid = None
+        self.state = STATE_OK
+        self.stall_trigger = None
+        self.paused_at = None
+
+        # 无进度超时：按预期速度计算输出首批帧所需时间，再留出宽限
+        if expected_fps > 0:
+            timeout = STARTUP_FRAMES / expected_fps * TIMEOUT_SLACK
+        else:
+            timeout = self.config["max_timeout"]
+        self.progress_timeout = min(max(timeout, self.config["min_timeout"]),
+                                    self.config["max_timeout"])
+
+    @property
+    def policy(self) -> str:
+        """停滞处理策略"""
+        policy = self.config.get("policy", POLICY_KILL)
+        return policy if policy in POLICIES else POLICY_KILL
+
+    def attach(self, pid: int):
+        """开始监控指定进程"""
+        now = time.time()
+        self.pid = pid
+        self.state = STATE_OK
+        self.stall_trigger = None
+        self.start_time = now
+        self.last_advance_time = now
+        self.last_frame = 0
+        self.last_out_time = 0.0
+        self.last_cpu = read_cpu_seconds(pid)
+        self.last_cpu_advance_time = now
+        self.cpu_supported = self.last_cpu is not None
+
+    def pause(self):
+        """进程被暂停时停止计时，避免把暂停误判为停滞"""
+        if self.paused_at is None:
+            self.paused_at = time.time()
+
+    def resume(self):
+        """进程恢复后把暂停时长从各计时点中扣除"""
+        if self.paused_at is None:
+            return
+        paused = time.time() - self.paused_at
+        self.paused_at = None
+        self.start_time += paused
+        self.last_advance_time += paused
+        self.last_cpu_advance_time += paused
+
+    def observe_line(self, line: str):
+        """从FFmpeg进度输出中提取帧数和输出时间，有推进时刷新进度时间"""
+        advanced = False
+
+        frame_match = re.match(r'frame=\s*(\d+)', line)
+        if frame_match:
+            frame = int(frame_match.group(1))
+            if frame > self.last_frame:
+                self.last_frame = frame
+                advanced = True
+
+        elif line.startswith("out_time_us="):
+            value = line.split("=", 1)[1].strip()
+            if value.lstrip("-").isdigit():
+                out_time = int(value) / 1000000.0
+                if out_time > self.last_out_time:
+                    self.last_out_time = out_time
+                    advanced = True
+
+        if advanced:
+            self.last_advance_time = time.time()
+
+    @property
+    def observed_fps(self) -> float:
+        """开始以来的平均编码帧率"""
+        elapsed = time.time() - self.start_time
+        return self.last_frame / elapsed if elapsed > 0 else 0.0
+
+    def check(self, now: Optional[float] = None) -> str:
+        """判断当前状态：ok / slow / stalled"""
+        if self.pid is None or self.paused_at is not None:
+            return STATE_OK
+        now = now or time.time()
+
+        if self.cpu_supported:
+            cpu = read_cpu_seconds(self.pid)
+            if cpu is not None and cpu - self.last_cpu > CPU_EPSILON:
+                self.last_cpu = cpu
+                self.last_cpu_advance_time = now
+
+        since_progress = now - self.last_advance_time
+
+        if since_progress <= self.progress_timeout:
+            warmed_up = now - self.start_time > self.progress_timeout
+            if warmed_up and self.expected_fps > 0 and self.observed_fps < self.expected_fps * SLOW_RATIO:
+                self.state = STATE_SLOW
+            else:
+                self.state = STATE_OK
+        elif self.cpu_supported:
+            # 无进度输出时以CPU活动区分：仍在消耗CPU则只是慢，CPU停止增长才是停滞
+            cpu_idle = now - self.last_cpu_advance_time > self.config["cpu_idle_timeout"]
+            if cpu_idle:
+                self.state = STATE_STALLED
+                self.stall_trigger = STALL_CPU_IDLE
+            elif since_progress > self.config["max_timeout"]:
+                self.state = STATE_STALLED
+                self.stall_trigger = STALL_MAX_TIMEOUT
+            else:
+                self.state = STATE_SLOW
+        else:
+            # 无法读取CPU时间时只能依据进度，放宽到自适应超时的3倍
+            if since_progress > self.progress_timeout * 3:
+                self.state = STATE_STALLED
+                self.stall_trigger = STALL_NO_PROGRESS
+            else:
+                self.state = STATE_SLOW
+
+        return self.state
+
+    def describe_stall(self, trigger: Optional[str] = None, now: Optional[float] = None) -> str:
+        """按触发停滞判定的原因（check()记录在stall_trigger中）生成描述"""
+        now = now or time.time()
+        since_progress = now - self.last_advance_time
+        if trigger == STALL_CPU_IDLE:
+            cpu_idle = now - self.last_cpu_advance_time
+            return f"FFmpeg进程已停滞（{since_progress:.0f}秒无进度，CPU已{cpu_idle:.0f}秒无活动）"
+        if trigger == STALL_MAX_TIMEOUT:
+            return (f"FFmpeg进程已停滞（{since_progress:.0f}秒无进度，超过最长容忍时间"
+                    f"{self.config['max_timeout']:.0f}秒，CPU仍有活动）")
+        return f"FFmpeg进程已停滞（{since_progress:.0f}秒无进度）"
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存储设备感知 - 按设备（st_dev）限制并发任务数，并在开始任务前检查剩余空间
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Set, Iterable
+
+
+# 设备类型
+DEVICE_ROTATIONAL = "rotational"
+DEVICE_NON_ROTATIONAL = "non_rotational"
+DEVICE_UNKNOWN = "unknown"          # 网络文件系统、虚拟设备等无法判断的情况
+
+DEFAULT_DEVICE_LIMITS = {
+    DEVICE_ROTATIONAL: 1,
+    DEVICE_NON_ROTATIONAL: 4,
+    DEVICE_UNKNOWN: 2,
+}
+
+
+def existing_ancestor(path: str) -> Path:
+    """返回路径自身或最近的已存在的上级目录（输出文件可能尚未创建）"""
+    current = Path(path).absolute()
+    while not current.exists() and current.parent != current:
+        current = current.parent
+    return current
+
+
+def device_of(path: str) -> Optional[int]:
+    """路径所在设备的st_dev"""
+    try:
+        return os.stat(existing_ancestor(path)).st_dev
+    except OSError:
+        return None
+
+
+def detect_device_type(dev: int) -> str:
+    """
+    通过 /sys/dev/block/<major>:<minor> 判断设备是否为机械硬盘
+
+    分区本身没有queue目录，需要到上级的整盘设备读取queue/rotational。
+    """
+    if not hasattr(os, "major"):
+        return DEVICE_UNKNOWN
+
+    sys_path = Path(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}")
+    try:
+        device_dir = sys_path.resolve(strict=True)
+    except (OSError, RuntimeError):
+        return DEVICE_UNKNOWN
+
+    for candidate in (device_dir, device_dir.parent):
+        rotational_file = candidate / "queue" / "rotational"
+        try:
+            value = rotational_file.read_text().strip()
+        except OSError:
+            continue
+        return DEVICE_ROTATIONAL if value == "1" else DEVICE_NON_ROTATIONAL
+
+    return DEVICE_UNKNOWN
+
+
+def free_space_bytes(path: str) -> Optional[int]:
+    """路径所在文件系统对普通用户可用的剩余空间"""
+    try:
+        stat = os.statvfs(existing_ancestor(path))
+    except (OSError, AttributeError):
+        return None
+    return stat.f_bavail * stat.f_frsize
+
+
+class DeviceScheduler:
+    """按存储设备限制并发任务，并为运行中任务预留输出空间"""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None,
+                 overrides: Optional[Dict[str, int]] = None,
+                 free_space_margin_mb: int = 512):
+        self.limits = dict(DEFAULT_DEVICE_LIMITS, **(limits or {}))
+        self.free_space_margin = free_space_margin_mb * 1024 * 1024
+        self.overrides = self._resolve_overrides(overrides or {})
+        self._device_types: Dict[int, str] = {}
+        self._running: Dict[Any, Set[int]] = {}
+        self._suspended: Set[Any] = set()    # 被暂停抢占的任务，不占用设备并发
+        self._reserved: Dict[Any, tuple] = {}  # job_id -> (输出设备, 预留字节)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _resolve_overrides(overrides: Dict[str, int]) -> Dict[int, int]:
+        """把按路径配置的并发上限转换为按设备的上限"""
+        resolved = {}
+        for path, limit in overrides.items():
+            dev = device_of(path)
+            if dev is not None:
+                resolved[dev] = int(limit)
+        return resolved
+
+    def device_limit(self, dev: int) -> int:
+        """设备的并发任务上限（配置优先，否则按自动检测的设备类型）"""
+        if dev in self.overrides:
+            return self.overrides[dev]
+        if dev not in self._device_types:
+            self._device_types[dev] = detect_device_type(dev)
+        return max(1, self.limits.get(self._device_types[dev], DEFAULT_DEVICE_LIMITS[DEVICE_UNKNOWN]))
+
+    @staticmethod
+    def job_devices(input_file: str, output_file: str) -> Set[int]:
+        """任务读写涉及的设备"""
+        return {dev for dev in (device_of(input_file), device_of(output_file)) if dev is not None}
+
+    def _busy(self, dev: int, ignore: Iterable[Any] = ()) -> int:
+        """设备上正在读写的任务数（不含被抢占的和ignore中的任务）"""
+        return sum(1 for job_id, devices in self._running.items()
+                   if dev in devices and job_id not in self._suspended and job_id not in ignore)
+
+    def can_start(self, input_file: str, output_file: str, ignore: Iterable[Any] = ()) -> bool:
+        """
+        任务涉及的每个设备是否都还有并发余量
+
+        Args:
+            ignore: 不计入占用的任务（如即将被抢占的任务，或要恢复的任务自身）
+        """
+        ignore = set(ignore)
+        with self._lock:
+            for dev in self.job_devices(input_file, output_file):
+                busy = self._busy(dev, ignore)
+                if busy >= self.device_limit(dev):
+                    return False
+            return True
+
+    def check_free_space(self, output_file: str, estimated_bytes: int,
+                         include_reserved: bool = True) -> Optional[str]:
+        """
+        检查输出所在文件系统是否能容纳预计输出（默认扣除其他运行任务的预留）
+
+        Returns:
+            Optional[str]: 空间不足时返回原因，否则返回None
+        """
+        available = free_space_bytes(output_file)
+        if available is None or not estimated_bytes:
+            return None
+
+        dev = device_of(output_file)
+        reserved = 0
+        if include_reserved:
+            with self._lock:
+                reserved = sum(size for reserved_dev, size in self._reserved.values() if reserved_dev == dev)
+
+        required = estimated_bytes + self.free_space_margin
+        if available - reserved < required:
+            return (f"磁盘空间不足: 需要约 {required / 1024 / 1024:.0f} MB，"
+                    f"可用 {max(available - reserved, 0) / 1024 / 1024:.0f} MB")
+        return None
+
+    def acquire(self, job_id: Any, input_file: str, output_file: str, estimated_bytes: int = 0):
+        """登记任务开始运行"""
+        with self._lock:
+            self._running[job_id] = self.job_devices(input_file, output_file)
+            self._reserved[job_id] = (device_of(output_file), estimated_bytes or 0)
+
+    def suspend(self, job_id: Any):
+        """任务被抢占暂停：让出设备并发，保留空间预留"""
+        with self._lock:
+            if job_id in self._running:
+                self._suspended.add(job_id)
+
+    def resume(self, job_id: Any):
+        """被抢占的任务恢复运行，重新占用设备并发"""
+        with self._lock:
+            self._suspended.discard(job_id)
+
+    def release(self, job_id: Any):
+        """任务结束，释放设备并发和空间预留"""
+        with self._lock:
+            self._running.pop(job_id, None)
+            self._reserved.pop(job_id, None)
+            self._suspended.discard(job_id)
+
+    def usage(self) -> List[Dict[str, Any]]:
+        """各设备当前的并发情况"""
+        with self._lock:
+            devices = {dev for devs in self._running.values() for dev in devs}
+            return [{
+                "device": f"{os.major(dev)}:{os.minor(dev)}" if hasattr(os, "major") else str(dev),
+                "type": self._device_types.get(dev, DEVICE_UNKNOWN),
+                "running": self._busy(dev),
+                "limit": self.device_limit(dev),
+            } for dev in devices]
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+线程预算规划 - 在并发的FFmpeg任务之间分配CPU核心，并转换为各编码器的线程参数
+"""
+
+import math
+import threading
+from typing import Dict, List, Optional, Callable, Hashable
+from app.core.speed_model import available_cores
+
+
+# VP9每个tile列的最小宽度（像素）
+VP9_MIN_TILE_WIDTH = 256
+
+
+def split_cores(total_cores: int, job_count: int) -> List[int]:
+    """把核心数尽量平均地分给job_count个任务，余数分给前面的任务"""
+    if job_count <= 0:
+        return []
+    base, remainder = divmod(total_cores, job_count)
+    return [max(1, base + (1 if i < remainder else 0)) for i in range(job_count)]
+
+
+def codec_thread_args(codec: str, threads: Optional[int], width: int = 0) -> List[str]:
+    """
+    把线程预算转换为编码器参数
+
+    threads为None表示单任务独占机器：x264/x265保持编码器自动线程，VP9仍需开启行级多线程。
+    """
+    if codec == "libvpx-vp9":
+        threads = threads or available_cores()
+        # tile列数受画面宽度限制，且超过线程数没有意义
+        max_columns = max(1, (width or 1920) // VP9_MIN_TILE_WIDTH)
+        columns = max(1, min(threads, max_columns))
+        tile_columns_log2 = int(math.log2(columns))
+        return ["-threads", str(threads), "-row-mt", "1", "-tile-columns", str(tile_columns_log2)]
+
+    if threads is None:
+        return []
+
+    if codec == "libx265":
+        # x265使用自己的线程池，pools限制池中的线程数
+        return ["-x265-params", f"pools={threads}"]
+
+    # libx264等编码器通过 -threads 设置（libx264对应x264的threads参数）
+    return ["-threads", str(threads)]
+
+
+class ThreadBudgetPlanner:
+    """为并发任务分配线程预算，任务开始或结束时重新平衡"""
+
+    def __init__(self, total_cores: Optional[int] = None):
+        self.total_cores = total_cores or available_cores()
+        self.budgets: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Dict[Hashable, int]], None]] = []
+
+    def add_listener(self, callback: Callable[[Dict[Hashable, int]], None]):
+        """注册预算变化回调，参数为变化了的 {任务ID: 线程数}"""
+        self._listeners.append(callback)
+
+    def allocate(self, job_id: Hashable, expected_jobs: int = 1) -> int:
+        """
+        为新任务分配线程预算
+
+        Args:
+            job_id: 任务ID
+            expected_jobs: 本轮调度后预计同时运行的任务数（含已运行的任务）
+        """
+        with self._lock:
+            job_ids = list(self.budgets.keys()) + [job_id]
+            changed = self._rebalance(job_ids, max(expected_jobs, len(job_ids)))
+            budget = self.budgets[job_id]
+        changed.pop(job_id, None)
+        self._notify(changed)
+        return budget
+
+    def release(self, job_id: Hashable):
+        """任务结束，把它的核心重新分给其余任务"""
+        with self._lock:
+            if job_id not in self.budgets:
+                return
+            del self.budgets[job_id]
+            job_ids = list(self.budgets.keys())
+            changed = self._rebalance(job_ids, len(job_ids))
+        self._notify(changed)
+
+    def _rebalance(self, job_ids: List[Hashable], slot_count: int) -> Dict[Hashable, int]:
+        """重新计算预算，返回有变化的任务"""
+        shares = split_cores(self.total_cores, slot_count)
+        changed = {}
+        for job_id, share in zip(job_ids, shares):
+            if self.budgets.get(job_id) != share:
+                self.budgets[job_id] = share
+                changed[job_id] = share
+        return changed
+
+    def _notify(self, changed: Dict[Hashable, int]):
+        """通知运行中任务的预算变化"""
+        if not changed:
+            return
+        for callback in list(self._listeners):
+            try:
+                callback(changed)
+            except Exception as e:
+                print(f"线程预算回调执行失败: {e}")
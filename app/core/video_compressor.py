@@ -6,12 +6,35 @@
 
 import os
 import re
+import signal
 import subprocess
 import time
 from pathlib import Path
 from typing import Dict, Any, Optional, Callable
 from app.core.compression_presets import compression_presets
+from app.core.content_analysis import CONTENT_AUTO, CONTENT_SCREEN, content_analyzer, screen_settings
+from app.core.crop_detect import crop_detector
+from app.core.scene_detect import resolve_scene_config, scene_detector, scene_keyframe_args
 from app.core.ffmpeg_manager import ffmpeg_manager
+from app.core.filter_graph import plan_video_filters
+from app.core import atomic_output
+from app.core.media_probe import media_probe
+from app.core.merge import prepare_merge_source, release_merge_source
+from app.core import process_control
+from app.core.mp4_layout import apply_layout
+from app.core.packaging import (
+    PACKAGING_HLS, build_packaging_args, keyframe_args, package_dir, resolve_packaging, verify_package
+)
+from app.core.renditions import (
+    build_ladder_args, build_ladder_stream_args, rendition_output_path, rendition_width,
+    resolve_ladder, select_renditions
+)
+from app.core.resource_monitor import ResourceMonitor
+from app.core.speed_model import estimate_encode_fps, faster_preset
+from app.core.eta import EtaEstimator
+from app.core.stall_watchdog import (
+    StallWatchdog, STATE_STALLED, STATE_SLOW, POLICY_RETRY, POLICY_DEMOTE
+)
 
 
 class VideoCompressor:
@@ -21,6 +44,12 @@ class VideoCompressor:
         self.ffmpeg_manager = ffmpeg_manager
         self.current_process = None
         self.is_cancelling = False
+        self.is_paused = False
+        self.stall_reason = None
+        self.watchdog = None
+        self.background_override = None
+        self.resource_monitor = None
+        self.eta = None
         
     def compress_video(self, 
                       input_file: str, 
@@ -41,6 +70,9 @@ class VideoCompressor:
         Returns:
             bool: 压缩是否成功
         """
+        temp_files = []
+        source = None
+        self.background_override = None
         try:
             # 检查FFmpeg可用性
             ffmpeg_info = self.ffmpeg_manager.get_ffmpeg_info()
@@ -59,19 +91,112 @@ class VideoCompressor:
             output_path = Path(output_file)
             output_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # 构建FFmpeg命令
-            cmd = self._build_ffmpeg_command(input_file, output_file, settings)
-            
             if progress_callback:
                 progress_callback(0, "开始压缩...")
             
-            # 获取视频时长用于计算进度
-            duration = self._get_video_duration(input_file)
+            # 获取视频信息用于计算进度和预期编码速度
+            if settings.get("merge_inputs"):
+                # 合并分段：拼接结果直接作为本次编码的输入，不产生中间文件
+                source = prepare_merge_source(settings["merge_inputs"], settings.get("keep_audio", True))
+                media_info = source["media_info"]
+                duration = source["duration"]
+            else:
+                media_info = media_probe.probe(input_file)
+                duration = media_info.get("duration") or self._get_video_duration(input_file)
+                if settings.get("auto_crop"):
+                    media_info = self._apply_crop(input_file, media_info, progress_callback)
+                if settings.get("auto_preset"):
+                    if progress_callback:
+                        progress_callback(None, "正在分析内容复杂度...")
+                    settings = content_analyzer.suggest_settings(input_file, settings)
+                if settings.get("content_mode"):
+                    settings = self._apply_content_mode(input_file, settings, progress_callback)
+            
+            # 多码率模式下每个版本一个输出，分片封装输出一个目录，否则只有一个输出
+            output_format = atomic_output.get_container_format(output_file)
+            renditions = None
+            if settings.get("renditions"):
+                renditions = select_renditions(resolve_ladder(settings["renditions"]),
+                                               self._effective_size(media_info)[1])
+            packaging = resolve_packaging(settings, compression_presets.get_preset(settings.get("preset", "standard")))
+            if packaging:
+                output_files = [package_dir(output_file, packaging)]
+            elif renditions:
+                output_files = [rendition_output_path(output_file, rendition) for rendition in renditions]
+            else:
+                output_files = [output_file]
+            
+            # 场景边界处强制关键帧（分片封装需要固定间隔的关键帧，不叠加）
+            scene_config = resolve_scene_config(settings.get("scene_keyframes"))
+            if scene_config and not packaging and not source:
+                if progress_callback:
+                    progress_callback(None, "正在检测场景切换...")
+                media_info = dict(media_info, scene_boundaries=scene_detector.detect(
+                    input_file, scene_config["threshold"], scene_config["min_chunk_seconds"]))
+            
+            # 先写入同目录的临时文件（或目录），完成并校验后再原子重命名
+            temp_files = [atomic_output.make_temp_output_path(path) for path in output_files]
+            if packaging:
+                self._prepare_package_dir(temp_files[0], packaging, renditions)
             
-            # 执行压缩
-            success = self._execute_compression(cmd, duration, progress_callback, error_callback)
+            # 执行压缩（检测到停滞时按策略重试或降档）
+            job_settings = settings
+            retries = 0
+            while True:
+                if packaging:
+                    cmd = self._build_package_command(input_file, temp_files[0], job_settings, packaging,
+                                                      renditions, media_info, source)
+                elif renditions:
+                    cmd = self._build_ladder_command(input_file, temp_files, job_settings, renditions,
+                                                     output_format, media_info, source)
+                else:
+                    cmd = self._build_ffmpeg_command(input_file, temp_files[0], job_settings, output_format,
+                                                     media_info, source)
+                watchdog = self._create_watchdog(job_settings, media_info, renditions)
+                self.eta = self._create_eta(job_settings, media_info, duration, watchdog)
+                success = self._execute_compression(cmd, duration, progress_callback, error_callback,
+                                                    watchdog, job_settings)
+                if success or not self.stall_reason or self.is_cancelling:
+                    break
+                
+                next_settings = self._settings_after_stall(job_settings, watchdog, retries)
+                if next_settings is None:
+                    if error_callback:
+                        error_callback(self.stall_reason)
+                    break
+                
+                retries += 1
+                job_settings = next_settings
+                if progress_callback:
+                    progress_callback(None, f"{self.stall_reason}，正在第 {retries} 次重试...")
             
-            if success and not self.is_cancelling:
+            if success and not self.is_cancelling and packaging:
+                multi_rendition = bool(renditions and len(renditions) > 1)
+                if not verify_package(temp_files[0], packaging, multi_rendition):
+                    if error_callback:
+                        error_callback("分片输出不完整，已丢弃")
+                    return False
+                if not atomic_output.commit_output_dir(temp_files[0], output_files[0]):
+                    if error_callback:
+                        error_callback("无法写入分片输出目录")
+                    return False
+                temp_files = []
+                if progress_callback:
+                    progress_callback(100, "压缩完成")
+                return True
+            elif success and not self.is_cancelling:
+                # 全部校验通过后再逐个提交，避免只留下部分版本
+                for temp_file in temp_files:
+                    if not atomic_output.verify_output_file(temp_file, output_format):
+                        if error_callback:
+                            error_callback("输出文件不完整，已丢弃")
+                        return False
+                for temp_file, final_file in list(zip(temp_files, output_files)):
+                    if not atomic_output.commit_output(temp_file, final_file, output_format):
+                        if error_callback:
+                            error_callback("输出文件不完整，已丢弃")
+                        return False
+                    temp_files.remove(temp_file)
                 if progress_callback:
                     progress_callback(100, "压缩完成")
                 return True
@@ -82,10 +207,78 @@ class VideoCompressor:
             if error_callback:
                 error_callback(f"压缩过程中发生错误: {str(e)}")
             return False
+        finally:
+            # 取消、失败、超时都不应留下截断的输出
+            for temp_file in temp_files:
+                atomic_output.discard_output(temp_file)
+            release_merge_source(source)
+    
+    def _resolve_video_params(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """合并预设和用户设置，得到实际使用的视频编码器和速度预设"""
+        preset_data = compression_presets.get_preset(settings.get("preset", "standard"))
+        return {
+            "codec": settings.get("video_codec") or preset_data["video"]["codec"],
+            "preset": settings.get("encode_preset") or preset_data["video"]["preset"],
+        }
+    
+    def _create_watchdog(self, settings: Dict[str, Any], media_info: Dict[str, Any],
+                         renditions: Optional[list] = None) -> StallWatchdog:
+        """根据探测信息和编码设置创建停滞检测器"""
+        video_params = self._resolve_video_params(settings)
+        source_width, source_height = self._effective_size(media_info)
+        if renditions:
+            # 多码率时每帧要依次经过所有版本的编码器，预期帧率按各版本耗时相加
+            seconds_per_frame = sum(
+                1.0 / estimate_encode_fps(video_params["codec"], video_params["preset"],
+                                          rendition_width(rendition, source_width, source_height),
+                                          rendition["height"], settings.get("threads"))
+                for rendition in renditions
+            )
+            return StallWatchdog(1.0 / seconds_per_frame, settings.get("watchdog"))
+        
+        resolution = settings.get("resolution", {})
+        width = resolution.get("width") or source_width
+        height = resolution.get("height") or source_height
+        expected_fps = estimate_encode_fps(video_params["codec"], video_params["preset"], width, height,
+                                           settings.get("threads"))
+        return StallWatchdog(expected_fps, settings.get("watchdog"))
+    
+    def _create_eta(self, settings: Dict[str, Any], media_info: Dict[str, Any], duration: float,
+                    watchdog: StallWatchdog) -> EtaEstimator:
+        """根据输出帧数和预期编码速度创建剩余时间估算器"""
+        output_fps = settings.get("framerate", {}).get("fps") or media_info.get("fps") or 0
+        total_frames = duration * output_fps if duration and output_fps else 0
+        if not total_frames and not settings.get("framerate", {}).get("fps"):
+            total_frames = media_info.get("nb_frames", 0)
+        # 丢弃重复帧时输出帧数少于预计，只能按输出时间计算进度
+        decimate = (self._merged_preset(settings).get("video_filters") or {}).get("decimate")
+        return EtaEstimator(total_frames, duration, watchdog.expected_fps, count_frames=not decimate)
+    
+    def get_eta(self) -> Optional[Dict[str, Any]]:
+        """当前任务的进度和预计剩余时间"""
+        return self.eta.snapshot() if self.eta else None
+    
+    def _settings_after_stall(self, settings: Dict[str, Any], watchdog: StallWatchdog,
+                              retries: int) -> Optional[Dict[str, Any]]:
+        """按停滞策略生成下一次尝试的设置，不再重试时返回None"""
+        if retries >= watchdog.config["max_retries"]:
+            return None
+        
+        if watchdog.policy == POLICY_RETRY:
+            return settings
+        
+        if watchdog.policy == POLICY_DEMOTE:
+            current = self._resolve_video_params(settings)["preset"]
+            demoted = faster_preset(current)
+            if demoted:
+                print(f"编码停滞，速度预设降档: {current} -> {demoted}")
+                return dict(settings, encode_preset=demoted)
+            return settings
+        
+        return None
     
-    def _build_ffmpeg_command(self, input_file: str, output_file: str, settings: Dict[str, Any]) -> list:
-        """构建FFmpeg命令"""
-        # 获取预设配置
+    def _merged_preset(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """获取预设配置，并用用户自定义设置覆盖"""
         preset_name = settings.get("preset", "standard")
         preset_data = compression_presets.get_preset(preset_name)
         
@@ -105,11 +298,226 @@ class VideoCompressor:
         if settings.get("audio_codec"):
             preset_data["audio"]["codec"] = settings["audio_codec"]
         
-        # 构建分辨率参数
+        if settings.get("tune"):
+            preset_data["video"]["tune"] = settings["tune"]
+        
+        if settings.get("video_filters"):
+            preset_data["video_filters"] = dict(preset_data.get("video_filters") or {}, **settings["video_filters"])
+        
+        return preset_data
+    
+    def _apply_mp4_layout(self, preset_data: Dict[str, Any], settings: Dict[str, Any],
+                          output_format: Optional[str], media_info: Optional[Dict[str, Any]]):
+        """按mp4_layout设置（或预设中的布局）替换MP4封装参数"""
+        if output_format not in ("mp4", "mov"):
+            return
+        layout = settings.get("mp4_layout") or preset_data.get("mp4_layout")
+        # 预留moov按输出帧率估算（帧率转换、丢弃重复帧后的帧数与源文件不同）
+        plan = plan_video_filters(media_info or {}, (media_info or {}).get("crop"), None,
+                                  settings.get("framerate", {}).get("fps"), preset_data.get("video_filters"))
+        preset_data["filters"] = apply_layout(preset_data.get("filters", []), layout, media_info,
+                                              plan["fps"] or None)
+    
+    def _apply_crop(self, input_file: str, media_info: Dict[str, Any],
+                    progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """检测黑边，返回带crop字段的媒体信息（width/height仍为原始尺寸）"""
+        if progress_callback:
+            progress_callback(None, "正在检测黑边...")
+        crop = crop_detector.detect(input_file)
+        if not crop:
+            return media_info
+        return dict(media_info, crop=crop)
+    
+    def plan_chunks(self, input_file: str, settings: Optional[Dict[str, Any]] = None) -> list:
+        """按场景边界规划分段 [(起点, 终点), ...]，供分段编码使用"""
+        scene_config = resolve_scene_config((settings or {}).get("scene_keyframes") or True)
+        return scene_detector.chunks(input_file, scene_config["min_chunk_seconds"], scene_config["threshold"])
+    
+    def _apply_content_mode(self, input_file: str, settings: Dict[str, Any],
+                            progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """按内容模式（auto时先分析重复帧比例）调整压缩设置"""
+        if settings["content_mode"] == CONTENT_AUTO and progress_callback:
+            progress_callback(None, "正在分析画面内容...")
+        mode = content_analyzer.resolve_content_mode(input_file, settings["content_mode"],
+                                                     settings.get("screen_mode"))
+        if mode == CONTENT_SCREEN:
+            codec = self._resolve_video_params(settings)["codec"]
+            return screen_settings(settings, codec, settings.get("screen_mode"))
+        return settings
+    
+    @staticmethod
+    def _effective_size(media_info: Optional[Dict[str, Any]]) -> tuple:
+        """裁剪黑边后的画面尺寸"""
+        media_info = media_info or {}
+        crop = media_info.get("crop")
+        if crop:
+            return crop["width"], crop["height"]
+        return media_info.get("width", 0), media_info.get("height", 0)
+    
+    def _input_args(self, input_file: str, source: Optional[Dict[str, Any]]) -> list:
+        """输入参数：单个文件，或合并分段时的concat分离器/多个输入"""
+        return list(source["input_args"]) if source else ["-i", input_file]
+    
+    def _source_filter_args(self, source: Optional[Dict[str, Any]], keep_audio: bool,
+                            video_filter: str = "") -> list:
+        """
+        合并分段需要转码时，把拼接滤镜的输出映射到单个输出
+
+        -vf不能与-filter_complex的输出同时使用，缩放等滤镜(video_filter)接在拼接滤镜之后。
+        """
+        if not source or not source["filter"]:
+            return []
+        graph, video_pad = source["filter"], source["video_pad"]
+        if video_filter:
+            graph += f";{video_pad}{video_filter}[vfinal]"
+            video_pad = "[vfinal]"
+        args = ["-filter_complex", graph, "-map", video_pad]
+        if keep_audio and source["audio_map"]:
+            args.extend(["-map", source["audio_map"]])
+        return args
+    
+    @staticmethod
+    def _vfr_args(preset_data: Dict[str, Any]) -> list:
+        """多码率滤镜图中丢弃了重复帧时，以可变帧率输出"""
+        if (preset_data.get("video_filters") or {}).get("decimate"):
+            return ["-vsync", "vfr"]
+        return []
+    
+    @staticmethod
+    def _take_video_filter(args: list, source: Optional[Dict[str, Any]]) -> tuple:
+        """输入经过拼接滤镜时，从参数中取出 -vf 以便接到滤镜图中"""
+        if not source or not source["filter"] or "-vf" not in args:
+            return args, ""
+        index = args.index("-vf")
+        return args[:index] + args[index + 2:], args[index + 1]
+    
+    def _ladder_source_args(self, source: Optional[Dict[str, Any]], default_audio_map: str,
+                            media_info: Optional[Dict[str, Any]] = None,
+                            settings: Optional[Dict[str, Any]] = None,
+                            preset_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """多码率滤镜图的视频来源、音频映射和前置滤镜（裁剪、去隔行、帧率、降噪在split之前只做一次）"""
+        if not source:
+            plan = plan_video_filters(media_info or {}, (media_info or {}).get("crop"), None,
+                                      (settings or {}).get("framerate", {}).get("fps"),
+                                      (preset_data or {}).get("video_filters"))
+            if plan["vf"]:
+                return {"video_source": "[vpre]", "filter_prefix": f"[0:v]{plan['vf']}[vpre]"}
+            return {}
+        return {
+            "video_source": source["video_pad"],
+            "audio_map": source["audio_map"] or default_audio_map,
+            "filter_prefix": source["filter"],
+        }
+    
+    def _build_ladder_command(self, input_file: str, output_files: list, settings: Dict[str, Any],
+                              renditions: list, output_format: Optional[str] = None,
+                              media_info: Optional[Dict[str, Any]] = None,
+                              source: Optional[Dict[str, Any]] = None) -> list:
+        """构建多码率命令：一次解码，split后分别缩放编码到各输出"""
+        media_info = media_info or {}
+        preset_data = self._merged_preset(settings)
+        self._apply_mp4_layout(preset_data, settings, output_format, media_info)
+        args = build_ladder_args(
+            preset_data,
+            renditions,
+            output_files,
+            keep_audio=settings.get("keep_audio", True),
+            threads=settings.get("threads"),
+            source_width=self._effective_size(media_info)[0],
+            source_height=self._effective_size(media_info)[1],
+            output_format=output_format,
+            **self._ladder_source_args(source, "0:a:0?", media_info, settings, preset_data)
+        )
+        
+        # 每个输出各自强制场景关键帧（输出参数必须放在对应输出路径之前）
+        keyframes = scene_keyframe_args(media_info.get("scene_boundaries"))
+        if keyframes:
+            for output in output_files:
+                index = args.index(output)
+                args[index:index] = keyframes
+        
+        ffmpeg_path = self.ffmpeg_manager.get_ffmpeg_info()["path"]
+        cmd = [ffmpeg_path, "-y"] + self._input_args(input_file, source)
+        cmd.extend(["-progress", "pipe:2", "-stats"])
+        cmd.extend(self._vfr_args(preset_data))
+        cmd.extend(args)
+        return cmd
+    
+    def _prepare_package_dir(self, directory: str, packaging: Dict[str, Any], renditions: Optional[list]):
+        """创建分片临时目录（多码率HLS每个版本一个子目录）"""
+        Path(directory).mkdir()
+        if packaging["format"] == PACKAGING_HLS and renditions and len(renditions) > 1:
+            for name in ["audio"] + [rendition["name"] for rendition in renditions]:
+                (Path(directory) / name).mkdir()
+    
+    def _build_package_command(self, input_file: str, directory: str, settings: Dict[str, Any],
+                               packaging: Dict[str, Any], renditions: Optional[list] = None,
+                               media_info: Optional[Dict[str, Any]] = None,
+                               source: Optional[Dict[str, Any]] = None) -> list:
+        """构建直接输出HLS/DASH分片的命令（多码率时所有版本写入同一个封装器）"""
+        media_info = media_info or {}
+        preset_data = self._merged_preset(settings)
+        # faststart等MP4封装参数对分片输出无意义
+        preset_data["filters"] = []
+        # 分片的流映射（var_stream_map/adaptation_sets）必须与实际音轨一致，探测不到音轨时按无音频处理
+        with_audio = settings.get("keep_audio", True) and media_info.get("has_audio", False)
+        
+        ffmpeg_path = self.ffmpeg_manager.get_ffmpeg_info()["path"]
+        cmd = [ffmpeg_path, "-y"] + self._input_args(input_file, source)
+        cmd.extend(["-progress", "pipe:2", "-stats"])
+        
+        if renditions and len(renditions) > 1:
+            cmd.extend(build_ladder_stream_args(
+                preset_data,
+                renditions,
+                with_audio=with_audio,
+                threads=settings.get("threads"),
+                source_width=self._effective_size(media_info)[0],
+                source_height=self._effective_size(media_info)[1],
+                **self._ladder_source_args(source, "0:a:0", media_info, settings, preset_data)
+            ))
+            cmd.extend(self._vfr_args(preset_data))
+            rendition_names = [rendition["name"] for rendition in renditions]
+        else:
+            custom_resolution = None
+            if renditions:
+                custom_resolution = (renditions[0].get("width"), renditions[0]["height"])
+            elif settings.get("resolution", {}).get("width") or settings.get("resolution", {}).get("height"):
+                custom_resolution = (settings["resolution"].get("width"), settings["resolution"].get("height"))
+            args = compression_presets.get_ffmpeg_args(
+                preset_data,
+                input_file,
+                directory,
+                keep_audio=with_audio,
+                custom_resolution=custom_resolution,
+                custom_framerate=settings.get("framerate", {}).get("fps"),
+                threads=settings.get("threads"),
+                source_width=media_info.get("width", 0),
+                crop=media_info.get("crop"),
+                source_info=media_info
+            )
+            args, video_filter = self._take_video_filter(args, source)
+            cmd.extend(self._source_filter_args(source, with_audio, video_filter))
+            cmd.extend(args[2:-2])  # 排除输入、-y和输出
+            rendition_names = None
+        
+        cmd.extend(keyframe_args(packaging))
+        cmd.extend(build_packaging_args(packaging, directory, rendition_names, with_audio))
+        return cmd
+    
+    def _build_ffmpeg_command(self, input_file: str, output_file: str, settings: Dict[str, Any],
+                              output_format: Optional[str] = None,
+                              media_info: Optional[Dict[str, Any]] = None,
+                              source: Optional[Dict[str, Any]] = None) -> list:
+        """构建FFmpeg命令（output_format不为空时显式指定封装格式，source为合并分段时的输入）"""
+        preset_data = self._merged_preset(settings)
+        self._apply_mp4_layout(preset_data, settings, output_format, media_info)
+        
+        # 构建分辨率参数（目标框，保持宽高比且不放大）
         resolution = settings.get("resolution", {})
         custom_resolution = None
-        if resolution.get("width") and resolution.get("height"):
-            custom_resolution = (resolution["width"], resolution["height"])
+        if resolution.get("width") or resolution.get("height"):
+            custom_resolution = (resolution.get("width"), resolution.get("height"))
         
         # 构建帧率参数
         framerate = settings.get("framerate", {})
@@ -117,6 +525,8 @@ class VideoCompressor:
         
         # 保留音频设置
         keep_audio = settings.get("keep_audio", True)
+        if source and not source["audio_map"]:
+            keep_audio = False
         
         # 使用预设管理器生成FFmpeg参数
         args = compression_presets.get_ffmpeg_args(
@@ -125,7 +535,11 @@ class VideoCompressor:
             output_file,
             keep_audio=keep_audio,
             custom_resolution=custom_resolution if custom_resolution else None,
-            custom_framerate=custom_framerate
+            custom_framerate=custom_framerate,
+            threads=settings.get("threads"),
+            source_width=(media_info or {}).get("width", 0),
+            crop=(media_info or {}).get("crop"),
+            source_info=media_info
         )
         
         # 获取FFmpeg可执行文件路径
@@ -134,10 +548,15 @@ class VideoCompressor:
         # 构建完整命令，添加进度和统计信息输出
         cmd = [ffmpeg_path]
         cmd.extend(["-y"])  # 覆盖输出文件
-        cmd.extend(["-i", input_file])
+        cmd.extend(self._input_args(input_file, source))
+        args, video_filter = self._take_video_filter(args, source)
+        cmd.extend(self._source_filter_args(source, keep_audio, video_filter))
         cmd.extend(args[2:-1])  # 排除输入和输出文件部分
+        cmd.extend(scene_keyframe_args((media_info or {}).get("scene_boundaries")))
         cmd.extend(["-progress", "pipe:2"])  # 进度输出到stderr
         cmd.extend(["-stats"])  # 显示统计信息
+        if output_format:
+            cmd.extend(["-f", output_format])
         cmd.append(output_file)
         
         return cmd
@@ -183,25 +602,41 @@ class VideoCompressor:
     
     def _execute_compression(self, cmd: list, duration: float, 
                            progress_callback: Optional[Callable], 
-                           error_callback: Optional[Callable]) -> bool:
-        """执行压缩命令"""
+                           error_callback: Optional[Callable],
+                           watchdog: Optional[StallWatchdog] = None,
+                           settings: Optional[Dict[str, Any]] = None) -> bool:
+        """执行压缩命令（settings中的进程级设置在启动FFmpeg时生效）"""
         try:
-            self.is_cancelling = False
+            self.stall_reason = None
+            # 探测、裁剪检测、内容分析期间收到的取消请求在启动FFmpeg前生效
+            if self.is_cancelling:
+                return False
             
             print(f"执行FFmpeg命令: {' '.join(cmd)}")
             
-            # 启动FFmpeg进程
+            # 运行期间切换过前台/后台模式时，重试启动的进程沿用切换后的模式
+            if self.background_override is not None:
+                settings = dict(settings or {}, background=self.background_override)
+            
+            # 启动FFmpeg进程（独立进程组，取消和暂停时整组发信号）
+            self.is_paused = False
             self.current_process = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
                 universal_newlines=True,
-                bufsize=1  # 行缓冲
+                bufsize=1,  # 行缓冲
+                **process_control.popen_kwargs(settings)
             )
             
+            self.resource_monitor = ResourceMonitor(self.current_process.pid)
+            self.watchdog = watchdog
+            if watchdog:
+                watchdog.attach(self.current_process.pid)
+            
             # 监控进度
-            return self._monitor_progress(duration, progress_callback, error_callback)
+            return self._monitor_progress(duration, progress_callback, error_callback, watchdog)
             
         except Exception as e:
             if error_callback:
@@ -210,12 +645,12 @@ class VideoCompressor:
     
     def _monitor_progress(self, duration: float, 
                          progress_callback: Optional[Callable], 
-                         error_callback: Optional[Callable]) -> bool:
+                         error_callback: Optional[Callable],
+                         watchdog: Optional[StallWatchdog] = None) -> bool:
         """监控压缩进度"""
         try:
             error_output = ""
-            last_progress_time = time.time()
-            timeout_seconds = 300  # 5分钟超时
+            reported_slow = False
             
             # 读取进度输出
             while True:
@@ -227,12 +662,20 @@ class VideoCompressor:
                 if not self.current_process or self.current_process.poll() is not None:
                     break
                 
-                # 检查超时
-                if time.time() - last_progress_time > timeout_seconds:
-                    if error_callback:
-                        error_callback("压缩超时，可能是文件过大或参数设置问题")
-                    self.cancel_compression()
-                    return False
+                # 采样资源使用（按间隔节流）
+                if self.resource_monitor:
+                    self.resource_monitor.sample()
+                
+                # 检查是否停滞（停滞后的重试/报错由调用方按策略处理）
+                if watchdog:
+                    state = watchdog.check()
+                    if state == STATE_STALLED:
+                        self.stall_reason = watchdog.describe_stall(watchdog.stall_trigger)
+                        self._terminate_process()
+                        return False
+                    if state == STATE_SLOW and not reported_slow and progress_callback:
+                        progress_callback(None, "编码速度低于预期，但进程仍在工作...")
+                    reported_slow = state == STATE_SLOW
                 
                 try:
                     # 使用select模拟非阻塞读取（仅适用于Unix系统）
@@ -243,9 +686,10 @@ class VideoCompressor:
                         line = self.current_process.stderr.readline()
                         if line:
                             line = line.strip()
+                            if watchdog:
+                                watchdog.observe_line(line)
                             # 解析进度信息
-                            if self._parse_progress_line(line, duration, progress_callback):
-                                last_progress_time = time.time()
+                            self._parse_progress_line(line, duration, progress_callback)
                             # 收集错误输出
                             if "error" in line.lower() or "failed" in line.lower():
                                 error_output += line + "\n"
@@ -264,8 +708,9 @@ class VideoCompressor:
                             line = self.current_process.stderr.readline()
                             if line:
                                 line = line.strip()
-                                if self._parse_progress_line(line, duration, progress_callback):
-                                    last_progress_time = time.time()
+                                if watchdog:
+                                    watchdog.observe_line(line)
+                                self._parse_progress_line(line, duration, progress_callback)
                                 if "error" in line.lower() or "failed" in line.lower():
                                     error_output += line + "\n"
                     except:
@@ -293,6 +738,10 @@ class VideoCompressor:
                     
                 if error_callback:
                     error_msg = f"压缩失败 (返回码: {return_code})"
+                    if hasattr(signal, "SIGXCPU") and return_code == -signal.SIGXCPU:
+                        error_msg += "\n超出任务CPU时间限制"
+                    elif "Cannot allocate memory" in error_output:
+                        error_msg += "\n超出任务内存限制或系统内存不足"
                     if error_output.strip():
                         error_msg += f"\n错误信息: {error_output.strip()}"
                     error_callback(error_msg)
@@ -304,48 +753,48 @@ class VideoCompressor:
             return False
     
     def _parse_progress_line(self, line: str, duration: float, progress_callback: Optional[Callable]) -> bool:
-        """解析FFmpeg进度输出，返回是否解析到有效进度"""
+        """解析FFmpeg进度输出（帧数、输出时间、速度交给ETA估算），返回是否解析到有效进度"""
         try:
             if not progress_callback:
                 return False
+            eta = self.eta or EtaEstimator(duration=duration)
             
-            # 解析时间进度 (out_time_us=微秒)
-            if line.startswith("out_time_us="):
+            # 解析帧数进度（-progress的frame=N和-stats的frame= N fps=...）
+            if line.startswith("frame="):
+                frame_match = re.search(r'frame=\s*(\d+)', line)
+                if frame_match:
+                    frame_num = int(frame_match.group(1))
+                    eta.update(frame=frame_num)
+                    # 没有总时长和总帧数时只能显示帧数
+                    if frame_num > 0 and eta.progress() is None and not duration:
+                        progress_callback(None, f"正在处理第 {frame_num} 帧...")
+                        return True
+            
+            # 解析时间进度 (out_time_us=微秒)，每个进度块报告一次
+            elif line.startswith("out_time_us="):
                 time_us_str = line.split("=")[1].strip()
                 if time_us_str and time_us_str != "N/A":
-                    time_us = int(time_us_str)
-                    current_time = time_us / 1000000.0  # 转换为秒
+                    current_time = int(time_us_str) / 1000000.0  # 转换为秒
+                    eta.update(out_time=current_time)
+                    progress = eta.progress()
                     
+                    # 格式化状态消息
+                    current_time_str = self._format_time(current_time)
                     if duration > 0:
-                        # 计算进度百分比
-                        progress = min(100, int((current_time / duration) * 100))
-                        
-                        # 格式化状态消息
-                        current_time_str = self._format_time(current_time)
-                        total_time_str = self._format_time(duration)
-                        status_msg = f"正在压缩... {current_time_str}/{total_time_str} ({progress}%)"
-                        
-                        progress_callback(progress, status_msg)
-                        return True
+                        status_msg = f"正在压缩... {current_time_str}/{self._format_time(duration)}"
                     else:
-                        # 没有总时长，只显示当前时间
-                        current_time_str = self._format_time(current_time)
                         status_msg = f"正在压缩... {current_time_str}"
-                        progress_callback(None, status_msg)
-                        return True
-            
-            # 解析帧数进度
-            elif line.startswith("frame="):
-                frame_match = re.search(r'frame=\s*(\d+)', line)
-                if frame_match:
-                    frame_num = int(frame_match.group(1))
-                    if frame_num > 0:
-                        status_msg = f"正在处理第 {frame_num} 帧..."
-                        progress_callback(None, status_msg)
-                        return True
+                    if progress is not None:
+                        status_msg += f" ({progress}%)"
+                    remaining = eta.eta_seconds()
+                    if remaining is not None:
+                        status_msg += f" 剩余 {self._format_time(remaining)}"
+                    
+                    progress_callback(progress, status_msg)
+                    return True
             
-            # 解析速度信息
-            elif "speed=" in line:
+            # 解析速度信息（没有进度可显示时）
+            elif "speed=" in line and eta.progress() is None:
                 speed_match = re.search(r'speed=\s*([\d.]+)x', line)
                 if speed_match:
                     speed = float(speed_match.group(1))
@@ -370,17 +819,60 @@ class VideoCompressor:
         else:
             return f"{minutes:02d}:{secs:02d}"
     
+    def reset_cancel(self):
+        """开始新任务前清除上一个任务的取消标记（复用同一个实例时调用）"""
+        self.is_cancelling = False
+    
     def cancel_compression(self):
-        """取消当前压缩任务"""
+        """取消当前压缩任务（尚未启动FFmpeg时，启动前生效）"""
         self.is_cancelling = True
+        self._terminate_process()
+    
+    def _terminate_process(self):
+        """终止当前FFmpeg进程组（进程退出即返回，不做固定等待）"""
         if self.current_process and self.current_process.poll() is None:
-            try:
-                self.current_process.terminate()
-                time.sleep(1)
-                if self.current_process.poll() is None:
-                    self.current_process.kill()
-            except Exception as e:
-                print(f"取消压缩任务失败: {e}")
+            process_control.terminate_process(self.current_process)
+        self.is_paused = False
+    
+    def pause_compression(self) -> bool:
+        """暂停当前压缩任务（SIGSTOP），编码进度保留"""
+        if self.is_paused or not self.is_compression_running():
+            return False
+        if process_control.suspend_process(self.current_process):
+            self.is_paused = True
+            if self.watchdog:
+                self.watchdog.pause()
+            if self.eta:
+                self.eta.pause()
+            return True
+        return False
+    
+    def resume_compression(self) -> bool:
+        """恢复被暂停的压缩任务（SIGCONT）"""
+        if not self.is_paused:
+            return False
+        if process_control.resume_process(self.current_process):
+            self.is_paused = False
+            if self.watchdog:
+                self.watchdog.resume()
+            if self.eta:
+                self.eta.resume()
+            return True
+        return False
+    
+    def get_resource_usage(self) -> Dict[str, Any]:
+        """当前（或最近一次）任务的资源使用情况"""
+        if not self.resource_monitor:
+            return {}
+        return self.resource_monitor.summary()
+    
+    def set_background_mode(self, enabled: bool, config: Optional[Dict[str, Any]] = None) -> bool:
+        """切换当前任务的前台/后台模式（调整运行中FFmpeg的nice、I/O类别和调度策略）"""
+        background = dict(config or {}, enabled=enabled)
+        self.background_override = background
+        if not self.is_compression_running():
+            return True
+        return process_control.set_process_background(self.current_process, enabled, background)
     
     def is_compression_running(self) -> bool:
         """检查是否有压缩任务正在运行"""
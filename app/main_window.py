@@ -29,6 +29,7 @@ class MainWindow(QMainWindow):
         self.config = self.load_config()
         self.current_video_file = None
         self.compression_thread = None
+        self.closing_thread = None  # 确认退出后等待其结束的压缩线程
         
         # 设置窗口基础属性
         self.setup_window()
@@ -44,6 +45,9 @@ class MainWindow(QMainWindow):
         
         # 初始化FFmpeg状态
         self.check_ffmpeg_status()
+        
+        # 清理上次异常退出遗留的临时输出
+        self.sweep_partial_outputs()
     
     def setup_window(self):
         """设置窗口基础属性"""
@@ -270,6 +274,11 @@ class MainWindow(QMainWindow):
         self.reset_button.setObjectName("resetButton")
         button_row_layout.addWidget(self.reset_button)
         
+        self.pause_button = QPushButton("暂停压缩")
+        self.pause_button.setObjectName("pauseButton")
+        self.pause_button.setEnabled(False)
+        button_row_layout.addWidget(self.pause_button)
+        
         button_layout.addLayout(button_row_layout)
         
         right_layout.addLayout(button_layout)
@@ -331,6 +340,13 @@ class MainWindow(QMainWindow):
         ffmpeg_info_action.triggered.connect(self.show_ffmpeg_info)
         tools_menu.addAction(ffmpeg_info_action)
         
+        # 后台模式：降低压缩进程的CPU和I/O优先级，避免影响其他程序
+        self.background_action = QAction("后台模式（低优先级）", self)
+        self.background_action.setCheckable(True)
+        self.background_action.setChecked(self.config.get("background", {}).get("enabled", False))
+        self.background_action.toggled.connect(self.toggle_background_mode)
+        tools_menu.addAction(self.background_action)
+        
         # 帮助菜单
         help_menu = menubar.addMenu("帮助")
         
@@ -480,6 +496,7 @@ class MainWindow(QMainWindow):
         self.compress_button.clicked.connect(self.start_compression)
         self.preview_button.clicked.connect(self.preview_settings)
         self.reset_button.clicked.connect(self.reset_settings)
+        self.pause_button.clicked.connect(self.toggle_pause_compression)
     
     def check_ffmpeg_status(self):
         """检查FFmpeg状态"""
@@ -493,6 +510,15 @@ class MainWindow(QMainWindow):
             print(f"FFmpeg管理器导入失败: {e}")
             self.ffmpeg_status_label.setText("FFmpeg: 检查失败")
     
+    def sweep_partial_outputs(self):
+        """清理输出目录中遗留的未完成临时文件"""
+        try:
+            from app.core.atomic_output import sweep_orphaned_outputs
+            output_dir = self.config.get('compression', {}).get('output_directory', 'compressed')
+            sweep_orphaned_outputs(output_dir)
+        except Exception as e:
+            print(f"清理临时输出失败: {e}")
+    
     def update_ffmpeg_status(self):
         """更新FFmpeg状态显示"""
         try:
@@ -639,10 +665,21 @@ class MainWindow(QMainWindow):
         # 创建并配置压缩线程
         from app.core.compression_thread import CompressionThread
         self.compression_thread = CompressionThread(self)
+        settings = dict(self.current_compression_settings)
+        settings["watchdog"] = self.config.get("watchdog", {})
+        settings["background"] = self.config.get("background", {})
+        settings["resource_limits"] = self.config.get("resource_limits", {})
+        settings.setdefault("packaging", self.config.get("compression", {}).get("packaging"))
+        settings.setdefault("mp4_layout", self.config.get("compression", {}).get("mp4_layout"))
+        settings.setdefault("auto_crop", self.config.get("compression", {}).get("auto_crop", False))
+        settings.setdefault("auto_preset", self.config.get("compression", {}).get("auto_preset", False))
+        settings.setdefault("scene_keyframes", self.config.get("compression", {}).get("scene_keyframes", False))
+        settings.setdefault("content_mode", self.config.get("compression", {}).get("content_mode"))
+        settings.setdefault("screen_mode", self.config.get("compression", {}).get("screen_mode"))
         self.compression_thread.setup_compression(
             str(input_path),
             str(output_path), 
-            self.current_compression_settings
+            settings
         )
         
         # 连接信号
@@ -667,6 +704,10 @@ class MainWindow(QMainWindow):
         self.preview_button.setEnabled(False)
         self.reset_button.setEnabled(False)
         
+        from app.core.process_control import supports_suspend
+        self.pause_button.setText("暂停压缩")
+        self.pause_button.setEnabled(supports_suspend())
+        
         # 显示进度条
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
@@ -692,6 +733,32 @@ class MainWindow(QMainWindow):
             self.compression_thread.stop_compression()
             self.show_message("正在取消压缩...")
             
+    def toggle_pause_compression(self):
+        """暂停或恢复当前压缩任务"""
+        if not (self.compression_thread and self.compression_thread.isRunning()):
+            return
+        
+        if self.compression_thread.is_paused():
+            if self.compression_thread.resume_compression():
+                self.pause_button.setText("暂停压缩")
+                self.show_message("压缩已恢复")
+        else:
+            if self.compression_thread.pause_compression():
+                self.pause_button.setText("继续压缩")
+                self.show_message("压缩已暂停")
+    
+    def toggle_background_mode(self, enabled: bool):
+        """切换后台模式，正在运行的压缩任务立即生效"""
+        background = self.config.setdefault("background", {})
+        background["enabled"] = enabled
+        
+        if self.compression_thread and self.compression_thread.isRunning():
+            if not self.compression_thread.set_background_mode(enabled, background):
+                self.show_message("优先级调整未完全生效（恢复前台可能需要管理员权限）")
+                return
+        
+        self.show_message("已切换到后台模式" if enabled else "已切换到前台模式")
+    
     def on_compression_progress(self, progress: int, status: str):
         """处理压缩进度更新"""
         if progress >= 0:
@@ -876,14 +943,19 @@ class MainWindow(QMainWindow):
         # 启用其他按钮
         self.preview_button.setEnabled(True)
         self.reset_button.setEnabled(True)
+        self.pause_button.setText("暂停压缩")
+        self.pause_button.setEnabled(False)
         
         # 隐藏进度条
         self.progress_bar.setVisible(False)
         self.progress_bar.setValue(0)
         
-        # 清理线程
+        # 清理线程（结果信号在run返回前发出，线程可能仍在运行，结束后再释放）
         if self.compression_thread:
-            self.compression_thread.deleteLater()
+            if self.compression_thread.isRunning():
+                self.compression_thread.finished.connect(self.compression_thread.deleteLater)
+            else:
+                self.compression_thread.deleteLater()
             self.compression_thread = None
 
     def on_compression_settings_changed(self, settings: dict):
@@ -923,6 +995,12 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """窗口关闭事件"""
+        if self.closing_thread:
+            # 已确认退出，压缩线程发出finished后再次关闭（此时run已返回，wait很快结束）
+            self.closing_thread.wait()
+            event.accept()
+            return
+        
         # 确认退出
         reply = QMessageBox.question(
             self,
@@ -935,9 +1013,14 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.Yes:
             # 如果有正在进行的压缩任务，先停止
             if self.compression_thread and self.compression_thread.isRunning():
-                self.compression_thread.terminate()
-                self.compression_thread.wait()
+                if not self.compression_thread.stop_compression():
+                    # FFmpeg已终止但线程还在清理，等线程结束后再关闭，避免销毁仍在运行的QThread
+                    self.closing_thread = self.compression_thread
+                    self.closing_thread.finished.connect(self.close)
+                    self.show_message("正在等待压缩任务退出...")
+                    event.ignore()
+                    return
             
             event.accept()
         else:
-            event.ignore() 
\ No newline at end of file
+            event.ignore() 
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+应用数据目录 - 缓存、主机配置等运行时文件的存放位置
+"""
+
+import os
+from pathlib import Path
+
+
+def get_data_dir() -> Path:
+    """获取应用数据目录（可通过环境变量VIDEO_COMPRESSOR_HOME覆盖）"""
+    data_dir = Path(os.environ.get("VIDEO_COMPRESSOR_HOME", Path.home() / ".video_compressor"))
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
+
+
+def get_cache_dir(name: str = "") -> Path:
+    """获取缓存目录，name不为空时返回其子目录"""
+    cache_dir = get_data_dir() / "cache"
+    if name:
+        cache_dir = cache_dir / name
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
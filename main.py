@@ -8,7 +8,7 @@ import sys
 import os
 from pathlib import Path
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QTranslator, QLocale
+from PyQt5.QtCore import QTranslator, QLocale, QTimer
 from PyQt5.QtGui import QIcon
 
 # 添加项目根目录到Python路径
@@ -36,6 +36,10 @@ def main():
     window = MainWindow()
     window.show()
     
+    # 启动时间基准：首个窗口显示后打印标记并退出
+    if os.environ.get("VIDEO_COMPRESSOR_STARTUP_PROBE"):
+        QTimer.singleShot(0, lambda: (print("FIRST_WINDOW_SHOWN", flush=True), app.quit()))
+    
     # 启动事件循环
     sys.exit(app.exec_())
 
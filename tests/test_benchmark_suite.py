@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准套件测试 - 结果对比和退化判断
+"""
+
+from app.core.benchmark_suite import HIGHER_IS_BETTER, LOWER_IS_BETTER, compare_results
+
+
+def _result(revision: str, host_id: str, **metrics) -> dict:
+    return {
+        "revision": revision,
+        "host": {"host_id": host_id},
+        "metrics": {name: {"value": value, "unit": unit, "better": better}
+                    for name, (value, unit, better) in metrics.items()},
+    }
+
+
+def test_compare_results_flags_regressions_by_direction():
+    baseline = _result("a", "h", probe=(1.0, "s", LOWER_IS_BETTER), fps=(100.0, "fps", HIGHER_IS_BETTER))
+    current = _result("b", "h", probe=(1.2, "s", LOWER_IS_BETTER), fps=(90.0, "fps", HIGHER_IS_BETTER))
+    report = compare_results(baseline, current, threshold=0.05)
+    assert sorted(report["regressions"]) == ["fps", "probe"]
+    assert report["metrics"]["probe"]["change"] == 0.2
+    assert report["host_mismatch"] is False
+    assert (report["baseline_revision"], report["current_revision"]) == ("a", "b")
+
+
+def test_compare_results_within_threshold_or_improved():
+    baseline = _result("a", "h", probe=(1.0, "s", LOWER_IS_BETTER), fps=(100.0, "fps", HIGHER_IS_BETTER))
+    current = _result("b", "h", probe=(1.04, "s", LOWER_IS_BETTER), fps=(150.0, "fps", HIGHER_IS_BETTER))
+    report = compare_results(baseline, current, threshold=0.05)
+    assert report["regressions"] == []
+    assert not report["metrics"]["fps"]["regressed"]
+
+
+def test_compare_results_skips_missing_and_zero_metrics():
+    baseline = _result("a", "h1", only_old=(1.0, "s", LOWER_IS_BETTER), zero=(0.0, "s", LOWER_IS_BETTER))
+    current = _result("b", "h2", zero=(5.0, "s", LOWER_IS_BETTER), only_new=(1.0, "s", LOWER_IS_BETTER))
+    report = compare_results(baseline, current)
+    assert report["metrics"] == {}
+    assert report["host_mismatch"] is True
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容分析测试 - 逐帧统计日志解析和复杂度分类
+"""
+
+import pytest
+from app.core.content_analysis import (
+    COMPLEXITY_HIGH_MOTION,
+    COMPLEXITY_NOISY,
+    COMPLEXITY_STATIC,
+    COMPLEXITY_SUGGESTIONS,
+    COMPLEXITY_TALKING_HEAD,
+    ContentAnalyzer,
+    classify_complexity,
+    parse_metrics,
+)
+
+
+SAMPLE_LOG = """\
+[Parsed_metadata_3 @ 0x55d0] frame:0    pts:0       pts_time:0
+[Parsed_metadata_3 @ 0x55d0] lavfi.signalstats.YDIF=0
+[Parsed_metadata_3 @ 0x55d0] lavfi.signalstats.TOUT=0
+[Parsed_metadata_3 @ 0x55d0] lavfi.scd.score=0
+[Parsed_metadata_3 @ 0x55d0] frame:1    pts:512     pts_time:0.04
+[Parsed_metadata_3 @ 0x55d0] lavfi.signalstats.YDIF=2.5
+[Parsed_metadata_3 @ 0x55d0] lavfi.signalstats.TOUT=7.8125e-05
+[Parsed_metadata_3 @ 0x55d0] lavfi.scd.score=0.42
+[Parsed_metadata_3 @ 0x55d0] frame:2    pts:1024    pts_time:0.08
+[Parsed_metadata_3 @ 0x55d0] lavfi.signalstats.YDIF=30.125
+[Parsed_metadata_3 @ 0x55d0] lavfi.signalstats.TOUT=0.015625
+[Parsed_metadata_3 @ 0x55d0] lavfi.scd.score=35.7
+[Parsed_metadata_3 @ 0x55d0] lavfi.scd.time=0.08
+"""
+
+
+def test_parse_metrics_totals():
+    totals = parse_metrics(SAMPLE_LOG)
+    assert totals["frames"] == 3
+    assert totals["ydif"] == pytest.approx(32.625)
+    assert totals["cuts"] == 1
+
+
+def test_parse_metrics_reads_exponent_values():
+    totals = parse_metrics("lavfi.signalstats.TOUT=7.8125e-05\n")
+    assert totals["tout"] == pytest.approx(7.8125e-05)
+
+
+def test_parse_metrics_skips_unparsable_values():
+    totals = parse_metrics("lavfi.signalstats.YDIF=nan\nlavfi.signalstats.YDIF=abc\nlavfi.signalstats.YDIF=1\n")
+    assert totals["frames"] == 1
+    assert totals["ydif"] == 1.0
+
+
+def test_parse_metrics_empty_log():
+    assert parse_metrics("") == {"frames": 0, "ydif": 0.0, "tout": 0.0, "cuts": 0}
+
+
+@pytest.mark.parametrize("metrics, expected", [
+    ({"motion": 0.3, "noise": 0.0001, "cuts_per_minute": 0.0}, COMPLEXITY_STATIC),
+    ({"motion": 3.0, "noise": 0.001, "cuts_per_minute": 2.0}, COMPLEXITY_TALKING_HEAD),
+    ({"motion": 12.0, "noise": 0.001, "cuts_per_minute": 2.0}, COMPLEXITY_HIGH_MOTION),
+    # 切换频繁时即使帧间差小也按高运动处理
+    ({"motion": 0.5, "noise": 0.001, "cuts_per_minute": 30.0}, COMPLEXITY_HIGH_MOTION),
+    # 噪声会抬高帧间差，先于运动判断
+    ({"motion": 12.0, "noise": 0.05, "cuts_per_minute": 0.0}, COMPLEXITY_NOISY),
+])
+def test_classify_complexity(metrics, expected):
+    assert classify_complexity(metrics) == expected
+
+
+def test_suggest_settings_keeps_explicit_values(monkeypatch):
+    analyzer = ContentAnalyzer()
+    suggestion = COMPLEXITY_SUGGESTIONS[COMPLEXITY_NOISY]
+    monkeypatch.setattr(analyzer, "complexity", lambda input_file: {
+        "category": COMPLEXITY_NOISY, "suggestion": suggestion})
+    result = analyzer.suggest_settings("in.mp4", {"preset": "standard", "crf": 18,
+                                                  "video_filters": {"denoise": "strong"}})
+    assert result["crf"] == 18
+    assert result["encode_preset"] == suggestion["encode_preset"]
+    assert result["video_filters"]["denoise"] == "strong"
+    result = analyzer.suggest_settings("in.mp4", {"encode_preset": "veryfast"})
+    assert (result["crf"], result["encode_preset"]) == (suggestion["crf"], "veryfast")
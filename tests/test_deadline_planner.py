@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截止时间规划测试 - 按可用时间选择速度预设、按实际耗时修正
+"""
+
+from app.core.deadline_planner import DeadlinePlanner
+
+
+NOW = 1000000.0
+
+
+def _workload(frames: float, codec: str = "libx264") -> dict:
+    return {"codec": codec, "preset": "medium", "frames": frames, "width": 1920, "height": 1080}
+
+
+def test_ample_time_uses_slowest_preset():
+    planner = DeadlinePlanner(NOW + 10 ** 9)
+    plan = planner.plan([{"key": 1, "workload": _workload(1000)}], [], 1, NOW)
+    assert plan[1]["encode_preset"] == "slow"
+
+
+def test_tight_deadline_speeds_up_longest_job_first():
+    planner = DeadlinePlanner(NOW + 10 ** 9)
+    pending = [{"key": "short", "workload": _workload(1000)}, {"key": "long", "workload": _workload(100000)}]
+    relaxed = planner.plan(pending, [], 1, NOW)
+    planner.deadline = NOW + (relaxed["short"]["seconds"] + relaxed["long"]["seconds"]) * 0.6
+    tight = planner.plan(pending, [], 1, NOW)
+    assert tight["short"]["encode_preset"] == "slow"
+    assert tight["long"]["encode_preset"] != "slow"
+    assert tight["long"]["seconds"] < relaxed["long"]["seconds"]
+
+
+def test_impossible_deadline_stops_at_fastest_preset():
+    planner = DeadlinePlanner(NOW + 1)
+    plan = planner.plan([{"key": 1, "workload": _workload(10 ** 7)}], [], 1, NOW)
+    assert plan[1]["encode_preset"] == "ultrafast"
+
+
+def test_unsupported_or_unprobed_jobs_are_skipped():
+    planner = DeadlinePlanner(NOW + 3600)
+    plan = planner.plan([{"key": 1, "workload": _workload(1000, "libvpx-vp9")}, {"key": 2, "workload": None}],
+                        [], 1, NOW)
+    assert plan == {}
+
+
+def test_observe_moves_correction_towards_actual():
+    planner = DeadlinePlanner(NOW + 3600, {"correction_weight": 0.5})
+    planner.observe(100.0, 200.0)
+    assert planner.correction == 1.5
+    planner.observe(100.0, 0.0)
+    assert planner.correction == 1.5
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预计剩余时间测试 - 队列模拟调度和单任务进度估算
+"""
+
+import pytest
+from app.core import eta
+from app.core.eta import WARMUP_SECONDS, EtaEstimator, encode_workload, queue_eta
+
+
+def test_queue_eta_single_slot_is_sum():
+    assert queue_eta([10.0], [20.0, 30.0], 1) == 60.0
+
+
+def test_queue_eta_assigns_to_earliest_free_slot():
+    # 槽位1: 10 -> 10+30；槽位2: 50
+    assert queue_eta([10.0, 50.0], [30.0], 2) == 50.0
+    assert queue_eta([], [30.0, 30.0, 30.0], 2) == 60.0
+
+
+def test_queue_eta_empty():
+    assert queue_eta([], [], 4) == 0.0
+
+
+def test_eta_before_progress_uses_expected_speed():
+    estimator = EtaEstimator(total_frames=3000, duration=100, expected_fps=100)
+    assert estimator.progress() is None
+    assert estimator.eta_seconds() == pytest.approx(30.0)
+
+
+def test_eta_converges_to_measured_speed():
+    estimator = EtaEstimator(total_frames=1000, duration=100, expected_fps=1000)
+    # 实测每秒10帧，远慢于预期
+    for second in range(0, 61):
+        estimator.update(frame=second * 10, now=1000.0 + second)
+    assert estimator.progress() == 60
+    assert estimator.eta_seconds(now=1060.0) == pytest.approx(40.0, rel=0.05)
+
+
+def test_eta_blends_during_warmup():
+    estimator = EtaEstimator(total_frames=1000, duration=100, expected_fps=20)
+    estimator.update(frame=10, now=1000.0)
+    estimator.update(frame=20, now=1001.0)
+    eta = estimator.eta_seconds(now=1000.0 + WARMUP_SECONDS / 2)
+    # 实测10帧/秒、预期20帧/秒，预热一半时介于两者之间
+    assert 980 / 20 < eta < 980 / 10
+
+
+def test_eta_counts_time_when_frames_unknown():
+    estimator = EtaEstimator(total_frames=1000, duration=100, count_frames=False)
+    estimator.update(frame=500, out_time=25.0, now=1000.0)
+    assert estimator.progress() == 25
+
+
+def test_eta_ignores_updates_while_paused():
+    estimator = EtaEstimator(total_frames=100)
+    estimator.update(frame=10, now=1000.0)
+    estimator.pause()
+    estimator.update(frame=50, now=1001.0)
+    assert estimator.frame == 10
+    estimator.resume()
+    estimator.update(frame=50, now=1002.0)
+    assert estimator.snapshot()["progress"] == 50
+
+
+def test_encode_workload_sums_merge_inputs(monkeypatch):
+    infos = {
+        "a.mp4": {"duration": 60.0, "fps": 30.0, "width": 1920, "height": 1080},
+        "b.mp4": {"duration": 30.0, "fps": 60.0, "width": 1280, "height": 720},
+    }
+    monkeypatch.setattr(eta.media_probe, "probe", lambda path: infos.get(path, {}))
+    workload = encode_workload("a.mp4", {"merge_inputs": ["a.mp4", "b.mp4"]})
+    assert workload["duration"] == 90.0
+    assert workload["frames"] == 60 * 30 + 30 * 60
+    assert (workload["width"], workload["height"]) == (1920, 1080)
+    # 任一分段时长未知时无法估算
+    assert encode_workload("a.mp4", {"merge_inputs": ["a.mp4", "missing.mp4"]}) is None
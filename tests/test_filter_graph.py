@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滤镜链测试 - 等比缩小和滤镜顺序
+"""
+
+from app.core.filter_graph import fit_resolution, plan_video_filters, scale_filter
+
+
+SOURCE_1080P = {"width": 1920, "height": 1080, "fps": 30.0, "field_order": "progressive"}
+
+
+def test_fit_resolution_keeps_aspect_ratio():
+    assert fit_resolution(1920, 1080, 1280, 720) == (1280, 720)
+    assert fit_resolution(1920, 1080, None, 720) == (1280, 720)
+    assert fit_resolution(1920, 800, 1280, 720) == (1280, 534)
+
+
+def test_fit_resolution_never_upscales():
+    assert fit_resolution(1280, 720, 1920, 1080) is None
+    assert fit_resolution(0, 0, 1280, 720) is None
+    assert fit_resolution(1920, 1080, None, None) is None
+
+
+def test_plan_video_filters_noop():
+    plan = plan_video_filters(SOURCE_1080P, resolution=(1920, 1080), fps=30)
+    assert plan["vf"] == ""
+    assert (plan["width"], plan["height"], plan["fps"]) == (1920, 1080, 30.0)
+
+
+def test_plan_video_filters_order():
+    source = dict(SOURCE_1080P, field_order="tt", fps=60.0)
+    plan = plan_video_filters(source, crop={"width": 1920, "height": 800, "x": 0, "y": 140},
+                              resolution=(1280, 720), fps=30, options={"denoise": "light"})
+    names = [item.split("=")[0] for item in plan["filters"]]
+    assert names == ["crop", "yadif", "fps", "scale", "hqdn3d"]
+    assert (plan["width"], plan["height"], plan["fps"]) == (1280, 534, 30)
+
+
+def test_plan_video_filters_upsampling_goes_last():
+    plan = plan_video_filters(SOURCE_1080P, resolution=(1280, 720), fps=60)
+    assert plan["filters"][-1] == "fps=60"
+    assert plan["filters"][0].startswith("scale=1280:720")
+
+
+def test_plan_video_filters_decimate_disables_upsampling():
+    plan = plan_video_filters(SOURCE_1080P, fps=60, options={"decimate": True})
+    assert plan["filters"] == ["mpdecimate"]
+    assert plan["vfr"] is True
+    assert plan["fps"] == 30.0
+
+
+def test_plan_video_filters_unknown_source_size_never_upscales():
+    plan = plan_video_filters({}, resolution=(None, 720), options={"scaler": "fast"})
+    assert plan["filters"] == ["scale=-2:min(ih\\,720):flags=fast_bilinear"]
+    plan = plan_video_filters({}, resolution=(1280, 720))
+    assert plan["filters"][0].startswith("scale=min(iw\\,1280):min(ih\\,720):force_original_aspect_ratio=decrease")
+
+
+def test_scale_filter():
+    assert scale_filter(720) == "scale=-2:720:flags=bicubic"
+    assert scale_filter(480, 854, "quality") == "scale=854:480:flags=lanczos"
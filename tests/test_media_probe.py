@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+媒体探测测试 - FFprobe输出解析、旋转元数据和探测缓存
+"""
+
+from app.core.filter_graph import plan_video_filters
+from app.core.media_probe import ProbeCache, display_size, parse_ffprobe_data, stream_rotation
+from app.core.renditions import rendition_width
+
+
+def _ffprobe_data(video_extra: dict) -> dict:
+    video = {"codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080,
+             "avg_frame_rate": "30000/1001", "nb_frames": "300"}
+    video.update(video_extra)
+    return {
+        "format": {"duration": "10.01", "size": "1000", "bit_rate": "800", "format_name": "mov,mp4"},
+        "streams": [video, {"codec_type": "audio", "codec_name": "aac", "sample_rate": "48000", "channels": 2}],
+    }
+
+
+def test_stream_rotation_sources():
+    assert stream_rotation({}) == 0
+    assert stream_rotation({"side_data_list": [{"side_data_type": "Display Matrix", "rotation": -90}]}) == 270
+    assert stream_rotation({"tags": {"rotate": "90"}}) == 90
+    assert stream_rotation({"tags": {"rotate": "bad"}}) == 0
+
+
+def test_display_size():
+    assert display_size(1920, 1080, 90) == (1080, 1920)
+    assert display_size(1920, 1080, 180) == (1920, 1080)
+
+
+def test_parse_ffprobe_data_plain():
+    info = parse_ffprobe_data(_ffprobe_data({}))
+    assert (info["width"], info["height"], info["rotation"]) == (1920, 1080, 0)
+    assert info["nb_frames"] == 300
+    assert info["has_audio"] is True
+    assert round(info["fps"], 3) == 29.970
+
+
+def test_parse_ffprobe_data_rotated_display_matrix():
+    info = parse_ffprobe_data(_ffprobe_data({"side_data_list": [{"rotation": -90}]}))
+    assert (info["width"], info["height"], info["rotation"]) == (1080, 1920, 270)
+
+
+def test_rotated_clip_is_scaled_as_portrait():
+    info = parse_ffprobe_data(_ffprobe_data({"tags": {"rotate": "90"}}))
+    plan = plan_video_filters(info, resolution=(1280, 720))
+    # 竖屏画面放进1280x720的框：高度受限，宽度按竖屏比例缩小
+    assert plan["height"] == 720
+    assert plan["width"] < plan["height"]
+    assert plan["filters"] == [f"scale={plan['width']}:720:flags=bicubic"]
+    assert rendition_width({"height": 720}, info["width"], info["height"]) == plan["width"]
+
+
+def _media_files(tmp_path, count: int) -> list:
+    files = []
+    for index in range(count):
+        path = tmp_path / f"{index}.mp4"
+        path.write_bytes(b"x" * (index + 1))
+        files.append(str(path))
+    return files
+
+
+def test_probe_cache_evicts_least_recently_used(tmp_path):
+    cache = ProbeCache(tmp_path / "cache.json", max_entries=2)
+    first, second, third = _media_files(tmp_path, 3)
+    cache.set(first, "probe", {"duration": 1})
+    cache.set(second, "probe", {"duration": 2})
+    assert cache.get(first) == {"duration": 1}
+    cache.set(third, "probe", {"duration": 3})
+    assert cache.get(second) is None
+    assert cache.get(first) == {"duration": 1}
+    assert len(ProbeCache(tmp_path / "cache.json")._entries) == 2
+
+
+def test_probe_cache_merges_writes_from_other_processes(tmp_path):
+    first, second = _media_files(tmp_path, 2)
+    cache_a = ProbeCache(tmp_path / "cache.json")
+    cache_b = ProbeCache(tmp_path / "cache.json")
+    cache_a.set(first, "probe", {"duration": 1})
+    cache_b.set(second, "probe", {"duration": 2})
+    cache_b.set(first, "crop", {"crop": None})
+    reloaded = ProbeCache(tmp_path / "cache.json")
+    assert reloaded.get(first) == {"duration": 1}
+    assert reloaded.get(first, "crop") == {"crop": None}
+    assert reloaded.get(second) == {"duration": 2}
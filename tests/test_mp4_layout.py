@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MP4布局测试 - moov大小估算和封装参数
+"""
+
+import pytest
+from app.core.mp4_layout import (
+    MOOV_BASE_BYTES,
+    apply_layout,
+    estimate_moov_size,
+    layout_args,
+)
+
+
+def test_estimate_moov_size_grows_with_duration():
+    short = estimate_moov_size({"duration": 60, "fps": 30})
+    long = estimate_moov_size({"duration": 3600, "fps": 30})
+    assert MOOV_BASE_BYTES < short < long
+
+
+def test_estimate_moov_size_counts_audio():
+    video_only = estimate_moov_size({"duration": 600, "fps": 30})
+    with_audio = estimate_moov_size({"duration": 600, "fps": 30, "has_audio": True})
+    assert with_audio > video_only
+
+
+def test_estimate_moov_size_uses_frame_count_without_duration():
+    assert estimate_moov_size({"nb_frames": 1000}) > MOOV_BASE_BYTES
+    # 帧率改变后源帧数不适用
+    assert estimate_moov_size({"nb_frames": 1000, "fps": 30}, output_fps=60) is None
+
+
+def test_estimate_moov_size_uses_output_fps():
+    source = {"duration": 600, "fps": 30, "nb_frames": 18000}
+    assert estimate_moov_size(source, output_fps=60) > estimate_moov_size(source)
+    assert estimate_moov_size(source, output_fps=60) == estimate_moov_size({"duration": 600, "fps": 60})
+
+
+@pytest.mark.parametrize("media_info", [{}, {"fps": 30}, {"nb_frames": 1000, "has_audio": True}])
+def test_estimate_moov_size_unknown(media_info):
+    assert estimate_moov_size(media_info) is None
+
+
+def test_reserved_moov_falls_back_to_faststart_when_unknown():
+    assert layout_args("reserved_moov", {}) == ["-movflags", "+faststart"]
+    args = layout_args("reserved_moov", {"duration": 10, "fps": 25})
+    assert args[0] == "-moov_size" and int(args[1]) > MOOV_BASE_BYTES
+    faster = layout_args("reserved_moov", {"duration": 10, "fps": 25}, output_fps=50)
+    assert int(faster[1]) > int(args[1])
+
+
+def test_apply_layout_replaces_movflags():
+    filters = ["-movflags", "+faststart", "-f", "mp4"]
+    assert apply_layout(filters, "fragmented") == ["-f", "mp4", "-movflags",
+                                                   "+frag_keyframe+empty_moov+default_base_moof"]
+    assert apply_layout(filters, None) == filters
+    with pytest.raises(ValueError):
+        layout_args("unknown")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+暂存目录测试 - 复制、LRU淘汰和并发复制保护
+"""
+
+import os
+
+from app.core import prefetch
+from app.core.prefetch import ScratchStager
+
+
+def _source(tmp_path, name: str, size: int) -> str:
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_stage_evicts_least_recently_used(tmp_path):
+    stager = ScratchStager(str(tmp_path / "scratch"), budget_bytes=150)
+    first = _source(tmp_path, "a.mp4", 100)
+    second = _source(tmp_path, "b.mp4", 100)
+    assert stager.stage(first)
+    assert stager.stage(second)
+    assert first not in stager._entries
+    assert stager.used_bytes() == 100
+
+
+def test_evict_skips_copy_in_progress(tmp_path):
+    stager = ScratchStager(str(tmp_path / "scratch"), budget_bytes=150)
+    copying = _source(tmp_path, "a.mp4", 100)
+    stager._entries[copying] = {"path": str(tmp_path / "a.part"), "size": 100, "in_use": 0, "ready": False}
+    assert stager.stage(_source(tmp_path, "b.mp4", 100)) is None
+    assert copying in stager._entries
+    # 同一输入正在复制时不会重复复制
+    assert stager.stage(copying) is None
+
+
+def test_stage_discards_copy_when_entry_removed(tmp_path, monkeypatch):
+    stager = ScratchStager(str(tmp_path / "scratch"), budget_bytes=1000)
+    source = _source(tmp_path, "a.mp4", 10)
+    original_replace = os.replace
+
+    def replace_and_close(src, dst):
+        original_replace(src, dst)
+        stager._entries.clear()
+
+    monkeypatch.setattr(prefetch.os, "replace", replace_and_close)
+    assert stager.stage(source) is None
+    assert list(stager.scratch_dir.iterdir()) == []
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多码率输出测试 - 码率解析、阶梯解析和按源分辨率选择版本
+"""
+
+import pytest
+from app.core.renditions import (
+    parse_bitrate,
+    rendition_output_path,
+    rendition_width,
+    resolve_ladder,
+    select_renditions,
+)
+
+
+def test_parse_bitrate():
+    assert parse_bitrate("3000k") == 3000000
+    assert parse_bitrate("6M") == 6000000
+    assert parse_bitrate(128000) == 128000
+    with pytest.raises(ValueError):
+        parse_bitrate("fast")
+
+
+def test_resolve_ladder_sorts_and_names():
+    ladder = resolve_ladder([{"height": 480}, {"height": 1080, "name": "full"}])
+    assert [rendition["name"] for rendition in ladder] == ["full", "480p"]
+    with pytest.raises(ValueError):
+        resolve_ladder("unknown")
+
+
+def test_select_renditions_drops_upscaled_rungs():
+    selected = select_renditions(resolve_ladder("abr"), 720)
+    assert [rendition["height"] for rendition in selected] == [720, 480]
+
+
+def test_select_renditions_small_source_uses_source_height():
+    selected = select_renditions(resolve_ladder("abr"), 360)
+    assert len(selected) == 1
+    assert selected[0]["height"] == 360
+    assert selected[0]["name"] == "360p"
+    # 沿用最低一档的码率参数
+    assert selected[0]["maxrate"] == "1200k"
+
+
+def test_select_renditions_odd_source_height_rounds_down():
+    assert select_renditions(resolve_ladder("abr"), 241)[0]["height"] == 240
+
+
+def test_select_renditions_unknown_source_keeps_ladder():
+    ladder = resolve_ladder("abr")
+    assert select_renditions(ladder, 0) == ladder
+
+
+def test_rendition_width_and_output_path():
+    assert rendition_width({"height": 720}, 1920, 1080) == 1280
+    assert rendition_width({"height": 720, "width": 960}, 1920, 1080) == 960
+    assert rendition_output_path("/out/video.mp4", {"name": "720p"}) == "/out/video_720p.mp4"
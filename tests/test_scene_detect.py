@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景检测测试 - 短场景合并、关键帧对齐和分段规划
+"""
+
+from app.core.scene_detect import (
+    align_to_keyframes,
+    merge_short_scenes,
+    plan_chunks,
+    scene_keyframe_args,
+)
+
+
+def test_merge_short_scenes_drops_cuts_closer_than_minimum():
+    assert merge_short_scenes([5.0, 12.0, 14.0, 30.0], 60.0, 10.0) == [12.0, 30.0]
+
+
+def test_merge_short_scenes_keeps_last_chunk_long_enough():
+    # 55秒处的切换会留下5秒的尾段
+    assert merge_short_scenes([20.0, 40.0, 55.0], 60.0, 10.0) == [20.0, 40.0]
+
+
+def test_merge_short_scenes_unsorted_input_and_unknown_duration():
+    assert merge_short_scenes([40.0, 20.0, 95.0], 0, 10.0) == [20.0, 40.0, 95.0]
+
+
+def test_align_to_keyframes_snaps_within_tolerance():
+    keyframes = [0.0, 9.6, 20.0, 30.0]
+    assert align_to_keyframes([10.0, 25.0], keyframes, tolerance=1.0) == [9.6, 25.0]
+
+
+def test_align_to_keyframes_removes_duplicates_and_ignores_zero():
+    keyframes = [0.0, 20.0]
+    assert align_to_keyframes([0.4, 19.5, 20.4], keyframes, tolerance=1.0) == [0.4, 20.0]
+
+
+def test_align_to_keyframes_without_keyframes_rounds():
+    assert align_to_keyframes([1.23456], []) == [1.235]
+
+
+def test_plan_chunks():
+    assert plan_chunks([20.0, 40.0], 60.0) == [(0.0, 20.0), (20.0, 40.0), (40.0, 60.0)]
+    # 范围外的边界被忽略
+    assert plan_chunks([0.0, 70.0], 60.0) == [(0.0, 60.0)]
+
+
+def test_scene_keyframe_args():
+    assert scene_keyframe_args([]) == []
+    assert scene_keyframe_args([1.5, 20.0]) == ["-force_key_frames", "1.500,20.000"]
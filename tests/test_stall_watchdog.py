@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+停滞检测测试 - 停滞判定和原因描述
+"""
+
+from app.core.stall_watchdog import (
+    STALL_CPU_IDLE,
+    STALL_MAX_TIMEOUT,
+    STALL_NO_PROGRESS,
+    STATE_SLOW,
+    STATE_STALLED,
+    StallWatchdog,
+)
+
+
+def _watchdog(cpu_supported: bool) -> StallWatchdog:
+    watchdog = StallWatchdog(expected_fps=30, config={"min_timeout": 10, "max_timeout": 100,
+                                                      "cpu_idle_timeout": 20})
+    watchdog.attach(0)
+    watchdog.cpu_supported = cpu_supported
+    watchdog.start_time = watchdog.last_advance_time = watchdog.last_cpu_advance_time = 1000.0
+    return watchdog
+
+
+def test_cpu_idle_stall():
+    watchdog = _watchdog(True)
+    assert watchdog.check(now=1015.0) == STATE_SLOW
+    assert watchdog.check(now=1030.0) == STATE_STALLED
+    assert watchdog.stall_trigger == STALL_CPU_IDLE
+    assert "CPU已30秒无活动" in watchdog.describe_stall(watchdog.stall_trigger, now=1030.0)
+
+
+def test_max_timeout_stall_with_cpu_activity():
+    watchdog = _watchdog(True)
+    watchdog.last_cpu_advance_time = 1110.0
+    assert watchdog.check(now=1120.0) == STATE_STALLED
+    assert watchdog.stall_trigger == STALL_MAX_TIMEOUT
+    description = watchdog.describe_stall(watchdog.stall_trigger, now=1120.0)
+    assert "CPU仍有活动" in description and "无活动" not in description
+
+
+def test_stall_without_cpu_sampling():
+    watchdog = _watchdog(False)
+    assert watchdog.check(now=1020.0) == STATE_SLOW
+    assert watchdog.check(now=1031.0) == STATE_STALLED
+    assert watchdog.stall_trigger == STALL_NO_PROGRESS
+    assert watchdog.describe_stall(watchdog.stall_trigger, now=1031.0) == "FFmpeg进程已停滞（31秒无进度）"